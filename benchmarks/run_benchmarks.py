@@ -0,0 +1,328 @@
+'''
+Benchmarks the acquire -> frame -> metrics -> aggregate pipeline on the synthetic fixtures written by
+nfl_synthetic_data.py (FIXTURE sets their scale).
+
+Each stage is run at three scales - one play, one game and the whole fixture week - and its wall time (best of
+--repeat runs), peak traced memory (one tracemalloc run) and plays per second are written to a JSON file.  Results
+are compared with a stored baseline (benchmarks/baseline.json by default) and anything slower or bigger than the
+baseline by more than --tolerance is flagged as a regression (exit code 1).
+
+Usage (from the repository root):
+    python benchmarks/run_benchmarks.py                      # run and compare with the baseline
+    python benchmarks/run_benchmarks.py --save-baseline      # run and store the results as the new baseline
+    python benchmarks/run_benchmarks.py --stages build_metrics pull_metrics --scales play game
+'''
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import platform
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+import nfl_acquire_and_prep as acquire
+import nfl_frame_builder as nfl
+import nfl_build_metrics as metrics
+import nfl_use_metrics as use_metrics
+import nfl_synthetic_data as synthetic
+
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+SCALES = ['play', 'game', 'week']
+
+STAGES = ['acquire.week',
+          'build_play_frames',
+          'build_metrics',
+          'pull_metrics',
+          'play_player_metrics_builder',
+          'week_pass_rush_results']
+
+# Fixture scale: one week of 2 games with 8 plays each
+FIXTURE = {'weeks':1,
+           'games_per_week':2,
+           'plays_per_game':8,
+           'frames_per_play':45,
+           'rushers_per_play':4,
+           'blockers_per_play':5,
+           'seed':2023}
+
+# Stages that only make sense for a whole week
+WEEK_ONLY_STAGES = ['acquire.week', 'week_pass_rush_results']
+
+# Times below this are too noisy to flag (seconds)
+MIN_SECONDS = 0.05
+
+
+def run_benchmarks(stages = STAGES, scales = SCALES, repeat = 3, data_dir = None):
+    '''
+    Writes the fixtures (to a temporary directory unless data_dir is given), points acquire at them and runs every
+    stage at every scale.  acquire's data directories are restored afterwards.
+
+    Parameters:
+        'stages' - List of Strings - Stages to run (see STAGES)
+        'scales' - List of Strings - Scales to run (see SCALES)
+        'repeat' - Integer - Timed runs per benchmark (the best is kept)
+        'data_dir' - String - Directory to write the fixtures to
+    Returns:
+        'results' - Dictionary - 'stage/scale' to seconds, peak_mb, plays and plays_per_second
+    '''
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_dir = data_dir or temp_dir
+        synthetic.generate(data_dir, **FIXTURE)
+
+        # Pointed back at the caller's data when the run ends, however it ends
+        data_dirs = (acquire.DATA_DIR, acquire.CACHE_DIR)
+
+        # The week cache follows DATA_DIR
+        acquire.DATA_DIR = data_dir
+        acquire.CACHE_DIR = None
+
+        try:
+            session = acquire.DataSession(use_cache = False)
+            week_df = session.week(1)
+
+            results = {}
+
+            for scale in scales:
+                scope = scale_scope(session, week_df, scale)
+
+                for stage in stages:
+                    if stage in WEEK_ONLY_STAGES and scale != 'week':
+                        continue
+
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        benchmark = stage_benchmark(stage, session, scope)
+                
+                    results[f'{stage}/{scale}'] = measure(benchmark, scope['plays'], repeat)
+
+                    print(format_result(f'{stage}/{scale}', results[f'{stage}/{scale}']))
+
+        finally:
+            acquire.DATA_DIR, acquire.CACHE_DIR = data_dirs
+
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance = 0.5):
+    '''
+    Flags the benchmarks that got slower (or used more memory) than the baseline by more than tolerance.  Times under
+    MIN_SECONDS in both runs are not flagged.
+
+    Parameters:
+        'results' - Dictionary - Output of run_benchmarks
+        'baseline' - Dictionary - Stored results
+        'tolerance' - Float - Allowed fractional increase (0.5 = 50% slower)
+    Returns:
+        'regressions' - List of Strings - Description of each regression
+    '''
+    regressions = []
+
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        base = baseline[name]
+
+        if max(result['seconds'], base['seconds']) >= MIN_SECONDS and result['seconds'] > base['seconds'] * (1 + tolerance):
+            regressions.append(f"{name}: {result['seconds']:.4f}s vs {base['seconds']:.4f}s baseline")
+
+        if result['peak_mb'] > base['peak_mb'] * (1 + tolerance) and result['peak_mb'] - base['peak_mb'] > 0.5:
+            regressions.append(f"{name}: {result['peak_mb']:.1f}MB peak vs {base['peak_mb']:.1f}MB baseline")
+
+    return regressions
+
+
+# ----- Sub Functions --------------------------------------------------------------------------------
+
+def scale_scope(session, week_df, scale):
+    '''
+    The player-plays a scale covers: one play, every play of one game or the whole week.
+
+    Parameters:
+        'session' - DataSession - Shared tables of the fixtures
+        'week_df' - Dataframe - The fixture week
+        'scale' - String - 'play', 'game' or 'week'
+    Returns:
+        'scope' - Dictionary - week_df (only the scope's plays), scout_pass_rush (its pass rushers) and plays (number
+                               of plays)
+    '''
+    scout_pass_rush = session.scout_pass_rush
+
+    if scale == 'play':
+        first = scout_pass_rush.iloc[0]
+        keep = (scout_pass_rush.game == first.game) & (scout_pass_rush.play == first.play)
+    elif scale == 'game':
+        keep = scout_pass_rush.game == scout_pass_rush.game.iloc[0]
+    else:
+        keep = np.ones(len(scout_pass_rush), dtype = bool)
+
+    scout_pass_rush = scout_pass_rush[keep]
+
+    scope_plays = pd.MultiIndex.from_frame(scout_pass_rush[['game', 'play']].drop_duplicates())
+    scope_week = week_df[pd.MultiIndex.from_frame(week_df[['game', 'play']]).isin(scope_plays)]
+
+    scope = {'week_df':acquire.index_week(scope_week),
+             'scout_pass_rush':scout_pass_rush,
+             'plays':len(scope_plays)}
+
+    return scope
+
+
+def stage_benchmark(stage, session, scope):
+    '''
+    Makes the function that runs a stage once over a scope.  Inputs of a stage (e.g. the built frames for
+    build_metrics) are prepared here, outside of the timing.
+
+    Parameters:
+        'stage' - String - See STAGES
+        'session' - DataSession - Shared tables of the fixtures
+        'scope' - Dictionary - Output of scale_scope
+    Returns:
+        'benchmark' - Function - Runs the stage once
+    '''
+    week_df = scope['week_df']
+    scout_pass_rush = scope['scout_pass_rush']
+    scout_pass_block = session.scout_pass_block
+    players_df = session.players
+
+    entries = list(zip(scout_pass_rush.game, scout_pass_rush.play, scout_pass_rush.nflId))
+
+    # Not cached, so every repeat builds the frames
+    def build_frames():
+        return [nfl.build_play_frames(game, play, week_df, nflId, scout_pass_block, 'pass_rusher', v_type = 'PvP', cache = None)
+                for game, play, nflId in entries]
+
+    if stage == 'acquire.week':
+        return lambda: acquire.week(1, use_cache = False)
+
+    if stage == 'build_play_frames':
+        return build_frames
+
+    if stage == 'build_metrics':
+        built = build_frames()
+        return lambda: [metrics.build_metrics(analysis_frames.copy(), point_of_scrimmage, players_df)
+                        for qb_hold_time, point_of_scrimmage, analysis_frames in built]
+
+    if stage == 'pull_metrics':
+        built = [(qb_hold_time, metrics.build_metrics(analysis_frames, point_of_scrimmage, players_df))
+                 for qb_hold_time, point_of_scrimmage, analysis_frames in build_frames()]
+        return lambda: [use_metrics.pull_metrics(analysis_frames, qb_hold_time) for qb_hold_time, analysis_frames in built]
+
+    if stage == 'play_player_metrics_builder':
+        return lambda: use_metrics.play_player_metrics_builder(scout_pass_rush, scout_pass_block, 'PvP', players_df, week_df)
+
+    if stage == 'week_pass_rush_results':
+        # End to end: reads the week csv, then builds and aggregates every player-play
+        return lambda: use_metrics.week_pass_rush_results(1, acquire.DataSession(use_cache = False), 'PvP', False, 'loop', False)
+
+    raise ValueError(f'Unknown stage {stage}, stages are: {STAGES}')
+
+
+def measure(benchmark, plays, repeat):
+    '''
+    Times a benchmark (best of repeat runs) and then traces its peak memory in one more run, as tracing slows it down.
+    Printing from the pipeline is silenced.
+
+    Parameters:
+        'benchmark' - Function - Runs the stage once
+        'plays' - Integer - Plays the stage covers
+        'repeat' - Integer - Timed runs
+    Returns:
+        'result' - Dictionary - seconds, peak_mb, plays and plays_per_second
+    '''
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds = np.inf
+        for i in range(repeat):
+            start = time.perf_counter()
+            benchmark()
+            seconds = min(seconds, time.perf_counter() - start)
+
+        tracemalloc.start()
+        benchmark()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    result = {'seconds':round(seconds, 6),
+              'peak_mb':round(peak / 2**20, 3),
+              'plays':plays,
+              'plays_per_second':round(plays / seconds, 3) if seconds > 0 else None}
+
+    return result
+
+
+# ----- Support Functions -----------------------------------------------------------------------------
+
+def format_result(name, result):
+    '''
+    One line summary of a benchmark result.
+    '''
+    return f"{name:<40} {result['seconds']:>10.4f}s {result['peak_mb']:>9.1f}MB {result['plays_per_second']:>10.1f} plays/s"
+
+
+def environment():
+    '''
+    Versions the results were measured with, stored alongside them.
+    '''
+    return {'python':platform.python_version(),
+            'pandas':pd.__version__,
+            'numpy':np.__version__,
+            'machine':platform.machine(),
+            'processor':platform.processor(),
+            'cpus':os.cpu_count()}
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Benchmark the pass rush pipeline on synthetic fixtures.')
+    parser.add_argument('--stages', nargs = '+', default = STAGES, choices = STAGES)
+    parser.add_argument('--scales', nargs = '+', default = SCALES, choices = SCALES)
+    parser.add_argument('--repeat', type = int, default = 3, help = 'timed runs per benchmark (best is kept)')
+    parser.add_argument('--output', help = 'write the results JSON here')
+    parser.add_argument('--baseline', default = BASELINE_PATH, help = 'baseline JSON to compare with')
+    parser.add_argument('--save-baseline', action = 'store_true', help = 'store the results as the baseline')
+    parser.add_argument('--tolerance', type = float, default = 0.5, help = 'allowed fractional slowdown before flagging')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.stages, args.scales, args.repeat)
+
+    report = {'environment':environment(), 'results':results}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent = 2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent = 2)
+        print(f'Baseline saved to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline} to compare with (run with --save-baseline to store one)')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare_with_baseline(results, baseline['results'], args.tolerance)
+
+    if regressions:
+        print(f'{len(regressions)} regression(s) against {args.baseline}:')
+        for regression in regressions:
+            print(f'  {regression}')
+        return 1
+
+    print(f'No regressions against {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,6 +6,10 @@
 - The pff scouting reports are seperated by role (pass rushers & pass blockers; receivers and quarterbacks not analyzed for now)
 """
 
+import os
+import json
+from functools import cached_property
+
 import pandas as pd
 import numpy as np
 
@@ -13,6 +17,91 @@ import warnings
 warnings.filterwarnings("ignore")
 
 
+# Location of the downloaded Kaggle csvs and of the cleaned, columnar copies of the weekly tracking data (a cache
+# folder inside DATA_DIR unless CACHE_DIR is set, so pointing DATA_DIR at another dataset moves its cache with it)
+DATA_DIR = "data"
+CACHE_DIR = None
+
+# Bump whenever the cleaning done in 'clean_week' changes so that stale cached weeks are rebuilt
+WEEK_CACHE_VERSION = 1
+
+# Compact schemas (compact = True) - categorical strings, int32 ids, int16 frames, int8 flags and float32 kinematics.
+# The tracking csvs record kinematics to 2 decimals, which float32 holds exactly enough to restore, so 'play_rows'
+# turns each play back into the original float64 values before any metric is built.  Play-level metrics from a
+# compact build therefore match the float64 build to within COMPACT_METRIC_TOLERANCE (one unit in the 4th decimal
+# the metrics are rounded to).
+TRACKING_DECIMALS = 2
+COMPACT_METRIC_TOLERANCE = 1e-4
+
+# Football events after the snap that do not end the pass rush (any other event does)
+NON_END_EVENTS = [
+    "None",
+    "autoevent_ballsnap",
+    "autoevent_passforward",
+    "play_action",
+    "first_contact",
+    "shift",
+    "man_in_motion",
+    "line_set",
+]
+
+# Why a player-play could not be built, in the order they are checked (the first that applies is recorded)
+FAILURE_REASONS = {
+    "play_not_tracked": "No tracking rows for the play",
+    "no_snap_event": "No ball_snap event",
+    "no_end_event": "No end event after the snap",
+    "empty_window": "No analysis frames between the snap and end events",
+    "player_type_conflict": "Pass rusher is also a pass blocker in the play",
+    "player_not_tracked": "No tracking rows for the player in the pass rush window",
+    "no_player_weight": "Player missing from players or without a weight",
+    "build_error": "Building the frames or metrics raised an error",
+}
+
+FAILURE_COLUMNS = ["entry", "game", "play", "nflId", "reason", "detail"]
+
+COMPACT_WEEK_DTYPES = {
+    "game": "int32",
+    "play": "int32",
+    "nflId": "int32",
+    "frame": "int16",
+    "x": "float32",
+    "y": "float32",
+    "s": "float32",
+    "a": "float32",
+    "dis": "float32",
+    "o": "float32",
+    "dir": "float32",
+    "event": "category",
+}
+
+COMPACT_SCOUTING_DTYPES = {
+    "gameId": "int32",
+    "playId": "int32",
+    "nflId": "int32",
+    "pff_role": "category",
+    "pff_positionLinedUp": "category",
+}
+
+COMPACT_SCOUT_DTYPES = {
+    "game": "int32",
+    "play": "int32",
+    "nflId": "int32",
+    "position": "category",
+    "hit": "int8",
+    "hurry": "int8",
+    "sack": "int8",
+    "pressure": "int8",
+    "rusher_blocked": "int32",
+    "block_type": "category",
+    "backfield_block": "int8",
+    "beaten_by_pass_rusher": "int8",
+    "hit_allowed": "int8",
+    "hurry_allowed": "int8",
+    "sack_allowed": "int8",
+    "block_fail": "int8",
+}
+
+
 def games():
     """
     Acquires games and renames columns to be common across all data sources.
@@ -20,7 +109,7 @@ def games():
     Returns:
         'games' - Dataframe
     """
-    games = pd.read_csv("data/games.csv")
+    games = pd.read_csv(f"{DATA_DIR}/games.csv")
 
     games = games.rename(columns={"gameId": "game"})
 
@@ -36,7 +125,7 @@ def players():
     Returns:
         'players' - Dataframe
     """
-    players = pd.read_csv("data/players.csv")
+    players = pd.read_csv(f"{DATA_DIR}/players.csv")
 
     # Changes height to integer (inches)
     players["height"] = players.height.str[0].astype(int) * 12 + players.height.str[2:].astype(int)
@@ -47,14 +136,17 @@ def players():
     return players
 
 
-def plays():
+def plays(game_info=None):
     """
     Acquires play data and cleans up while adding more relevant features.
 
+    Parameters:
+        'game_info' - Dataframe - Output of 'games' (read from disk if not given)
+
     Returns:
         'plays' - Dataframe
     """
-    plays = pd.read_csv("data/plays.csv")
+    plays = pd.read_csv(f"{DATA_DIR}/plays.csv")
 
     # Create better yardage metric - yards_to_score - which is the distance to the end zone for the offense
     plays["yards_to_score"] = np.where(
@@ -72,7 +164,8 @@ def plays():
     )
 
     # Change home and visitor score to offense and defense score
-    game_info = games()
+    if game_info is None:
+        game_info = games()
     plays = plays.merge(
         game_info[["game", "homeTeamAbbr", "visitorTeamAbbr"]],
         left_on="gameId",
@@ -162,27 +255,75 @@ def plays():
     return plays
 
 
-def week(week_num):
+def week(week_num, use_cache=True, indexed=False, compact=False):
     """
     Creates a dataframe for all games and plays for the week given in the parameters.
+    The first time a week is read, the cleaned dataframe is also written to a columnar (parquet) cache that later
+    calls load from instead of re-parsing the csv.  The cache is rebuilt whenever the source csv changes.
     
     Parameters:
-        'week_num' - Integer - The integer number for the week (1-8)
+        'week_num' - Integer - The integer number for the week (a weekN.csv in DATA_DIR)
+        'use_cache' - Boolean - Whether to read from/write to the columnar cache (see cache_dir)
+        'indexed' - Boolean - Return a TrackingStore (sorted, with a (game, play) offset index) instead
+        'compact' - Boolean - Use the memory-compact dtypes in COMPACT_WEEK_DTYPES (reports memory before and after)
 
     Returns:
         'week' - Dataframe
     """
-    # Ensure week number is valid
-    if week_num not in [1, 2, 3, 4, 5, 6, 7, 8]:
-        print("Week number not valid.  Week data is for weeks 1 through 8 only.")
-        return
+    # Ensure there is tracking data for the week
+    csv_path = week_csv_path(week_num)
+
+    # Load the already cleaned week if the cache matches the current csv
+    week = read_week_cache(week_num, csv_path) if use_cache else None
 
-    # Format the file path for the desired week
-    week = f"data/week{week_num}.csv"
+    if week is None:
+        # Create the base dataframe
+        week = pd.read_csv(csv_path)
+
+        # Drop, rename, fill and retype
+        week = clean_week(week)
+
+        if use_cache:
+            write_week_cache(week_num, csv_path, week)
+
+    if compact:
+        week = compact_dtypes(week, COMPACT_WEEK_DTYPES, label=f"Week {week_num}")
+
+    if indexed:
+        week = index_week(week)
+
+    return week
 
-    # Create the base dataframe
-    week = pd.read_csv(week)
 
+def week_csv_path(week_num):
+    """
+    Gets the path of a week's tracking csv, which any number of weeks may have (8 in the Kaggle data, more in a
+    synthetic season).
+
+    Parameters:
+        'week_num' - Integer - The integer number for the week
+
+    Returns:
+        'csv_path' - String - Path of weekN.csv in DATA_DIR (a FileNotFoundError is raised if there is none)
+    """
+    csv_path = f"{DATA_DIR}/week{week_num}.csv"
+
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"Week number not valid.  No tracking data for week {week_num} at {csv_path}.")
+
+    return csv_path
+
+
+def clean_week(week):
+    """
+    Applies the standard cleaning to raw weekly tracking data.
+
+    Parameters:
+        'week' - Dataframe - Raw rows from a weekN.csv file
+
+    Returns:
+        'week' - Dataframe - Cleaned tracking data
+    """
     # Strip unecessary columns, rename fill NaNs (all for the 'football' and retype)
     week = (
         week.drop(columns=["time", "playDirection", "team", "jerseyNumber"])
@@ -200,15 +341,419 @@ def week(week_num):
     return week
 
 
-def scout_pass_rush():
+def iter_week_plays(week_num, chunksize=200000):
+    """
+    Streams a week's tracking csv in chunks and yields each play, already cleaned, as soon as its last row has been
+    read.  Only the current chunk and the unfinished play at its end are held in memory, rather than the whole week.
+    Note: Relies on each play's rows being together in the csv, as they are in the Kaggle files (ordered by game,
+    play, player and frame).
+
+    Parameters:
+        'week_num' - Integer - The integer number for the week (a weekN.csv in DATA_DIR)
+        'chunksize' - Integer - Number of csv rows to read at a time
+
+    Yields:
+        'game' - Integer - Game ID (unique)
+        'play' - Integer - Play ID (unique to game only)
+        'play_frames_df' - Dataframe - Cleaned tracking rows of the play (same format as 'week')
+    """
+    # Ensure there is tracking data for the week
+    csv_path = week_csv_path(week_num)
+
+    # Rows of the last play of the previous chunk, which may continue into the next chunk
+    unfinished = None
+
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        chunk = clean_week(chunk)
+
+        if unfinished is not None:
+            chunk = pd.concat([unfinished, chunk], ignore_index=True)
+
+        # Every play before the chunk's last play is complete
+        starts, stops = play_boundaries(chunk)
+
+        for start, stop in zip(starts[:-1], stops[:-1]):
+            yield chunk.game.iat[start], chunk.play.iat[start], chunk.iloc[start:stop]
+
+        unfinished = chunk.iloc[starts[-1] :]
+
+    # The file's final play
+    if unfinished is not None and len(unfinished) > 0:
+        yield unfinished.game.iat[0], unfinished.play.iat[0], unfinished
+
+
+def play_boundaries(week_df):
+    """
+    Finds the row where each run of a (game, play) starts and stops in tracking data whose plays are contiguous.
+
+    Parameters:
+        'week_df' - Dataframe - Tracking rows, grouped by play
+
+    Returns:
+        'starts' - Array of Integers - First row of each play
+        'stops' - Array of Integers - One past the last row of each play
+    """
+    games = week_df.game.to_numpy()
+    plays = week_df.play.to_numpy()
+
+    # A play starts wherever the (game, play) pair changes
+    play_change = np.ones(len(week_df), dtype=bool)
+    play_change[1:] = (games[1:] != games[:-1]) | (plays[1:] != plays[:-1])
+
+    starts = np.flatnonzero(play_change)
+    stops = np.append(starts[1:], len(week_df))
+
+    return starts, stops
+
+
+# ----- Week Cache Functions -------------------------------------------------------------------------
+
+def csv_fingerprint(csv_path):
+    """
+    Creates a cheap fingerprint of a source csv (size and modification time) used to tell if a cache is stale.
+
+    Parameters:
+        'csv_path' - String - Path to the source csv
+
+    Returns:
+        'fingerprint' - Dictionary - Identifying details of the csv as it is currently on disk
+    """
+    stats = os.stat(csv_path)
+
+    fingerprint = {
+        "source": os.path.basename(csv_path),
+        "size": stats.st_size,
+        "mtime_ns": stats.st_mtime_ns,
+        "version": WEEK_CACHE_VERSION,
+    }
+
+    return fingerprint
+
+
+def cache_dir():
+    """
+    Gets the folder of the week cache, resolved when it is used: CACHE_DIR if set, otherwise a cache folder in DATA_DIR.
+
+    Returns:
+        'cache_dir' - String - Path of the cache folder
+    """
+    return CACHE_DIR if CACHE_DIR is not None else os.path.join(DATA_DIR, "cache")
+
+
+def week_cache_paths(week_num):
+    """
+    Gets the locations of the cached data and its fingerprint for a given week.
+
+    Parameters:
+        'week_num' - Integer - The integer number for the week (a weekN.csv in DATA_DIR)
+
+    Returns:
+        'data_path' - String - Path of the parquet file holding the cleaned week
+        'meta_path' - String - Path of the json file holding the fingerprint of the csv the cache was built from
+    """
+    data_path = os.path.join(cache_dir(), f"week{week_num}.parquet")
+    meta_path = os.path.join(cache_dir(), f"week{week_num}.json")
+
+    return data_path, meta_path
+
+
+def read_week_cache(week_num, csv_path):
+    """
+    Loads a cleaned week from the cache if it exists and was built from the current version of the csv.
+
+    Parameters:
+        'week_num' - Integer - The integer number for the week (a weekN.csv in DATA_DIR)
+        'csv_path' - String - Path to the source csv
+
+    Returns:
+        'week' - Dataframe or None - Cleaned week, or None if there is no valid cache
+    """
+    data_path, meta_path = week_cache_paths(week_num)
+
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None
+
+    with open(meta_path) as f:
+        cached_fingerprint = json.load(f)
+
+    # Stale cache - the csv (or the cleaning) has changed since it was written
+    if cached_fingerprint != csv_fingerprint(csv_path):
+        return None
+
+    try:
+        week = pd.read_parquet(data_path)
+    except (ImportError, OSError, ValueError):
+        return None
+
+    return week
+
+
+def write_week_cache(week_num, csv_path, week):
+    """
+    Writes a cleaned week to the cache along with the fingerprint of the csv it came from.
+    Caching is skipped (with a message) if no parquet engine (pyarrow or fastparquet) is installed.
+
+    Parameters:
+        'week_num' - Integer - The integer number for the week (a weekN.csv in DATA_DIR)
+        'csv_path' - String - Path to the source csv
+        'week' - Dataframe - Cleaned week to store
+    """
+    data_path, meta_path = week_cache_paths(week_num)
+
+    os.makedirs(cache_dir(), exist_ok=True)
+
+    # Write to temporary files first so an interrupted write never leaves a cache that looks valid (named by process,
+    # as worker processes building games of the same week can write its cache at the same time)
+    tmp = f".{os.getpid()}.tmp"
+
+    try:
+        week.to_parquet(data_path + tmp, index=False)
+    except (ImportError, TypeError, ValueError) as e:
+        print(f"Week {week_num} not cached: {e}")
+        return
+
+    with open(meta_path + tmp, "w") as f:
+        json.dump(csv_fingerprint(csv_path), f)
+
+    os.replace(data_path + tmp, data_path)
+    os.replace(meta_path + tmp, meta_path)
+
+
+# ----- Indexed Tracking Store -----------------------------------------------------------------------
+
+class TrackingStore(pd.DataFrame):
+    """
+    Weekly tracking data sorted once by (game, play, nflId, frame), along with an offset index of where each play's
+    rows start and stop.  It is still the week dataframe, so it can be passed anywhere a 'week_df' is expected, but a
+    play's rows come back as a contiguous slice (see 'play_rows') instead of from boolean scans of the whole week.
+
+    Attributes:
+        'play_offsets' - Dictionary - {(game, play): (start_row, stop_row)}
+    """
+
+    _metadata = ["play_offsets"]
+
+    @property
+    def _constructor(self):
+        # Anything derived from the store (slices, merges, etc.) is a plain dataframe, since the offsets would no
+        # longer line up with its rows
+        return pd.DataFrame
+
+
+def index_week(week_df):
+    """
+    Sorts a week by (game, play, nflId, frame) and records the row offsets of each play.
+
+    Parameters:
+        'week_df' - Dataframe - Weekly frame by frame data for each play (output of 'week')
+
+    Returns:
+        'store' - TrackingStore - The sorted week with its (game, play) offset index
+    """
+    # Stable sort so rows keep their original relative order within each player's frames
+    week_df = week_df.sort_values(["game", "play", "nflId", "frame"], kind="mergesort").reset_index(drop=True)
+
+    # Find the first and last rows of each play
+    starts, stops = play_boundaries(week_df)
+
+    store = TrackingStore(week_df)
+    store.play_offsets = dict(
+        zip(
+            zip(week_df.game.to_numpy()[starts].tolist(), week_df.play.to_numpy()[starts].tolist()),
+            zip(starts.tolist(), stops.tolist()),
+        )
+    )
+
+    return store
+
+
+def play_rows(week_df, game, play):
+    """
+    Gets all of the tracking rows for a given play.  Uses the offset index when handed a TrackingStore, otherwise
+    falls back to filtering the whole week.
+
+    Parameters:
+        'week_df' - Dataframe or TrackingStore - Weekly frame by frame data for each play
+        'game' - Integer - Game ID (unique)
+        'play' - Integer - Play ID (unique to game only)
+
+    Returns:
+        'play_frames_df' - Dataframe - Tracking rows of the play
+    """
+    play_offsets = getattr(week_df, "play_offsets", None)
+
+    if play_offsets is None:
+        play_frames_df = week_df[week_df.game == game][week_df.play == play]
+
+    else:
+        start, stop = play_offsets.get((game, play), (0, 0))
+
+        # Copy so callers can add columns without touching the store
+        play_frames_df = week_df.iloc[start:stop].copy()
+
+    # Compact weeks hold kinematics as float32 - hand back the original float64 values
+    play_frames_df = restore_precision(play_frames_df)
+
+    return play_frames_df
+
+
+# ----- Play Window Functions ------------------------------------------------------------------------
+
+def build_play_windows(week_df, drop_last_frame=True):
+    """
+    Finds the pass rush window of every play in one vectorized pass over the ball rows, using the same rules as
+    determine_pertinent_frames: the window ends at the first event after the first ball_snap that is not in
+    NON_END_EVENTS (or another ball_snap), and starts at the last ball_snap before that.  Like
+    determine_pertinent_frames, frames are counted from the play's first ball row.
+
+    Parameters:
+        'week_df' - Dataframe - Tracking rows of any number of plays (a week, or a single play)
+        'drop_last_frame' - Boolean - Leave out each play's last ball row, as nfl_frame_builder does (nfl_functions
+                                      keeps it)
+
+    Returns:
+        'play_windows' - Dataframe - One row per (game, play) with ball rows: snap_frame, end_frame, qb_hold_time,
+                                     valid (False when there is no snap or end event - frames are then 0 and
+                                     qb_hold_time NaN) and has_snap (whether there is a ball_snap at all)
+    """
+    keys = ["game", "play"]
+
+    ball = pd.DataFrame(week_df.loc[week_df.nflId == 0, keys + ["event"]])
+
+    # Plays, numbered in the order they appear
+    play_windows = ball.drop_duplicates(keys)[keys].reset_index(drop=True)
+    play_number = ball.groupby(keys, sort=False).ngroup().to_numpy()
+
+    if drop_last_frame:
+        kept = ball.duplicated(keys, keep="last").to_numpy()
+        ball = ball[kept]
+        play_number = play_number[kept]
+
+    position = ball.groupby(keys, sort=False).cumcount().to_numpy()
+    snap = (ball.event == "ball_snap").to_numpy()
+
+    # First snap, then the first end event after it, then the last snap before that
+    first_snap = np.full(len(play_windows), np.inf)
+    np.minimum.at(first_snap, play_number[snap], position[snap])
+
+    end = ~snap & ~ball.event.isin(NON_END_EVENTS).to_numpy() & (position > first_snap[play_number])
+    end_position = np.full(len(play_windows), np.inf)
+    np.minimum.at(end_position, play_number[end], position[end])
+
+    last_snap = snap & (position < end_position[play_number])
+    snap_position = np.full(len(play_windows), -np.inf)
+    np.maximum.at(snap_position, play_number[last_snap], position[last_snap])
+
+    valid = np.isfinite(end_position)
+
+    play_windows["snap_frame"] = np.where(valid, snap_position + 1, 0).astype(int)
+    play_windows["end_frame"] = np.where(valid, end_position + 1, 0).astype(int)
+    play_windows["qb_hold_time"] = np.where(valid, (play_windows.end_frame - play_windows.snap_frame) / 10, np.nan)
+    play_windows["valid"] = valid
+    play_windows["has_snap"] = np.isfinite(first_snap)
+
+    return play_windows
+
+
+def play_window_lookup(play_windows):
+    """
+    Turns a play window table into a dictionary of its valid plays, for quick per-play lookups.
+
+    Parameters:
+        'play_windows' - Dataframe - Output of build_play_windows
+
+    Returns:
+        'window_lookup' - Dictionary - (game, play) to (snap_frame, end_frame), valid plays only
+    """
+    valid = play_windows[play_windows.valid]
+
+    window_lookup = {
+        (game, play): (snap_frame, end_frame)
+        for game, play, snap_frame, end_frame in zip(valid.game, valid.play, valid.snap_frame, valid.end_frame)
+    }
+
+    return window_lookup
+
+
+# ----- Compact Schema Functions ---------------------------------------------------------------------
+
+def compact_dtypes(df, dtypes, label="Table"):
+    """
+    Retypes a dataframe to a compact schema and reports its memory use before and after.
+
+    Parameters:
+        'df' - Dataframe - Table to retype
+        'dtypes' - Dictionary - {column: dtype}; columns not in the table are ignored
+        'label' - String - Name of the table for the memory report
+
+    Returns:
+        'df' - Dataframe - The retyped table
+    """
+    memory_before = df.memory_usage(deep=True).sum()
+
+    df = df.astype({column: dtype for column, dtype in dtypes.items() if column in df.columns})
+
+    memory_after = df.memory_usage(deep=True).sum()
+
+    print(f"{label} memory: {memory_before / 2**20:,.1f} MB -> {memory_after / 2**20:,.1f} MB")
+
+    return df
+
+
+def restore_precision(play_frames_df):
+    """
+    Converts float32 (compact) tracking columns back to the float64 values read from the csv by rounding to the
+    TRACKING_DECIMALS the tracking data is recorded with.
+
+    Parameters:
+        'play_frames_df' - Dataframe - Tracking rows (typically a single play)
+
+    Returns:
+        'play_frames_df' - Dataframe - The same rows with float64 kinematics
+    """
+    float32_columns = play_frames_df.select_dtypes("float32").columns
+
+    if len(float32_columns) == 0:
+        return play_frames_df
+
+    play_frames_df = play_frames_df.astype({column: "float64" for column in float32_columns})
+    play_frames_df[float32_columns] = play_frames_df[float32_columns].round(TRACKING_DECIMALS)
+
+    return play_frames_df
+
+
+def scouting(compact=False):
+    """
+    Acquires the raw pff scouting data that the pass rush and pass block tables are built from.
+
+    Parameters:
+        'compact' - Boolean - Use the memory-compact dtypes in COMPACT_SCOUTING_DTYPES
+
+    Returns:
+        'scout' - Dataframe
+    """
+    scout = pd.read_csv(f"{DATA_DIR}/pffScoutingData.csv")
+
+    if compact:
+        scout = compact_dtypes(scout, COMPACT_SCOUTING_DTYPES, label="Scouting")
+
+    return scout
+
+
+def scout_pass_rush(scout=None, compact=False):
     """
     Aquires scout data then isolates a player who rushes the passer on a given play and determines if they were able to pressure the qb (hit, hury or sack)
     Note: Does not include those in coverage who then rush the passer.
 
+    Parameters:
+        'scout' - Dataframe - Raw scouting data from 'scouting' (read from disk if not given)
+        'compact' - Boolean - Use the memory-compact dtypes in COMPACT_SCOUT_DTYPES
+
     Returns:
         'scout_pass_rush' - Dataframe
     """
-    scout = pd.read_csv("data/pffScoutingData.csv")
+    if scout is None:
+        scout = scouting()
 
     # Isolate pass rushers
     scout_pass_rush = scout[scout.pff_role == "Pass Rush"]
@@ -244,17 +789,25 @@ def scout_pass_rush():
         scout_pass_rush.hit + scout_pass_rush.hurry + scout_pass_rush.sack
     )
 
+    if compact:
+        scout_pass_rush = compact_dtypes(scout_pass_rush, COMPACT_SCOUT_DTYPES, label="Pass rush scouting")
+
     return scout_pass_rush
 
 
-def scout_pass_block():
+def scout_pass_block(scout=None, compact=False):
     """
     Aquires scout data then filters players who make or attempt a block at some point during a play, along with if their block fails (beaten, hit, hurry or sack allowed)
 
+    Parameters:
+        'scout' - Dataframe - Raw scouting data from 'scouting' (read from disk if not given)
+        'compact' - Boolean - Use the memory-compact dtypes in COMPACT_SCOUT_DTYPES
+
     Returns:
         'scout_pass_block' - Dataframe
     """
-    scout = pd.read_csv("data/pffScoutingData.csv")
+    if scout is None:
+        scout = scouting()
 
     # Isolate pass blockers (includes those with role 'pass block' taht do not engage a defender, as well as those receivers who block at some point in the play)
     scout_pass_block = scout[
@@ -262,8 +815,9 @@ def scout_pass_block():
         | (scout.pff_nflIdBlockedPlayer.notnull() == True)
     ]
 
-    # Replace one null value
-    scout_pass_block.at[71367, "pff_backFieldBlock"] = 0.0
+    # Replace one null value (row 71367 of the Kaggle file - other copies of the data may not have it)
+    if 71367 in scout_pass_block.index:
+        scout_pass_block.at[71367, "pff_backFieldBlock"] = 0.0
 
     # Fill in missing blocked player, blocktype and backfield block values
     scout_pass_block = scout_pass_block.fillna(
@@ -325,21 +879,25 @@ def scout_pass_block():
         + scout_pass_block.sack_allowed
     )
 
+    if compact:
+        scout_pass_block = compact_dtypes(scout_pass_block, COMPACT_SCOUT_DTYPES, label="Pass block scouting")
+
     return scout_pass_block
 
 
-def get_players_in_play(game, play):
+def get_players_in_play(game, play, session=None):
     """
     Gets all of the NFL player ids along with their role for a given play.
 
     Parameters:
         'game' - Integer - Game ID (unique)
         'play' - Integer - Play ID (unique to game only)
+        'session' - DataSession - Shared tables to use instead of re-reading the scouting csv
 
     Returns:
         'play_players' - Dataframe 
     """
-    scout_players = pd.read_csv("data/pffScoutingData.csv")
+    scout_players = get_session(session).scouting
 
     play_players = scout_players[
         ["gameId", "playId", "nflId", "pff_role", "pff_positionLinedUp"]
@@ -361,36 +919,494 @@ def get_players_in_play(game, play):
     return play_players
 
 
-def all_plays():
+def all_plays(session=None):
     """
     Creates a data object with all plays from the 8 weeks.
     
+    Parameters:
+        'session' - DataSession - Shared tables to use instead of re-reading the scouting csv
 
     Returns:
         'game_play_players' - Dictionary - Dict of game:plays:players for the 8-weeks of season
     """
     # Load the plays dataframe
-    all_plays = pd.read_csv("data/pffScoutingData.csv")
+    all_plays = get_session(session).scouting
+
+    # Gather each play's players in a single pass, keeping games, plays and players in order of first appearance
+    play_players = all_plays.groupby(["gameId", "playId"], sort=False).nflId.agg(list)
 
-    # Create the data structure to return {game: [{play: [players]}]}
+    # Create the data structure to return {game: {play: [players]}}
     game_play_players = {}
 
-    # Loop through all of the games to pull out their plays and the players invovled
-    for game in all_plays.gameId.unique():
-        game_play_list = {}
+    for (game, play), players in play_players.items():
+        game_play_players.setdefault(game, {})[play] = players
 
-        for play in all_plays[all_plays.gameId == game].playId.unique():
-            play_player_dict = {}
-            play_player_list = []
+    return game_play_players
 
-            for player in all_plays[all_plays.playId == play][
-                all_plays.gameId == game
-            ].nflId:
-                play_player_list.append(player)
 
-            play_player_dict[play] = play_player_list
-            game_play_list.update(play_player_dict)
+def all_plays_index(session=None):
+    """
+    Creates a compact, array-backed version of 'all_plays' for callers that only need lookups.
+    Games are sorted, plays are sorted within each game, and the offset arrays mark where each game's plays and each
+    play's players start and stop:
+        - plays of games[g]      -> plays[game_offsets[g]:game_offsets[g + 1]]
+        - players of plays[p]    -> nflIds[player_offsets[p]:player_offsets[p + 1]]
 
-        game_play_players[game] = game_play_list
+    Parameters:
+        'session' - DataSession - Shared tables to use instead of re-reading the scouting csv
 
-    return game_play_players
+    Returns:
+        'play_index' - Dictionary of Arrays - 'games', 'game_offsets', 'plays', 'player_offsets', 'nflIds'
+    """
+    scout = get_session(session).scouting[["gameId", "playId", "nflId"]]
+
+    # Stable sort so players stay in the order they appear in the scouting data
+    scout = scout.sort_values(["gameId", "playId"], kind="mergesort")
+
+    game_ids = scout.gameId.to_numpy()
+    play_ids = scout.playId.to_numpy()
+
+    # Rows where a new game, or a new play, begins
+    new_game = np.ones(len(scout), dtype=bool)
+    new_game[1:] = game_ids[1:] != game_ids[:-1]
+    new_play = new_game.copy()
+    new_play[1:] |= play_ids[1:] != play_ids[:-1]
+
+    play_starts = np.flatnonzero(new_play)
+
+    play_index = {
+        "games": game_ids[new_game],
+        "game_offsets": np.append(np.flatnonzero(new_game[play_starts]), len(play_starts)),
+        "plays": play_ids[play_starts],
+        "player_offsets": np.append(play_starts, len(scout)),
+        "nflIds": scout.nflId.to_numpy(),
+    }
+
+    return play_index
+
+
+def game_plays_from_index(play_index, game):
+    """
+    Looks up all of the plays of a game in the output of 'all_plays_index'.
+
+    Parameters:
+        'play_index' - Dictionary of Arrays - Output of 'all_plays_index'
+        'game' - Integer - Game ID (unique)
+
+    Returns:
+        'plays' - Array - Play ids of the game (empty if the game is not found)
+    """
+    games = play_index["games"]
+    g = np.searchsorted(games, game)
+
+    if g == len(games) or games[g] != game:
+        return play_index["plays"][:0]
+
+    game_offsets = play_index["game_offsets"]
+
+    return play_index["plays"][game_offsets[g] : game_offsets[g + 1]]
+
+
+def play_players_from_index(play_index, game, play):
+    """
+    Looks up all of the players of a play in the output of 'all_plays_index'.
+
+    Parameters:
+        'play_index' - Dictionary of Arrays - Output of 'all_plays_index'
+        'game' - Integer - Game ID (unique)
+        'play' - Integer - Play ID (unique to game only)
+
+    Returns:
+        'nflIds' - Array - Ids of the players in the play (empty if the play is not found)
+    """
+    games = play_index["games"]
+    g = np.searchsorted(games, game)
+
+    if g == len(games) or games[g] != game:
+        return play_index["nflIds"][:0]
+
+    # Binary search for the play within the game's (sorted) plays
+    first_play, last_play = play_index["game_offsets"][g : g + 2]
+    p = first_play + np.searchsorted(play_index["plays"][first_play:last_play], play)
+
+    if p == last_play or play_index["plays"][p] != play:
+        return play_index["nflIds"][:0]
+
+    player_offsets = play_index["player_offsets"]
+
+    return play_index["nflIds"][player_offsets[p] : player_offsets[p + 1]]
+
+
+# ----- Matchup Index Functions ----------------------------------------------------------------------
+
+def build_matchup_index(scout_pass_block):
+    """
+    Indexes who blocked whom in the pass block scouting data once, so matchups are lookups rather than scans of
+    scout_pass_block.  Both directions are kept as dictionaries of lists and as CSR arrays, where the ids of keys[k]
+    are ids[offsets[k]:offsets[k + 1]]:
+        - (game, play, rusher)  -> blockers, in scouting order    'rusher_blockers' / 'rusher_keys', 'rusher_offsets', 'blocker_ids'
+        - (game, play, blocker) -> rushers blocked (0 for none)   'blocker_rushers' / 'blocker_keys', 'blocker_offsets', 'rusher_ids'
+        - (game, play)          -> (blocker, rusher) pairs        'play_matchups'
+
+    Parameters:
+        'scout_pass_block' - Dataframe - Pass blocker PFF scouting data
+
+    Returns:
+        'matchup_index' - Dictionary - The lookups listed above
+    """
+    matchups = scout_pass_block[["game", "play", "nflId", "rusher_blocked"]]
+
+    # Blocked nobody (rusher_blocked = 0) stays in as rusher 0, as a scan of rusher_blocked would find it
+    rusher_keys, rusher_offsets, blocker_ids = csr_groups(matchups, ["game", "play", "rusher_blocked"], "nflId")
+    blocker_keys, blocker_offsets, rusher_ids = csr_groups(matchups, ["game", "play", "nflId"], "rusher_blocked")
+
+    play_matchups = {}
+    for game, play, blocker, rusher in zip(matchups.game, matchups.play, matchups.nflId, matchups.rusher_blocked):
+        play_matchups.setdefault((game, play), []).append((blocker, rusher))
+
+    matchup_index = {
+        "rusher_blockers": csr_lists(rusher_keys, rusher_offsets, blocker_ids),
+        "rusher_keys": rusher_keys,
+        "rusher_offsets": rusher_offsets,
+        "blocker_ids": blocker_ids,
+        "blocker_rushers": csr_lists(blocker_keys, blocker_offsets, rusher_ids),
+        "blocker_keys": blocker_keys,
+        "blocker_offsets": blocker_offsets,
+        "rusher_ids": rusher_ids,
+        "play_matchups": play_matchups,
+    }
+
+    return matchup_index
+
+
+def matchup_lookup(matchup_index, games, plays, nflIds, role="rusher"):
+    """
+    Batch lookup of the opponents of many players at once (e.g. every pass rusher of a week) from the CSR arrays.
+
+    Parameters:
+        'matchup_index' - Dictionary - Output of build_matchup_index
+        'games', 'plays', 'nflIds' - Arrays of Integers - The players to look up
+        'role' - String - 'rusher' to get each rusher's blockers, 'blocker' to get each blocker's rushers
+
+    Returns:
+        'counts' - Array of Integers - Number of opponents of each player (0 if not in the index)
+        'opponents' - Array of Integers - Opponents of all players, player after player
+    """
+    if role == "rusher":
+        keys, offsets, ids = matchup_index["rusher_keys"], matchup_index["rusher_offsets"], matchup_index["blocker_ids"]
+    else:
+        keys, offsets, ids = matchup_index["blocker_keys"], matchup_index["blocker_offsets"], matchup_index["rusher_ids"]
+
+    position = keys.get_indexer(pd.MultiIndex.from_arrays([games, plays, nflIds]))
+    found = position >= 0
+
+    counts = np.where(found, offsets[position + 1] - offsets[position], 0)
+    starts = np.where(found, offsets[position], 0)
+
+    rows = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+
+    return counts, ids[rows]
+
+
+def csr_groups(table, keys, value):
+    """
+    Groups a column by key columns into CSR arrays, keeping groups and values in the order they first appear.
+
+    Parameters:
+        'table' - Dataframe - Rows to group
+        'keys' - List of Strings - Key columns
+        'value' - String - Column to collect
+
+    Returns:
+        'group_keys' - MultiIndex - Key of each group
+        'offsets' - Array of Integers - Where each group's values start (plus the total at the end)
+        'values' - Array - Values of all groups, group after group
+    """
+    group = table.groupby(keys, sort=False).ngroup().to_numpy()
+
+    # Stable, so values stay in table order within each group
+    order = np.argsort(group, kind="stable")
+
+    group_keys = pd.MultiIndex.from_frame(table[keys].drop_duplicates())
+    offsets = np.append(0, np.cumsum(np.bincount(group, minlength=len(group_keys))))
+
+    return group_keys, offsets, table[value].to_numpy()[order]
+
+
+def csr_lists(group_keys, offsets, values):
+    """
+    Turns CSR arrays into a dictionary of lists.
+
+    Parameters:
+        'group_keys' - MultiIndex - Key of each group
+        'offsets' - Array of Integers - Where each group's values start (plus the total at the end)
+        'values' - Array - Values of all groups, group after group
+
+    Returns:
+        'lists' - Dictionary - Key to list of values
+    """
+    lists = {key: list(values[offsets[k] : offsets[k + 1]]) for k, key in enumerate(group_keys)}
+
+    return lists
+
+
+# ----- Validation Functions -------------------------------------------------------------------------
+
+def validate_player_plays(scout_entries, week_df, players_df=None, matchup_index=None, play_windows=None, drop_last_frame=True):
+    """
+    Checks every scouting entry (player-play) against the tracking and players tables before any frames are built,
+    with whole-table checks rather than a frame build per entry, and splits them into those that can be built and
+    those that cannot (with a reason code from FAILURE_REASONS - the first that applies).
+
+    Parameters:
+        'scout_entries' - Dataframe - Scouting rows to check (game, play and nflId), e.g. scout_pass_rush
+        'week_df' - Dataframe - Tracking rows of the entries' plays (a week, a game or a single play)
+        'players_df' - Dataframe - Players with weights (weights are not checked if None)
+        'matchup_index' - Dictionary - Output of build_matchup_index (player type conflicts are not checked if None)
+        'play_windows' - Dataframe - Output of build_play_windows for week_df, found here if not given
+        'drop_last_frame' - Boolean - As in build_play_windows (nfl_frame_builder drops each player's last row,
+                                      nfl_functions keeps it)
+
+    Returns:
+        'valid_entries' - Dataframe - The scout_entries that can be built
+        'failures' - Dataframe - One row per entry that cannot: entry (scouting index), game, play, nflId, reason and
+                                 detail
+    """
+    keys = ["game", "play", "nflId"]
+
+    if play_windows is None:
+        play_windows = build_play_windows(week_df, drop_last_frame=drop_last_frame)
+
+    entry_keys = pd.MultiIndex.from_frame(scout_entries[keys])
+
+    # Window of each entry's play (-1 when the play has no ball rows)
+    window = pd.MultiIndex.from_frame(play_windows[["game", "play"]]).get_indexer(
+        pd.MultiIndex.from_frame(scout_entries[["game", "play"]])
+    )
+    tracked = window >= 0
+
+    # Untracked plays (window -1) pick up the fill appended at the end
+    def window_column(column, fill):
+        return np.append(play_windows[column].to_numpy(), fill)[window]
+
+    has_snap = window_column("has_snap", False).astype(bool)
+    valid_window = window_column("valid", False).astype(bool)
+    window_length = window_column("end_frame", 0) - window_column("snap_frame", 0)
+
+    # Player rows strictly inside the window (the snap and end frames are not analysis frames) - only the rows of the
+    # entries' players are copied, with a one column mask, rather than the whole week
+    player_rows = week_df.loc[week_df.nflId.isin(scout_entries.nflId.unique()).to_numpy(), keys + ["frame"]]
+    if drop_last_frame:
+        player_rows = player_rows[player_rows.duplicated(keys, keep="last")]
+    player_rows = player_rows[pd.MultiIndex.from_frame(player_rows[keys]).isin(entry_keys)]
+
+    # Window of each row's play, looked up rather than merged in
+    row_window = pd.MultiIndex.from_frame(play_windows[["game", "play"]]).get_indexer(
+        pd.MultiIndex.from_frame(player_rows[["game", "play"]])
+    )
+    snap_frame = np.append(play_windows.snap_frame.to_numpy(dtype=float), np.nan)[row_window]
+    end_frame = np.append(play_windows.end_frame.to_numpy(dtype=float), np.nan)[row_window]
+    frame = player_rows.frame.to_numpy()
+    player_rows = player_rows[(frame > snap_frame) & (frame < end_frame)]
+
+    in_window = entry_keys.isin(pd.MultiIndex.from_frame(player_rows[keys]))
+
+    checks = [
+        ("play_not_tracked", ~tracked),
+        ("no_snap_event", ~has_snap),
+        ("no_end_event", ~valid_window),
+        ("empty_window", window_length < 2),
+    ]
+
+    if matchup_index is not None:
+        checks.append(("player_type_conflict", entry_keys.isin(matchup_index["blocker_keys"])))
+
+    checks.append(("player_not_tracked", ~in_window))
+
+    if players_df is not None:
+        weights = players_df.drop_duplicates("nflId").set_index("nflId").weight
+        weight = weights.reindex(scout_entries.nflId).to_numpy()
+        checks.append(("no_player_weight", ~(weight > 0)))
+
+    # First failing check of each entry
+    reason = np.full(len(scout_entries), None, dtype=object)
+    for code, failed in checks:
+        reason = np.where(pd.isna(reason) & np.asarray(failed), code, reason)
+
+    failed = ~pd.isna(reason)
+
+    failures = failure_rows(scout_entries[failed], reason[failed])
+
+    return scout_entries[~failed], failures
+
+
+def failure_rows(scout_entries, reason, detail=""):
+    """
+    Failure records of scouting entries.
+
+    Parameters:
+        'scout_entries' - Dataframe - Scouting rows that failed (game, play and nflId, indexed by entry)
+        'reason' - String or Array of Strings - Code from FAILURE_REASONS, for all or for each entry
+        'detail' - String - More on what went wrong (e.g. the error raised)
+
+    Returns:
+        'failures' - Dataframe - entry, game, play, nflId, reason and detail
+    """
+    failures = scout_entries[["game", "play", "nflId"]].rename_axis("entry").reset_index()
+    failures["reason"] = reason
+    failures["detail"] = detail
+
+    return failures[FAILURE_COLUMNS]
+
+
+def failure_table(failures):
+    """
+    Puts failure records together into one table.
+
+    Parameters:
+        'failures' - List of Dataframes - Failure records (validate_player_plays, failure_rows)
+
+    Returns:
+        'failure_table' - Dataframe - entry, game, play, nflId, reason and detail
+    """
+    failures = [failure for failure in failures if len(failure) > 0]
+
+    if len(failures) == 0:
+        return pd.DataFrame(columns=FAILURE_COLUMNS)
+
+    return pd.concat(failures, ignore_index=True)
+
+
+def failure_counts(failures):
+    """
+    Number of failed player-plays by reason.
+
+    Parameters:
+        'failures' - Dataframe or List of Dataframes - Failure table or records
+
+    Returns:
+        'counts' - Dataframe - reason, count and description, in FAILURE_REASONS order
+    """
+    if isinstance(failures, list):
+        failures = failure_table(failures)
+
+    counts = failures.reason.value_counts()
+    counts = counts.reindex([reason for reason in FAILURE_REASONS if reason in counts.index])
+
+    counts = pd.DataFrame(
+        {"reason": counts.index, "count": counts.to_numpy(), "description": [FAILURE_REASONS[reason] for reason in counts.index]}
+    )
+
+    return counts
+
+
+# ----- Dataset Session --------------------------------------------------------------------------
+
+class DataSession:
+    """
+    Holds the tables used across a build so that each source file is read (and cleaned) at most once.
+    Tables are loaded lazily the first time they are asked for and then kept.  Pass one session to every
+    pipeline function that takes a 'session' parameter.
+
+    Parameters:
+        'use_cache' - Boolean - Passed to 'week' - whether to use the columnar week cache
+        'indexed' - Boolean - Passed to 'week' - whether weeks come back as an indexed TrackingStore
+        'compact' - Boolean - Load tracking and scouting tables with the memory-compact dtypes
+    """
+
+    def __init__(self, use_cache=True, indexed=True, compact=False):
+        self.use_cache = use_cache
+        self.indexed = indexed
+        self.compact = compact
+
+        # Only the most recently requested week is kept, as a week is far larger than all other tables combined
+        self.week_num = None
+        self.week_df = None
+        self.week_windows = None
+
+    @cached_property
+    def games(self):
+        return games()
+
+    @cached_property
+    def players(self):
+        return players()
+
+    @cached_property
+    def plays(self):
+        return plays(game_info=self.games)
+
+    @cached_property
+    def scouting(self):
+        return scouting(compact=self.compact)
+
+    @cached_property
+    def scout_pass_rush(self):
+        return scout_pass_rush(self.scouting, compact=self.compact)
+
+    @cached_property
+    def scout_pass_block(self):
+        return scout_pass_block(self.scouting, compact=self.compact)
+
+    @cached_property
+    def matchup_index(self):
+        return build_matchup_index(self.scout_pass_block)
+
+    @cached_property
+    def game_play_players(self):
+        return all_plays(session=self)
+
+    @cached_property
+    def play_index(self):
+        return all_plays_index(session=self)
+
+    def week(self, week_num):
+        """
+        Gets a week's tracking data, re-using it if it was the last week requested.
+
+        Parameters:
+            'week_num' - Integer - The integer number for the week (a weekN.csv in DATA_DIR)
+
+        Returns:
+            'week_df' - Dataframe or TrackingStore
+        """
+        if week_num != self.week_num:
+            self.week_df = week(week_num, use_cache=self.use_cache, indexed=self.indexed, compact=self.compact)
+            self.week_windows = None
+            self.week_num = week_num
+
+        return self.week_df
+
+    def play_windows(self, week_num):
+        """
+        Gets the snap and end frames of every play of a week (build_play_windows), found once and kept with the week -
+        so a week built a game at a time is only windowed once.
+
+        Parameters:
+            'week_num' - Integer - The integer number for the week (a weekN.csv in DATA_DIR)
+
+        Returns:
+            'play_windows' - Dataframe - Output of build_play_windows for the week
+        """
+        week_df = self.week(week_num)
+
+        if self.week_windows is None:
+            self.week_windows = build_play_windows(week_df)
+
+        return self.week_windows
+
+
+def get_session(session=None):
+    """
+    Returns the given session, or a new (empty) one so that functions can be called with or without a shared session.
+
+    Parameters:
+        'session' - DataSession or None
+
+    Returns:
+        'session' - DataSession
+    """
+    if session is None:
+        session = DataSession()
+
+    return session
@@ -7,14 +7,25 @@ import itertools
 from scipy import spatial
 import re
 
+import time
+
 import warnings
 warnings.filterwarnings('ignore')
 
+# Numba is optional - without it the 'numba' engine falls back to the numpy one
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Conversion rate from (pounds * yards) / seconds^2 to Newtons 
+FORCE_CONVERSION = 0.414764863
+
 # ====================================================================================================
 # ENHANCE FRAME AND ADD METRICS
 # ====================================================================================================
 
-def build_metrics(analysis_frames, point_of_scrimmage, players_df):
+def build_metrics(analysis_frames, point_of_scrimmage, players_df, engine = 'loop'):
     '''
     Combines all functions to take a given playframe and return frame by frame metrics 
     
@@ -22,9 +33,19 @@ def build_metrics(analysis_frames, point_of_scrimmage, players_df):
         'analysis_frames' - Dataframe - Complete frames of the play
         'point_of_scrimmage' - Tuple of Floats - x and y coordinates of snap
         'players_df' - Dataframe - Contains player information, including weight
+        'engine' - String - 'loop' (frame by frame), 'numpy' (whole-array, see build_metrics_numpy) or 'numba'
+                            (compiled kernel, see frame_metric_kernel - numpy if numba is not installed); all give the
+                            same columns and values (to floating point precision)
     Returns:
         'analysis_frames' - Dataframe - Complete frames of the play with all metric stuff added
     '''
+    if engine in ['numpy', 'numba']:
+        return build_metrics_numpy(analysis_frames, point_of_scrimmage, players_df, backend = engine)
+    
+    elif engine != 'loop':
+        print('engine inputs are either:\n-"loop" to build metrics frame by frame;\n-"numpy" to build them with whole-array operations; or:\n-"numba" to build them with a compiled kernel')
+        return
+    
     analysis_frames = recenter_on_snap(point_of_scrimmage, analysis_frames)
     analysis_frames = create_movement_vectors(analysis_frames)
     analysis_frames = create_rusher_to_ball_vector(analysis_frames)
@@ -47,6 +68,52 @@ def build_metrics(analysis_frames, point_of_scrimmage, players_df):
     return analysis_frames
 
 
+def build_play_metrics(game, play, week_df, nflId, scout_pass_block, players_df, player_type = 'pass_rusher', v_type = 'PvP',
+                       engine = 'loop', cache = nfl.FRAME_CACHE):
+    '''
+    build_play_frames followed by build_metrics for one player-play, through a cache: re-inspecting a player-play (or
+    toggling back between PvB and PvP) returns the cached frames and metrics instead of rebuilding them.
+    
+    Parameters:
+        'game' - Integer - Game number (unique for season)
+        'play' - Integer - Unique for game
+        'week_df' - Dataframe - Weekly frame by frame data for each play (or an indexed acquire.TrackingStore)
+        'nflId' - Integer - Unique Id of player being analyzed
+        'scout_pass_block' - Dataframe - Pass blocker PFF scouting data
+        'players_df' - Dataframe - Contains player information, including weight
+        'player_type' - String - The type of player bring analyzed (pass_rusher or pass_blocker)
+        'v_type' - String - The type of analysis to perform, player vs ball or player vs player (and ball.)  Either 'PvB' or 'PvP'.
+        'engine' - String - Metric engine passed to build_metrics (not part of the cache key, as all give the same values)
+        'cache' - FrameCache - Cache to use (the shared nfl_frame_builder.FRAME_CACHE by default, None to not cache)
+    Returns:
+        'qb_hold_time' - Float - How long the qb holds the ball (in seconds)
+        'point_of_scrimmage' - Tuple of Floats - x and y coordinates of snap
+        'analysis_frames' - Dataframe - Complete frames of the play with all metric stuff added
+    '''
+    if cache is not None:
+        cache_key = (game, play, nflId, player_type, v_type)
+        
+        cached = cache.get(cache_key, 'metrics')
+        if cached is not None:
+            return cached
+    
+    qb_hold_time, point_of_scrimmage, analysis_frames = nfl.build_play_frames(game, 
+                                                                              play, 
+                                                                              week_df, 
+                                                                              nflId, 
+                                                                              scout_pass_block, 
+                                                                              player_type, 
+                                                                              v_type = v_type, 
+                                                                              cache = cache)
+    
+    analysis_frames = build_metrics(analysis_frames, point_of_scrimmage, players_df, engine = engine)
+    
+    if cache is not None and analysis_frames is not None:
+        cache.put(cache_key, 'metrics', (qb_hold_time, point_of_scrimmage, analysis_frames))
+    
+    return qb_hold_time, point_of_scrimmage, analysis_frames
+
+
 # ----- Sub Functions -----------------------------------------------------------------------------
 
 def recenter_on_snap(point_of_scrimmage, analysis_frames):
@@ -372,14 +439,11 @@ def pass_rusher_force(analysis_frames, players_df):
     Returns:
         'analysis_frames' - Dataframe - Compete frames of the play with pass_rusher force added
     '''
-    # Get conversion rate from (pounds * yards) / seconds^2 to Newtons 
-    force_conversion = 0.414764863 
-    
     # Pull mass from players_df    
     mass = players_df[players_df.nflId == analysis_frames.pass_rusher.max()].weight.iat[0]
 
     # Calculate force = mass * acceleration * pursuit factor
-    analysis_frames['pass_rusher_force_to_ball'] = round(mass * force_conversion * analysis_frames['pass_rusher_a'] * analysis_frames.pursuit_factor, 2)
+    analysis_frames['pass_rusher_force_to_ball'] = round(mass * FORCE_CONVERSION * analysis_frames['pass_rusher_a'] * analysis_frames.pursuit_factor, 2)
     
     return analysis_frames
 
@@ -672,6 +736,561 @@ def escape_factor_calc(ball_distance_moved_x,
 
 
 
+# ====================================================================================================
+# VECTORIZED METRICS ENGINE
+# ====================================================================================================
+
+def build_metrics_numpy(analysis_frames, point_of_scrimmage, players_df, backend = 'numpy'):
+    '''
+    Same as build_metrics, but the stages that loop over frames (change in distance, distance ratio, colinearity,
+    pursuit and escape factors, vector components, true pursuit and pursuit 1-4) are computed for all frames at once.
+    Returns the same columns, in the same order, with the same values - including the zero-length vector NaNs, the
+    -8/+6 clipping of pursuit1 and the 0.0001 floor on the change in distance.  Unrounded columns (pursuit3, pursuit4)
+    can differ from the loop engine in the last bit, as numpy's array square/sqrt and scalar pow round differently.
+    
+    Parameters:
+        'analysis_frames' - Dataframe - Complete frames of the play
+        'point_of_scrimmage' - Tuple of Floats - x and y coordinates of snap
+        'players_df' - Dataframe - Contains player information, including weight
+        'backend' - String - Per-frame calculations with 'numpy' or 'numba' (see frame_metric_arrays)
+    Returns:
+        'analysis_frames' - Dataframe - Complete frames of the play with all metric stuff added
+    '''
+    analysis_frames = recenter_on_snap(point_of_scrimmage, analysis_frames)
+    analysis_frames = create_movement_vectors(analysis_frames)
+    analysis_frames = create_rusher_to_ball_vector(analysis_frames)
+    analysis_frames = create_ball_to_rusher_vector(analysis_frames)
+    
+    frame_metrics = frame_metric_arrays(*[analysis_frames[column].to_numpy(dtype = float) for column in FRAME_METRIC_INPUTS],
+                                        backend = backend)
+    
+    # Columns are added in the same order as the loop engine, with opponent distances after the distance ratio
+    for column in ['change_in_pass_rusher_to_ball_dist', 'pass_rusher_to_ball_dist_ratio']:
+        analysis_frames[column] = frame_metrics[column]
+    
+    analysis_frames = player_opponent_distance(analysis_frames)
+    
+    for column in ['colinearity',
+                   'pursuit_factor',
+                   'pass_rusher_to_ball_vector_x',
+                   'pass_rusher_to_ball_vector_y',
+                   'escape_factor',
+                   'ball_to_pass_rusher_vector_x',
+                   'ball_to_pass_rusher_vector_y']:
+        analysis_frames[column] = frame_metrics[column]
+    
+    analysis_frames = pass_rusher_force(analysis_frames, players_df)
+    
+    for column in ['pursuit_vs_escape', 'pursuit1', 'pursuit2', 'pursuit3', 'pursuit4']:
+        analysis_frames[column] = frame_metrics[column]
+    
+    return analysis_frames
+
+
+def build_metrics_batch(analysis_frames, entries, players_df, backend = 'numpy'):
+    '''
+    Batched version of build_metrics for the stacked frames of many player-plays (see 
+    nfl_frame_builder.build_week_analysis_frames): each entry's frames are recentered on its own point of scrimmage
+    and the ball vs. pass rusher metrics of all frames are computed in one pass with frame_metric_arrays.  Pass blocker
+    distances are not added, as nothing is aggregated from them.
+    
+    Parameters:
+        'analysis_frames' - Dataframe - Stacked frames of all entries
+        'entries' - Dataframe - One row per player-play, with nflId, scrimmage_x, scrimmage_y and frame_count
+        'players_df' - Dataframe - Contains player information, including weight
+        'backend' - String - Per-frame calculations with 'numpy' or 'numba' (see frame_metric_arrays)
+    Returns:
+        'analysis_frames' - Dataframe - Stacked frames with all metric stuff added (force is NaN for players
+                                        missing from players_df)
+    '''
+    frame_count = entries.frame_count.to_numpy()
+    
+    # Point of scrimmage and pass rusher weight of each frame's player-play
+    origin_x = np.repeat(entries.scrimmage_x.to_numpy(), frame_count)
+    origin_y = np.repeat(entries.scrimmage_y.to_numpy(), frame_count)
+    
+    weights = players_df.drop_duplicates('nflId').set_index('nflId').weight
+    mass = np.repeat(weights.reindex(entries.nflId).to_numpy(dtype = float), frame_count)
+    
+    for column in FRAME_METRIC_INPUTS:
+        origin = origin_x if column.endswith('x') else origin_y
+        analysis_frames[column] = reorientate_coord(origin, analysis_frames[column].to_numpy())
+    
+    frame_metrics = frame_metric_arrays(*[analysis_frames[column].to_numpy(dtype = float) for column in FRAME_METRIC_INPUTS],
+                                        backend = backend)
+    
+    for column, values in frame_metrics.items():
+        analysis_frames[column] = values
+    
+    # Same force calculation as pass_rusher_force
+    analysis_frames['pass_rusher_force_to_ball'] = np.round(mass * FORCE_CONVERSION * analysis_frames.pass_rusher_a.to_numpy() * frame_metrics['pursuit_factor'], 2)
+    
+    return analysis_frames
+
+
+def build_metrics_tensor(frame_tensor, players_df, backend = 'numpy'):
+    '''
+    build_metrics for a pass rusher's frame tensor (nfl_frame_builder.build_frame_tensor): the ball and pass rusher
+    are recentered and their metrics computed from the tensor's entity slices with frame_metric_arrays, and the
+    opponent distances from the opponent slices - no column names are looked up.  Gives the same values as
+    build_metrics_numpy.
+    
+    Parameters:
+        'frame_tensor' - Dictionary - Frame tensor of a pass rusher (entity 1)
+        'players_df' - Dataframe - Contains player information, including weight
+        'backend' - String - Per-frame calculations with 'numpy' or 'numba' (see frame_metric_arrays)
+    Returns:
+        'frame_metrics' - Dictionary - Metric arrays (one value per frame) named as the build_metrics columns, plus
+                                       'opponent_distances' (frames x opponents, in entity order)
+    '''
+    if frame_tensor['entity_names'][1] != 'pass_rusher':
+        print('Frame tensor metrics are for pass rushers: entity 1 must be the pass_rusher')
+        return
+    
+    values = frame_tensor['values']
+    
+    # Recenter x (x, next_x) and y (y, next_y) features on the point of scrimmage
+    x = reorientate_coord(frame_tensor['point_of_scrimmage'][0], values[:, :, [0, 2]])
+    y = reorientate_coord(frame_tensor['point_of_scrimmage'][1], values[:, :, [1, 3]])
+    
+    frame_metrics = frame_metric_arrays(x[:, 0, 0], y[:, 0, 0], x[:, 0, 1], y[:, 0, 1],
+                                        x[:, 1, 0], y[:, 1, 0], x[:, 1, 1], y[:, 1, 1], backend = backend)
+    
+    # Same distances as player_opponent_distance, for every opponent at once
+    frame_metrics['opponent_distances'] = np.round(euclidean_distance(x[:, 1:2, 0], y[:, 1:2, 0], x[:, 2:, 0], y[:, 2:, 0]), 4)
+    
+    # Same force calculation as pass_rusher_force
+    mass = players_df.drop_duplicates('nflId').set_index('nflId').weight.reindex([frame_tensor['entities'][1]]).to_numpy(dtype = float)[0]
+    frame_metrics['pass_rusher_force_to_ball'] = np.round(mass * FORCE_CONVERSION * values[:, 1, 4] * frame_metrics['pursuit_factor'], 2)
+    
+    return frame_metrics
+
+
+# ----- Sub Functions -----------------------------------------------------------------------------
+
+# Recentered coordinates frame_metric_arrays is computed from, in argument order
+FRAME_METRIC_INPUTS = ['ball_x',
+                       'ball_y',
+                       'ball_next_x',
+                       'ball_next_y',
+                       'pass_rusher_x',
+                       'pass_rusher_y',
+                       'pass_rusher_next_x',
+                       'pass_rusher_next_y']
+
+
+def frame_metric_arrays(ball_x, ball_y, ball_next_x, ball_next_y,
+                        pass_rusher_x, pass_rusher_y, pass_rusher_next_x, pass_rusher_next_y, backend = 'numpy'):
+    '''
+    Computes every frame by frame pass rusher vs. ball metric from the (recentered) locations of the ball and the pass
+    rusher, for any number of frames at once.  Frames do not need to come from the same play, as no metric looks at
+    neighboring frames.
+    
+    Parameters:
+        'ball_x', 'ball_y' - Array of Floats - Ball location at the frame
+        'ball_next_x', 'ball_next_y' - Array of Floats - Ball location at the next frame
+        'pass_rusher_x', 'pass_rusher_y' - Array of Floats - Pass rusher location at the frame
+        'pass_rusher_next_x', 'pass_rusher_next_y' - Array of Floats - Pass rusher location at the next frame
+        'backend' - String - 'numpy' (whole-array operations) or 'numba' (frame_metric_kernel, when numba is installed)
+    Returns:
+        'frame_metrics' - Dictionary of Arrays - Metric name (analysis_frames column name) to per-frame values
+    '''
+    if backend == 'numba' and frame_metric_kernel is not None:
+        return kernel_frame_metric_arrays(ball_x, ball_y, ball_next_x, ball_next_y,
+                                          pass_rusher_x, pass_rusher_y, pass_rusher_next_x, pass_rusher_next_y)
+    
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        # Movement vectors
+        ball_distance_moved_x = ball_next_x - ball_x
+        ball_distance_moved_y = ball_next_y - ball_y
+        pass_rusher_distance_moved_x = pass_rusher_next_x - pass_rusher_x
+        pass_rusher_distance_moved_y = pass_rusher_next_y - pass_rusher_y
+        
+        # Player to ball vectors
+        pass_rusher_to_ball_vector_x = ball_next_x - pass_rusher_x
+        pass_rusher_to_ball_vector_y = ball_next_y - pass_rusher_y
+        ball_to_pass_rusher_vector_x = ball_next_x - pass_rusher_next_x
+        ball_to_pass_rusher_vector_y = ball_next_y - pass_rusher_next_y
+        
+        # Distances between the player and the ball now and at the next frame
+        distance = ((ball_x - pass_rusher_x)**2 + (ball_y - pass_rusher_y)**2)**.5
+        next_distance = ((ball_next_x - pass_rusher_next_x)**2 + (ball_next_y - pass_rusher_next_y)**2)**.5
+        
+        change_in_distance = np.round(next_distance - distance, 4)
+        change_in_distance = np.where(change_in_distance > .0001, change_in_distance, .0001)
+        
+        distance_ratio = np.round(distance / next_distance, 4)
+        
+        colinearity = np.round(cosine_similarity(pass_rusher_distance_moved_x,
+                                                 pass_rusher_distance_moved_y,
+                                                 ball_distance_moved_x,
+                                                 ball_distance_moved_y), 4)
+        
+        pursuit_factor = np.round(cosine_similarity(pass_rusher_to_ball_vector_x,
+                                                    pass_rusher_to_ball_vector_y,
+                                                    pass_rusher_distance_moved_x,
+                                                    pass_rusher_distance_moved_y), 4)
+        
+        # Component of the player's movement towards the ball
+        pass_rusher_to_ball_vector_x, pass_rusher_to_ball_vector_y = [np.round(c, 4) for c in components(pass_rusher_distance_moved_x,
+                                                                                                       pass_rusher_distance_moved_y,
+                                                                                                       pass_rusher_to_ball_vector_x,
+                                                                                                       pass_rusher_to_ball_vector_y)]
+        
+        escape_factor = np.round(cosine_similarity(ball_distance_moved_x,
+                                                   ball_distance_moved_y,
+                                                   ball_to_pass_rusher_vector_x,
+                                                   ball_to_pass_rusher_vector_y), 4)
+        
+        # Component of the ball's movement away from the player
+        ball_to_pass_rusher_vector_x, ball_to_pass_rusher_vector_y = [np.round(c, 4) for c in components(ball_distance_moved_x,
+                                                                                                       ball_distance_moved_y,
+                                                                                                       ball_to_pass_rusher_vector_x,
+                                                                                                       ball_to_pass_rusher_vector_y)]
+        
+        pursuit_vs_escape = np.round((pass_rusher_to_ball_vector_x**2 + pass_rusher_to_ball_vector_y**2)**.5 - 
+                                     (ball_to_pass_rusher_vector_x**2 + ball_to_pass_rusher_vector_y**2)**.5, 4)
+        
+        # Same -8/+6 clipping (and sign flip) as create_pursuit1
+        pursuit1 = np.round(pursuit_vs_escape / change_in_distance, 4)
+        pursuit1 = np.where(pursuit1 > 8, -8, np.where(pursuit1 < -6, 6, pursuit1 * -1))
+        
+        pursuit2 = np.round(pursuit_vs_escape * distance_ratio, 4)
+        
+        ball_distance = (ball_distance_moved_x**2 + ball_distance_moved_y**2)**.5
+        player_towards_ball_distance = (pass_rusher_to_ball_vector_x**2 + pass_rusher_to_ball_vector_y**2)**.5
+        
+        pursuit3 = np.where(ball_distance == 0, player_towards_ball_distance, player_towards_ball_distance / ball_distance)
+        pursuit4 = np.where(ball_distance == 0, pursuit_vs_escape, pursuit_vs_escape / ball_distance)
+    
+    frame_metrics = {'ball_distance_moved_x':ball_distance_moved_x,
+                     'ball_distance_moved_y':ball_distance_moved_y,
+                     'pass_rusher_distance_moved_x':pass_rusher_distance_moved_x,
+                     'pass_rusher_distance_moved_y':pass_rusher_distance_moved_y,
+                     'change_in_pass_rusher_to_ball_dist':change_in_distance,
+                     'pass_rusher_to_ball_dist_ratio':distance_ratio,
+                     'colinearity':colinearity,
+                     'pursuit_factor':pursuit_factor,
+                     'pass_rusher_to_ball_vector_x':pass_rusher_to_ball_vector_x,
+                     'pass_rusher_to_ball_vector_y':pass_rusher_to_ball_vector_y,
+                     'escape_factor':escape_factor,
+                     'ball_to_pass_rusher_vector_x':ball_to_pass_rusher_vector_x,
+                     'ball_to_pass_rusher_vector_y':ball_to_pass_rusher_vector_y,
+                     'pursuit_vs_escape':pursuit_vs_escape,
+                     'pursuit1':pursuit1,
+                     'pursuit2':pursuit2,
+                     'pursuit3':pursuit3,
+                     'pursuit4':pursuit4}
+    
+    return frame_metrics
+
+
+# ----- Support Functions -----------------------------------------------------------------------------
+
+def cosine_similarity(v1x, v1y, v2x, v2y):
+    '''
+    Array version of 1 - spatial.distance.cosine (as used by the *_calc functions) for many pairs of vectors at once.
+    Like scipy, the cosine distance is clipped to 0-2, and pairs where either vector has zero length are NaN.
+    
+    Parameters:
+        'v1x', 'v1y' - Array of Floats - x and y components of the first vectors
+        'v2x', 'v2y' - Array of Floats - x and y components of the second vectors
+    Returns:
+        'similarity' - Array of Floats (-1 to 1) - 1 being perfectly aligned, 0 orthogonal and -1 opposite
+    '''
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        cosine_distance = 1.0 - (v1x * v2x + v1y * v2y) / np.sqrt((v1x * v1x + v1y * v1y) * (v2x * v2x + v2y * v2y))
+    
+    similarity = 1 - np.clip(cosine_distance, 0.0, 2.0)
+    
+    return similarity
+
+
+def components(v1x, v1y, on_v2x, on_v2y):
+    '''
+    Array version of 'component' - the components of vectors [v1x, v1y] that lie along vectors [on_v2x, on_v2y].
+    Zero-length [on_v2x, on_v2y] vectors give NaN, as they do in 'component'.
+    
+    Parameters:
+        'v1x', 'v1y' - Array of Floats - The vectors to find the components of
+        'on_v2x', 'on_v2y' - Array of Floats - The vectors the components lie along
+    Returns:
+        'component_x' - Array of Floats - x of the components
+        'component_y' - Array of Floats - y of the components
+    '''
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        dot_product = v1x * on_v2x + v1y * on_v2y
+        magnitude = np.sqrt(on_v2x * on_v2x + on_v2y * on_v2y)
+        
+        component_x = dot_product / magnitude * (on_v2x / magnitude)
+        component_y = dot_product / magnitude * (on_v2y / magnitude)
+    
+    return component_x, component_y
+
+
+
+
+# ====================================================================================================
+# COMPILED METRIC KERNELS
+# ====================================================================================================
+
+# Per-frame metrics of frame_metric_arrays, in the order frame_metric_loop writes them
+FRAME_METRIC_OUTPUTS = ['ball_distance_moved_x',
+                        'ball_distance_moved_y',
+                        'pass_rusher_distance_moved_x',
+                        'pass_rusher_distance_moved_y',
+                        'change_in_pass_rusher_to_ball_dist',
+                        'pass_rusher_to_ball_dist_ratio',
+                        'colinearity',
+                        'pursuit_factor',
+                        'pass_rusher_to_ball_vector_x',
+                        'pass_rusher_to_ball_vector_y',
+                        'escape_factor',
+                        'ball_to_pass_rusher_vector_x',
+                        'ball_to_pass_rusher_vector_y',
+                        'pursuit_vs_escape',
+                        'pursuit1',
+                        'pursuit2',
+                        'pursuit3',
+                        'pursuit4']
+
+
+def kernel_frame_metric_arrays(ball_x, ball_y, ball_next_x, ball_next_y,
+                               pass_rusher_x, pass_rusher_y, pass_rusher_next_x, pass_rusher_next_y):
+    '''
+    frame_metric_arrays with the compiled frame_metric_kernel: the inputs are made contiguous float64 arrays and all
+    frames (e.g. a whole week's) are run through the kernel in one call.
+    
+    Parameters:
+        See frame_metric_arrays
+    Returns:
+        'frame_metrics' - Dictionary of Arrays - Metric name (analysis_frames column name) to per-frame values
+    '''
+    inputs = [np.ascontiguousarray(values, dtype = np.float64) for values in [ball_x, ball_y, ball_next_x, ball_next_y,
+                                                                             pass_rusher_x, pass_rusher_y,
+                                                                             pass_rusher_next_x, pass_rusher_next_y]]
+    
+    out = np.empty((len(FRAME_METRIC_OUTPUTS), len(inputs[0])))
+    
+    frame_metric_kernel(*inputs, out)
+    
+    frame_metrics = {column:out[k] for k, column in enumerate(FRAME_METRIC_OUTPUTS)}
+    
+    return frame_metrics
+
+
+def compare_backends(analysis_frames, repeat = 3):
+    '''
+    Runs the per-frame metrics of recentered frames (e.g. a week of nfl_frame_builder.build_week_analysis_frames
+    after recentering, or any frames with the FRAME_METRIC_INPUTS columns) with both the numpy and numba backends,
+    and reports their speed and how closely they agree.
+    
+    Parameters:
+        'analysis_frames' - Dataframe - Frames with the FRAME_METRIC_INPUTS columns
+        'repeat' - Integer - Timed runs per backend (the best is reported; numba's first, compiling, run is not timed)
+    Returns:
+        'comparison' - Dataframe - Per metric: max absolute difference and number of frames where only one backend is
+                                   NaN, with each backend's best time (seconds) and frames per second in .attrs
+    '''
+    inputs = [analysis_frames[column].to_numpy(dtype = float) for column in FRAME_METRIC_INPUTS]
+    
+    if frame_metric_kernel is None:
+        print('numba is not installed: the numba backend falls back to numpy, so both backends are the same code')
+    
+    results = {}
+    times = {}
+    
+    for backend in ['numpy', 'numba']:
+        # Warm up (compiles the kernel)
+        results[backend] = frame_metric_arrays(*inputs, backend = backend)
+        
+        best = np.inf
+        for i in range(repeat):
+            start = time.perf_counter()
+            frame_metric_arrays(*inputs, backend = backend)
+            best = min(best, time.perf_counter() - start)
+        
+        times[backend] = best
+    
+    comparison = []
+    
+    for column in FRAME_METRIC_OUTPUTS:
+        numpy_values = results['numpy'][column]
+        numba_values = results['numba'][column]
+        
+        both = ~np.isnan(numpy_values) & ~np.isnan(numba_values)
+        
+        comparison.append({'metric':column,
+                           'max_abs_diff':np.abs(numpy_values[both] - numba_values[both]).max() if both.any() else 0.0,
+                           'nan_mismatches':int((np.isnan(numpy_values) != np.isnan(numba_values)).sum())})
+    
+    comparison = pd.DataFrame(comparison)
+    
+    frames = len(inputs[0])
+    
+    for backend in ['numpy', 'numba']:
+        comparison.attrs[f'{backend}_seconds'] = times[backend]
+        comparison.attrs[f'{backend}_frames_per_second'] = frames / times[backend] if times[backend] > 0 else np.inf
+        print(f'{backend}: {times[backend]:.4f}s for {frames} frames ({comparison.attrs[f"{backend}_frames_per_second"]:,.0f} frames/s)')
+    
+    print(f'Largest difference: {comparison.max_abs_diff.max()} ({comparison.nan_mismatches.sum()} NaN mismatches)')
+    
+    return comparison
+
+
+# ----- Sub Functions -----------------------------------------------------------------------------
+
+def frame_metric_loop(ball_x, ball_y, ball_next_x, ball_next_y,
+                      pass_rusher_x, pass_rusher_y, pass_rusher_next_x, pass_rusher_next_y, out):
+    '''
+    Frame by frame version of frame_metric_arrays written for numba (frame_metric_kernel is this function compiled):
+    the vector math of component, pursuit_factor_calc, escape_factor_calc, pass_rusher_to_ball_colinearity_calc and
+    the create_pursuit1-4 branches, with the same rounding, clipping and zero-length vector NaNs.  Also runs as plain
+    (slow) python.
+    
+    Parameters:
+        See frame_metric_arrays
+        'out' - Array of Floats - (len(FRAME_METRIC_OUTPUTS), frames) array the metrics are written to
+    Returns:
+        None - the metrics are written to out
+    '''
+    for i in range(len(ball_x)):
+        # Movement vectors
+        bmx = ball_next_x[i] - ball_x[i]
+        bmy = ball_next_y[i] - ball_y[i]
+        pmx = pass_rusher_next_x[i] - pass_rusher_x[i]
+        pmy = pass_rusher_next_y[i] - pass_rusher_y[i]
+        
+        # Player to ball vectors
+        p2bx = ball_next_x[i] - pass_rusher_x[i]
+        p2by = ball_next_y[i] - pass_rusher_y[i]
+        b2px = ball_next_x[i] - pass_rusher_next_x[i]
+        b2py = ball_next_y[i] - pass_rusher_next_y[i]
+        
+        # Distances between the player and the ball now and at the next frame
+        dx = ball_x[i] - pass_rusher_x[i]
+        dy = ball_y[i] - pass_rusher_y[i]
+        ndx = ball_next_x[i] - pass_rusher_next_x[i]
+        ndy = ball_next_y[i] - pass_rusher_next_y[i]
+        distance = np.sqrt(dx * dx + dy * dy)
+        next_distance = np.sqrt(ndx * ndx + ndy * ndy)
+        
+        change_in_distance = round_to(next_distance - distance, 4)
+        if not change_in_distance > .0001:
+            change_in_distance = .0001
+        
+        distance_ratio = round_to(distance / next_distance, 4)
+        
+        colinearity = round_to(cosine_similarity_scalar(pmx, pmy, bmx, bmy), 4)
+        pursuit_factor = round_to(cosine_similarity_scalar(p2bx, p2by, pmx, pmy), 4)
+        
+        # Component of the player's movement towards the ball
+        magnitude = np.sqrt(p2bx * p2bx + p2by * p2by)
+        dot_product = pmx * p2bx + pmy * p2by
+        p2bcx = round_to(dot_product / magnitude * (p2bx / magnitude), 4)
+        p2bcy = round_to(dot_product / magnitude * (p2by / magnitude), 4)
+        
+        escape_factor = round_to(cosine_similarity_scalar(bmx, bmy, b2px, b2py), 4)
+        
+        # Component of the ball's movement away from the player
+        magnitude = np.sqrt(b2px * b2px + b2py * b2py)
+        dot_product = bmx * b2px + bmy * b2py
+        b2pcx = round_to(dot_product / magnitude * (b2px / magnitude), 4)
+        b2pcy = round_to(dot_product / magnitude * (b2py / magnitude), 4)
+        
+        player_towards_ball_distance = np.sqrt(p2bcx * p2bcx + p2bcy * p2bcy)
+        pursuit_vs_escape = round_to(player_towards_ball_distance - np.sqrt(b2pcx * b2pcx + b2pcy * b2pcy), 4)
+        
+        # Same -8/+6 clipping (and sign flip) as create_pursuit1
+        pursuit1 = round_to(pursuit_vs_escape / change_in_distance, 4)
+        if pursuit1 > 8:
+            pursuit1 = -8.0
+        elif pursuit1 < -6:
+            pursuit1 = 6.0
+        else:
+            pursuit1 = pursuit1 * -1
+        
+        pursuit2 = round_to(pursuit_vs_escape * distance_ratio, 4)
+        
+        ball_distance = np.sqrt(bmx * bmx + bmy * bmy)
+        
+        if ball_distance == 0:
+            pursuit3 = player_towards_ball_distance
+            pursuit4 = pursuit_vs_escape
+        else:
+            pursuit3 = player_towards_ball_distance / ball_distance
+            pursuit4 = pursuit_vs_escape / ball_distance
+        
+        out[0, i] = bmx
+        out[1, i] = bmy
+        out[2, i] = pmx
+        out[3, i] = pmy
+        out[4, i] = change_in_distance
+        out[5, i] = distance_ratio
+        out[6, i] = colinearity
+        out[7, i] = pursuit_factor
+        out[8, i] = p2bcx
+        out[9, i] = p2bcy
+        out[10, i] = escape_factor
+        out[11, i] = b2pcx
+        out[12, i] = b2pcy
+        out[13, i] = pursuit_vs_escape
+        out[14, i] = pursuit1
+        out[15, i] = pursuit2
+        out[16, i] = pursuit3
+        out[17, i] = pursuit4
+
+
+# ----- Support Functions -----------------------------------------------------------------------------
+
+def round_to(value, decimals):
+    '''
+    Scalar np.round, written out (scale, round half to even, unscale) the way numpy does it, so numba gives the same
+    results.
+    
+    Parameters:
+        'value' - Float - Value to round
+        'decimals' - Integer - Number of decimal places
+    Returns:
+        'rounded' - Float - Rounded value
+    '''
+    scale = 10.0 ** decimals
+    
+    return np.rint(value * scale) / scale
+
+
+def cosine_similarity_scalar(v1x, v1y, v2x, v2y):
+    '''
+    Scalar version of cosine_similarity (1 - scipy's cosine distance clipped to 0-2, NaN for zero-length vectors).
+    
+    Parameters:
+        'v1x', 'v1y' - Float - x and y of the first vector
+        'v2x', 'v2y' - Float - x and y of the second vector
+    Returns:
+        'similarity' - Float (-1 to 1) - 1 being perfectly aligned, 0 orthogonal and -1 opposite
+    '''
+    cosine_distance = 1.0 - (v1x * v2x + v1y * v2y) / np.sqrt((v1x * v1x + v1y * v1y) * (v2x * v2x + v2y * v2y))
+    
+    # Comparisons are False for NaN, so NaN passes through as it does in np.clip
+    if cosine_distance < 0.0:
+        cosine_distance = 0.0
+    elif cosine_distance > 2.0:
+        cosine_distance = 2.0
+    
+    return 1 - cosine_distance
+
+
+# Compiled kernel - None without numba, in which case the numba backend uses the numpy one.  error_model = 'numpy'
+# makes division by zero give inf/NaN (as numpy does) rather than raise
+if numba is not None:
+    round_to = numba.njit(cache = True)(round_to)
+    cosine_similarity_scalar = numba.njit(cache = True, error_model = 'numpy')(cosine_similarity_scalar)
+    frame_metric_kernel = numba.njit(cache = True, error_model = 'numpy')(frame_metric_loop)
+else:
+    frame_metric_kernel = None
+
+
+
 # ====================================================================================================
 # GRAPHING FUNCTIONS
 # ====================================================================================================
@@ -767,13 +1386,13 @@ def create_single_player_graph(analysis_frames, point_of_scrimmage):
 # TESTING FUNCTIONS
 # ====================================================================================================
 
-def get_random_play_and_player():
+def get_random_play_and_player(session = None):
     '''
     Generates all the parameters needed to select a random player from a random play, along with his opponents.
     This allows testing of the frame and metrics builders.
     
     Parameters:
-        NONE
+        'session' - DataSession - Shared tables so repeated draws do not re-read the scouting data
     Returns:
         'game' - Integer - Game number (unique for season)
         'play' - Integer - Unique for game
@@ -781,10 +1400,11 @@ def get_random_play_and_player():
         'player_type' - String - The type of player bring analyzed (pass_rusher or pass_blocker)
     '''
     # Pull a random play from a random game
-    game, play = nfl.random_play()
+    session = acquire.get_session(session)
+    game, play = nfl.random_play(session = session)
 
     # Get all players in the randomly selected play
-    play_players = nfl.get_players_in_play(game, play)
+    play_players = nfl.get_players_in_play(game, play, session = session)
 
     # Use only players who are blockers or pass rushers
     play_players = play_players[play_players.role.isin(['Pass Block','Pass Rush'])]
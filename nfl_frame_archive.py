@@ -0,0 +1,377 @@
+'''
+Archive of the per-frame metrics of every player-play, so new play-level summaries (a median, a max, the first 2.5
+seconds only, ...) can be calculated without building the frames again from the raw tracking data.
+
+Builders add each player-play's analysis frames (after build_metrics) to a FrameArchiveWriter; it keeps the
+ARCHIVE_COLUMNS of each frame along with game, play, nflId and frame_number (0 at the first analysis frame) and
+writes them in record batches to an Arrow IPC (feather) file with zstd compression - week3.arrow for a week, or
+week3-2021092600.arrow for one of its games.  Next to each file, an index (.index.feather) gives the record batch
+and rows of every (game, play, nflId).
+
+FrameArchive reads a directory of these files through a memory map: frames returns one player-play's frames (only
+its record batch is read) and summarize streams the archive a batch at a time into new per player-play summaries.
+(Compressed batches are decompressed as they are read - write with compression = None for zero-copy reads.)
+
+Needs pyarrow - without it nothing is archived (with a message).
+'''
+import os
+import glob
+
+import numpy as np
+import pandas as pd
+
+# pyarrow is optional - without it frames are not archived
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+# Per-frame metric columns kept for each player-play
+ARCHIVE_COLUMNS = ['pass_rusher_a',
+                   'change_in_pass_rusher_to_ball_dist',
+                   'pass_rusher_to_ball_dist_ratio',
+                   'colinearity',
+                   'pursuit_factor',
+                   'escape_factor',
+                   'pass_rusher_force_to_ball',
+                   'pursuit_vs_escape',
+                   'pursuit1',
+                   'pursuit2',
+                   'pursuit3',
+                   'pursuit4']
+
+KEY_COLUMNS = ['game', 'play', 'nflId']
+
+# Tracking frames per second (for summaries of the first seconds of a play)
+FRAMES_PER_SECOND = 10
+
+# Frames buffered before they are written as a record batch (a player-play is never split between batches)
+BATCH_ROWS = 100000
+
+
+class FrameArchiveWriter:
+    '''
+    Writes the frames of the player-plays added to it to one archive file (to a temporary file until close, so an
+    interrupted build never leaves a file that looks complete).
+
+    Parameters:
+        'path' - String - Archive file (.arrow)
+        'columns' - List of Strings - Frame columns to keep
+        'batch_rows' - Integer - Frames per record batch (about)
+        'compression' - String - 'zstd', 'lz4' or None
+    '''
+
+    def __init__(self, path, columns = ARCHIVE_COLUMNS, batch_rows = BATCH_ROWS, compression = 'zstd'):
+        self.path = path
+        self.columns = list(columns)
+        self.batch_rows = batch_rows
+        self.compression = compression
+
+        # Player-plays waiting to be written - a dictionary of column arrays each - and how many frames they hold
+        self.pending = []
+        self.pending_rows = 0
+
+        # Record batch, first row and frame count of every player-play written
+        self.index = {'game':[], 'play':[], 'nflId':[], 'batch':[], 'offset':[], 'frame_count':[]}
+        self.batches = 0
+
+        self.writer = None
+
+    def add(self, game, play, nflId, analysis_frames):
+        '''
+        Adds one player-play's analysis frames (with metrics).
+
+        Parameters:
+            'game', 'play', 'nflId' - Integers - The player-play
+            'analysis_frames' - Dataframe - Its frames, after build_metrics
+        '''
+        frame_count = len(analysis_frames)
+
+        columns = {'game':np.full(frame_count, game, dtype = np.int64),
+                   'play':np.full(frame_count, play, dtype = np.int64),
+                   'nflId':np.full(frame_count, nflId, dtype = np.int64),
+                   'frame_number':np.arange(frame_count, dtype = np.int32)}
+
+        for column in self.columns:
+            columns[column] = analysis_frames[column].to_numpy(dtype = np.float64)
+
+        self.pending.append((columns, [(game, play, nflId, frame_count)]))
+        self.pending_rows += frame_count
+
+        if self.pending_rows >= self.batch_rows:
+            self.flush()
+
+    def add_batch(self, entries, analysis_frames):
+        '''
+        Adds stacked player-plays (nfl_frame_builder.build_week_analysis_frames, after build_metrics_batch).
+
+        Parameters:
+            'entries' - Dataframe - One row per player-play: game, play, nflId and frame_count
+            'analysis_frames' - Dataframe - Their frames, one player-play after another
+        '''
+        frame_count = entries.frame_count.to_numpy()
+        starts = np.cumsum(frame_count) - frame_count
+
+        columns = {'game':np.repeat(entries.game.to_numpy(dtype = np.int64), frame_count),
+                   'play':np.repeat(entries.play.to_numpy(dtype = np.int64), frame_count),
+                   'nflId':np.repeat(entries.nflId.to_numpy(dtype = np.int64), frame_count),
+                   'frame_number':(np.arange(frame_count.sum()) - np.repeat(starts, frame_count)).astype(np.int32)}
+
+        for column in self.columns:
+            columns[column] = analysis_frames[column].to_numpy(dtype = np.float64)
+
+        self.pending.append((columns, list(zip(entries.game, entries.play, entries.nflId, frame_count))))
+        self.pending_rows += int(frame_count.sum())
+
+        if self.pending_rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        '''
+        Writes the waiting player-plays as one record batch.
+        '''
+        if self.pending_rows == 0:
+            return
+
+        names = list(self.pending[0][0].keys())
+        batch = pa.record_batch([np.concatenate([columns[name] for columns, keys in self.pending]) for name in names], names = names)
+
+        if self.writer is None:
+            options = pa.ipc.IpcWriteOptions(compression = self.compression)
+            self.writer = pa.ipc.new_file(self.path + '.tmp', batch.schema, options = options)
+
+        self.writer.write_batch(batch)
+
+        offset = 0
+        for columns, keys in self.pending:
+            for game, play, nflId, frame_count in keys:
+                for column, value in zip(['game', 'play', 'nflId', 'batch', 'offset', 'frame_count'],
+                                         [game, play, nflId, self.batches, offset, frame_count]):
+                    self.index[column].append(int(value))
+                offset += frame_count
+
+        self.batches += 1
+        self.pending = []
+        self.pending_rows = 0
+
+    def close(self):
+        '''
+        Writes what is left, then puts the file and its index in place.
+
+        Returns:
+            'path' - String - The archive file (None if no player-plays were added)
+        '''
+        self.flush()
+
+        if self.writer is None:
+            return None
+
+        self.writer.close()
+        self.writer = None
+
+        os.replace(self.path + '.tmp', self.path)
+        pd.DataFrame(self.index).to_feather(index_path(self.path))
+
+        return self.path
+
+    def discard(self):
+        '''
+        Drops the file being written (e.g. when the build failed).
+        '''
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+        if os.path.exists(self.path + '.tmp'):
+            os.remove(self.path + '.tmp')
+
+
+class FrameArchive:
+    '''
+    Reads a directory of archive files (see FrameArchiveWriter).
+
+    Parameters:
+        'directory' - String - Directory of the archive files
+    '''
+
+    def __init__(self, directory):
+        self.directory = directory
+
+        self.paths = archive_paths(directory)
+
+        # Where each player-play is: its week, file, record batch, first row and frame count
+        indexes = []
+        for path in self.paths:
+            index = pd.read_feather(index_path(path))
+            index.insert(0, 'week', archive_week(path))
+            index['file'] = path
+            indexes.append(index)
+
+        columns = ['week', 'game', 'play', 'nflId', 'batch', 'offset', 'frame_count', 'file']
+        self.index = pd.concat(indexes, ignore_index = True) if indexes else pd.DataFrame(columns = columns)
+
+        self.locations = dict(zip(zip(self.index.game, self.index.play, self.index.nflId), self.index.index))
+
+        # Open readers, by file
+        self.readers = {}
+
+    def keys(self):
+        '''
+        The archived player-plays: week, game, play, nflId and frame_count.
+        '''
+        return self.index[['week', 'game', 'play', 'nflId', 'frame_count']].copy()
+
+    def frames(self, game, play, nflId):
+        '''
+        One player-play's frames (only the record batch holding it is read).
+
+        Returns:
+            'frames' - Dataframe - frame_number and the archived columns, None if the player-play is not archived
+        '''
+        location = self.locations.get((game, play, nflId))
+
+        if location is None:
+            return None
+
+        entry = self.index.loc[location]
+        batch = self.reader(entry.file).get_batch(int(entry.batch)).slice(int(entry.offset), int(entry.frame_count))
+
+        return batch.to_pandas().drop(columns = KEY_COLUMNS)
+
+    def iter_batches(self, weeks = None, columns = None):
+        '''
+        Yields the archive a record batch at a time, as dataframes (game, play, nflId, frame_number and columns).
+
+        Parameters:
+            'weeks' - List of Integers - Only these weeks (all if None)
+            'columns' - List of Strings - Archived columns to include (all if None)
+        '''
+        for path in self.paths:
+            if weeks is not None and archive_week(path) not in weeks:
+                continue
+
+            reader = self.reader(path)
+
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+
+                if columns is not None:
+                    batch = batch.select(KEY_COLUMNS + ['frame_number'] + list(columns))
+
+                yield batch.to_pandas()
+
+    def summarize(self, aggregations, weeks = None, first_seconds = None, frames = None):
+        '''
+        New play-level summaries straight from the archived frames, e.g.
+        summarize({'pursuit_factor':['median', 'max']}, first_seconds = 2.5).  Columns that are not archived raise a
+        ValueError.
+
+        Parameters:
+            'aggregations' - Dictionary - Archived column to the aggregation(s) to make of it, as in pandas agg (names
+                                          such as 'mean', 'median', 'max', 'std' or functions)
+            'weeks' - List of Integers - Only these weeks (all if None)
+            'first_seconds' - Float - Only the frames in the first seconds of each player-play's analysis window
+            'frames' - Tuple - Only frames with start <= frame_number < stop
+        Returns:
+            'summaries' - Dataframe - One row per player-play: week, game, play, nflId and <column>_<aggregation>
+        '''
+        unknown = [column for column in aggregations if column not in ARCHIVE_COLUMNS + ['frame_number']]
+        if unknown:
+            raise ValueError(f'Columns {unknown} are not archived - archived columns are:\n{ARCHIVE_COLUMNS}')
+
+        start, stop = frames if frames is not None else (0, None)
+
+        if first_seconds is not None:
+            stop = int(round(first_seconds * FRAMES_PER_SECOND)) if stop is None else min(stop, int(round(first_seconds * FRAMES_PER_SECOND)))
+
+        # Always lists, so every summary column is named <column>_<aggregation>
+        aggregations = {column:(list(aggregation) if isinstance(aggregation, (list, tuple)) else [aggregation])
+                        for column, aggregation in aggregations.items()}
+
+        summaries = []
+
+        # A player-play is never split between record batches, so each batch is summarized on its own
+        for batch in self.iter_batches(weeks, [column for column in aggregations if column != 'frame_number']):
+            keep = batch.frame_number >= start
+            if stop is not None:
+                keep &= batch.frame_number < stop
+
+            summary = batch[keep].groupby(KEY_COLUMNS, sort = False).agg(aggregations)
+            summary.columns = [f'{column}_{aggregation}' for column, aggregation in summary.columns]
+            summaries.append(summary.reset_index())
+
+        if len(summaries) == 0:
+            return pd.DataFrame(columns = ['week'] + KEY_COLUMNS)
+
+        summaries = pd.concat(summaries, ignore_index = True)
+        summaries = self.index[['week'] + KEY_COLUMNS].merge(summaries, on = KEY_COLUMNS, how = 'inner')
+
+        return summaries
+
+    def reader(self, path):
+        '''
+        Memory mapped reader of an archive file, opened once.
+        '''
+        if path not in self.readers:
+            self.readers[path] = pa.ipc.open_file(pa.memory_map(path))
+
+        return self.readers[path]
+
+
+def open_writer(directory, week_num, games = None, compression = 'zstd'):
+    '''
+    A writer for a week (or some of its games) in an archive directory, or None if pyarrow is not installed.
+
+    Parameters:
+        'directory' - String - Archive directory
+        'week_num' - Integer - Week
+        'games' - List of Integers - The games being built (the whole week if None)
+        'compression' - String - 'zstd', 'lz4' or None
+    Returns:
+        'writer' - FrameArchiveWriter or None
+    '''
+    if pa is None:
+        print('pyarrow is not installed - frames are not archived')
+        return None
+
+    os.makedirs(directory, exist_ok = True)
+
+    name = f'week{week_num}' + ('' if games is None else '-' + '-'.join(str(game) for game in games))
+
+    return FrameArchiveWriter(os.path.join(directory, f'{name}.arrow'), compression = compression)
+
+
+def clear_week(directory, week_num):
+    '''
+    Removes a week's archive files (before it is built again).
+    '''
+    for path in glob.glob(os.path.join(directory, f'week{week_num}.arrow')) + glob.glob(os.path.join(directory, f'week{week_num}-*.arrow')):
+        os.remove(path)
+
+        if os.path.exists(index_path(path)):
+            os.remove(index_path(path))
+
+
+# ----- Support Functions -----------------------------------------------------------------------------
+
+def archive_paths(directory):
+    '''
+    Archive files of a directory, by week.
+    '''
+    return sorted(glob.glob(os.path.join(directory, 'week*.arrow')), key = lambda path: (archive_week(path), path))
+
+
+def archive_week(path):
+    '''
+    Week of an archive file (week3.arrow and week3-2021092600.arrow are week 3).
+    '''
+    return int(os.path.basename(path).split('.')[0].split('-')[0][len('week'):])
+
+
+def index_path(path):
+    '''
+    Index file of an archive file.
+    '''
+    return path[:-len('.arrow')] + '.index.feather'
+
@@ -3,7 +3,9 @@ import pandas as pd
 
 from scipy import spatial
 
+import re
 import warnings
+from collections import OrderedDict
 warnings.filterwarnings('ignore')
 
 import nfl_acquire_and_prep as acquire
@@ -21,7 +23,7 @@ def get_play_frames(game, play, week_df):   # def get_play_frames(game, play): #
     Parameters:
         'game' - Integer - Game number (unique for season)
         'play' - Integer - Unique for game
-        'week_df' - Dataframe - Weekly frame by frame data for each play 
+        'week_df' - Dataframe - Weekly frame by frame data for each play (or an indexed acquire.TrackingStore)
     Returns: 
         'play_frames_df' - Dataframe - All players (nflId) and the ball (nflId = 0) and their movement data.
     '''
@@ -31,8 +33,8 @@ def get_play_frames(game, play, week_df):   # def get_play_frames(game, play): #
     # # Acquire that week's df
     # week_df = acquire.week(week_num)
 
-    # Extract frames for a given play
-    play_frames_df = week_df[week_df.game == game][week_df.play == play]
+    # Extract frames for a given play (a contiguous slice when week_df is an indexed TrackingStore)
+    play_frames_df = acquire.play_rows(week_df, game, play)
     
     # Add in the shifts
     play_frames_df = add_next(play_frames_df)
@@ -42,17 +44,18 @@ def get_play_frames(game, play, week_df):   # def get_play_frames(game, play): #
 
 # ----- Support Functions -----------------------------------------------------------------------------
 
-def get_week_of_game(game):
+def get_week_of_game(game, session = None):
     '''
     Gets the week number of a given game, which is needed to access the proper weekly data csv.
 
     Parameters:
         'game' - Integer - The unique number given to the game
+        'session' - DataSession - Shared tables to use instead of re-reading games.csv on every lookup
     Returns: 
         'week_num' - Integer - The week number for a given game
     '''
     # Acquire small df with game + week information
-    games = acquire.games()
+    games = acquire.get_session(session).games
 
     # Match the game to a week
     week_num = games.loc[games.game == game, 'week']
@@ -78,27 +81,186 @@ def add_next(play_frames_df):
 
 
 
+# ====================================================================================================
+# FRAME CACHE
+# ====================================================================================================
+
+class FrameCache:
+    '''
+    Bounded least recently used cache of built player-plays for interactive analysis, keyed by (game, play, nflId,
+    player_type, v_type).  Each key holds the stages built for that player-play so far - 'frames' (build_play_frames)
+    and 'metrics' (nfl_build_metrics.build_play_metrics) - so the frame builder and the metrics share one cache.
+    
+    The least recently used player-plays are evicted once there are more than max_entries of them or their dataframes
+    take more than max_bytes.  Copies go in and come out, as build_metrics changes frames in place.  Cached frames are
+    not tied to the tracking data they came from: invalidate them if it changes.
+    '''
+    def __init__(self, max_entries = 256, max_bytes = 256 * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        
+        self.entries = OrderedDict()
+        self.entry_bytes = {}
+        self.bytes = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key, stage):
+        '''
+        Gets a copy of a cached stage of a player-play, marking it most recently used.
+        
+        Parameters:
+            'key' - Tuple - (game, play, nflId, player_type, v_type)
+            'stage' - String - 'frames' or 'metrics'
+        Returns:
+            'value' - The cached value (None if not cached)
+        '''
+        stages = self.entries.get(key)
+        
+        if stages is None or stage not in stages:
+            self.misses += 1
+            return None
+        
+        self.entries.move_to_end(key)
+        self.hits += 1
+        
+        return copy_cached(stages[stage])
+    
+    def put(self, key, stage, value):
+        '''
+        Caches a copy of a stage of a player-play, then evicts the least recently used player-plays until the cache
+        is within its limits (a single player-play bigger than max_bytes is not kept).
+        
+        Parameters:
+            'key' - Tuple - (game, play, nflId, player_type, v_type)
+            'stage' - String - 'frames' or 'metrics'
+            'value' - Dataframe or Tuple holding Dataframes - What to cache
+        '''
+        stages = self.entries.pop(key, {})
+        self.bytes -= self.entry_bytes.pop(key, 0)
+        
+        stages[stage] = copy_cached(value)
+        
+        self.entries[key] = stages
+        self.entry_bytes[key] = sum(cached_bytes(cached) for cached in stages.values())
+        self.bytes += self.entry_bytes[key]
+        
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            evicted_key, evicted = self.entries.popitem(last = False)
+            self.bytes -= self.entry_bytes.pop(evicted_key)
+            self.evictions += 1
+    
+    def invalidate(self, game = None, play = None, nflId = None):
+        '''
+        Drops the cached player-plays matching the given game, play and nflId (those not given match anything), so
+        everything is dropped if none are given.
+        
+        Parameters:
+            'game' - Integer - Game number (unique for season), optional
+            'play' - Integer - Unique for game, optional
+            'nflId' - Integer - Unique Id of player, optional
+        Returns:
+            'dropped' - Integer - Number of player-plays dropped
+        '''
+        dropped = [key for key in self.entries 
+                   if all(value is None or key_value == value for key_value, value in zip(key, [game, play, nflId]))]
+        
+        for key in dropped:
+            del self.entries[key]
+            self.bytes -= self.entry_bytes.pop(key)
+        
+        return len(dropped)
+    
+    def stats(self):
+        '''
+        Counters of the cache.
+        
+        Returns:
+            'stats' - Dictionary - hits, misses, evictions, entries (player-plays cached) and bytes (their size)
+        '''
+        return {'hits':self.hits,
+                'misses':self.misses,
+                'evictions':self.evictions,
+                'entries':len(self.entries),
+                'bytes':self.bytes}
+
+
+# ----- Support Functions -----------------------------------------------------------------------------
+
+def copy_cached(value):
+    '''
+    Copies the dataframes of a cached value (a dataframe, or a tuple such as build_play_frames returns).
+    
+    Parameters:
+        'value' - Dataframe or Tuple - Value going into or out of the cache
+    Returns:
+        'value' - Dataframe or Tuple - Same value, with its dataframes copied
+    '''
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    
+    if isinstance(value, tuple):
+        return tuple(copy_cached(part) for part in value)
+    
+    return value
+
+
+def cached_bytes(value):
+    '''
+    Memory taken by the dataframes of a cached value.
+    
+    Parameters:
+        'value' - Dataframe or Tuple - Cached value
+    Returns:
+        'size' - Integer - Bytes
+    '''
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index = True, deep = True).sum())
+    
+    if isinstance(value, tuple):
+        return sum(cached_bytes(part) for part in value)
+    
+    return 0
+
+
+# Shared by the frame builder and metrics for interactive use
+FRAME_CACHE = FrameCache()
+
+
+
+
 # ====================================================================================================
 # BUILD BASE PLAY FRAME
 # ====================================================================================================
 
-def build_play_frames(game, play, week_df, nflId, scout_pass_block, player_type, v_type = 'PvB'): # build_play_frames(game, play, nflId, player_type, v_type = 'PvB'): # 
+def build_play_frames(game, play, week_df, nflId, scout_pass_block, player_type, v_type = 'PvB', cache = FRAME_CACHE): # build_play_frames(game, play, nflId, player_type, v_type = 'PvB'): # 
     '''
     Combines the function which creates the play frames with the function that creates the play frames.
     
     Parameters:
         'game' - Integer - Game number (unique for season)
         'play' - Integer - Unique for game
-        'week_df' - Dataframe - Weekly frame by frame data for each play 
+        'week_df' - Dataframe - Weekly frame by frame data for each play (or an indexed acquire.TrackingStore)
         'nflId' - Integer - Unique Id of player being analyzed
         'scout_pass_block' - Dataframe - Pass blocker PFF scouting data
         'player_type' - String - The type of player bring analyzed (pass_rusher or pass_blocker)
         'v_type' - String - The type of analysis to perform, player vs ball or player vs player (and ball.)  Either 'PvB' or 'PvP'.
+        'cache' - FrameCache - Re-use the frames if this player-play was built before (the shared FRAME_CACHE by
+                                 default, as for build_play_metrics - None to not cache)
     Returns:
         'qb_hold_time' - Float - How long the qb holds the ball (in seconds)
         'point_of_scrimmage' - Tuple of Floats - x and y coordinates of snap
         'analysis_frames' - Dataframe - Complete focused frames of the play ready for analysis
     '''
+    if cache is not None:
+        cache_key = (game, play, nflId, player_type, v_type)
+        
+        cached = cache.get(cache_key, 'frames')
+        if cached is not None:
+            return cached
+    
     play_frames_df = get_play_frames(game, play, week_df) # play_frames_df = get_play_frames(game, play)
     
     qb_hold_time, point_of_scrimmage, analysis_frames = create_play_analysis_frames(play_frames_df,
@@ -107,6 +269,9 @@ def build_play_frames(game, play, week_df, nflId, scout_pass_block, player_type,
                                                                                     player_type = player_type,
                                                                                     v_type = v_type)
     
+    if cache is not None:
+        cache.put(cache_key, 'frames', (qb_hold_time, point_of_scrimmage, analysis_frames))
+    
     return qb_hold_time, point_of_scrimmage, analysis_frames
 
 
@@ -129,95 +294,21 @@ def create_play_analysis_frames(play_frames_df, nflId, scout_pass_block, player_
         'point_of_scrimmage' - Tuple of Floats - x and y coordinates of snap
         'play_fb_frames' - Dataframe - Cleaned frames ready to index players off of 
     '''
-    # Get football frames: used for all
-    qb_hold_time, point_of_scrimmage, play_fb_frames = get_play_fb_frames(play_frames_df)
+    # Ball frames and window are the same for every player in the play
+    play_state = create_play_state(play_frames_df)
     
-    # Get game and play
-    game = int(play_frames_df.game.unique())
-    play = int(play_frames_df.play.unique())
-
-    # Use the matchup function to see what kind of player the NFL ID is, and who they went against in the scouting data
-    # player_type, opponent_type, opponents = matchup_finder(game, play, nflId, player_type)
-    player_type, opponent_type, opponents = matchup_finder(game, play, nflId, player_type, scout_pass_block)
-    
-    # Get the number of opponents (used for labeling)
-    opponent_count = len(opponents)
-    
-    if v_type == 'PvB':
-        # Get player
-        player_frames_df = get_play_player_frames(play_frames_df, nflId)
-        
-        # Rename player analyze to pass_rusher or pass_blocker
-        player_frames_df = rename_player(player_frames_df, player_type)
-        
-        # Create a dataframe which pairs the location and movement with the football and the player frame by frame (0.1 second intervals)
-        pvb_analysis_frames = merge_frames(play_fb_frames, player_frames_df)
-        
-        # Drop first and last frames - while losing a small amount of data improves overall analysis
-        pvb_analysis_frames = pvb_analysis_frames[1:-1]
-        
-        # Reset frames
-        pvb_analysis_frames = pvb_analysis_frames.reset_index(drop = True)
-
-        return qb_hold_time, point_of_scrimmage, pvb_analysis_frames        
-    
-    elif v_type == 'PvP':
-        # Get player
-        player1_frames_df = get_play_player_frames(play_frames_df, nflId)
-        
-        # Rename player analyzed
-        player1_frames_df = rename_player(player1_frames_df, player_type)
-        
-        # Create a dataframe which pairs the location and movement with the football and the player frame by frame (0.1 second intervals)
-        pvp_analysis_frames = merge_frames(play_fb_frames, player1_frames_df)
-    
-        if opponent_count == 1:
-            
-            player = opponents[0]
-        
-            opponent_frames = get_play_player_frames(play_frames_df, player)
-            
-            pvp_analysis_frames = merge_frames(pvp_analysis_frames, opponent_frames)
-            
-            # Rename opponent
-            pvp_analysis_frames = rename_opponents(pvp_analysis_frames, opponent_count, opponent_type)
-    
-        elif opponent_count > 1:
-            
-            # Create a counter for the rename function to keep track of
-            count = 0
-            
-            # Now use this list to add an integer lable to each opponent's columns
-            for player in opponents:
-                # Up the counter for the rename function
-                count += 1
-                opponent_frames = get_play_player_frames(play_frames_df, player)
-                
-                opponent_frames = rename_opponents(opponent_frames, opponent_count, opponent_type, count = count)
-
-                pvp_analysis_frames = merge_frames(pvp_analysis_frames,opponent_frames)     
-        
-        else:
-            print('Player did not have any opponents listed, cannot do PvP, showing PvB instead')            
-        
-        # Drop first and last frames - while losing a small amount of data improves overall analysis
-        pvp_analysis_frames = pvp_analysis_frames[1:-1] 
-        
-        # Reset frames
-        pvp_analysis_frames = pvp_analysis_frames.reset_index(drop = True)
-        
-        return qb_hold_time, point_of_scrimmage, pvp_analysis_frames
-        
-    else:
-        print('v_type inputs are either:\n-"PvB" to compare pass rusher to ball/QB; or:\n-"PvP" to compare pass rusher to blocker')
+    return play_state_analysis_frames(play_state, nflId, scout_pass_block, player_type, v_type)
 
 
-def get_play_fb_frames(play_frames_df):
+def get_play_fb_frames(play_frames_df, play_windows = None):
     '''
     Isolates the football frames (football movement over the course of the play) for a given play.
     
     Parameters:
         'play_frames_df' - Dataframe - All players (nflId) and the ball (nflId = 0) and their movement data.
+        'play_windows' - Dictionary - Snap and end frames of valid plays (acquire.play_window_lookup) - if not given,
+                                      they are found from the play's events with determine_pertinent_frames (a play
+                                      missing from it raises a ValueError)
     Returns:
         'qb_hold_time' - Float - How long the qb holds the ball (in seconds)
         'point_of_scrimmage' - Tuple of Floats - x and y coordinates of snap
@@ -236,7 +327,16 @@ def get_play_fb_frames(play_frames_df):
     play_fb_frames = play_fb_frames[:-1]
     
     # Get the start and end frames of the qb with the ball - allows for qb hold time even if truncate = False
-    snap_frame, end_frame = determine_pertinent_frames(play_fb_frames)
+    if play_windows is None:
+        snap_frame, end_frame = determine_pertinent_frames(play_fb_frames)
+    else:
+        game, play = play_frames_df.game.iloc[0], play_frames_df.play.iloc[0]
+        
+        if (game, play) not in play_windows:
+            raise ValueError(f'No snap and end frames for game {game}, play {play} - only plays that pass '
+                             'acquire.validate_player_plays have a window')
+        
+        snap_frame, end_frame = play_windows[(game, play)]
     
     # Calculate qb hold time
     qb_hold_time = (end_frame - snap_frame)/10
@@ -361,7 +461,7 @@ def determine_pertinent_frames(play_fb_frames):
         
         if trigger == 1:
             # The following events are not end events
-            if event in ['None','autoevent_ballsnap','autoevent_passforward','play_action','first_contact','shift','man_in_motion','line_set']:
+            if event in acquire.NON_END_EVENTS:
                 continue
             # If the trigger is on and the event is an end event, return the index
             else:
@@ -370,7 +470,7 @@ def determine_pertinent_frames(play_fb_frames):
             continue
 
 
-def matchup_finder(game, play, nflId, player_type, scout_pass_block): # matchup_finder(game, play, nflId, player_type):
+def matchup_finder(game, play, nflId, player_type, scout_pass_block, matchup_index = None): # matchup_finder(game, play, nflId, player_type):
     '''
     Used in PvP find the pass blocker(s) blocking the pass rusher, or the pass rusher opposing the blockers
     
@@ -380,12 +480,17 @@ def matchup_finder(game, play, nflId, player_type, scout_pass_block): # matchup_
         'nflId' - Integer - The unique id for the primary player being analyzed
         'player_type' - String - The type of player bring analyzed (pass_rusher or pass_blocker)
         'scout_pass_block' - Dataframe - Pass blocker PFF scouting data
+        'matchup_index' - Dictionary - Prebuilt matchups (acquire.build_matchup_index), optional - looked up instead
+                                       of scanning scout_pass_block
     Returns: 
         'player_type' - String - The type of player bring analyzed (pass_rusher or pass_blocker)
         'opponent_type' - String - The type of player opposing the analyzed player
         'opponent_list' - List of ints - List of nflId ints (players) pass rushing/blocking pass rusher
     '''
     # scout_pass_block = acquire.scout_pass_block()
+    
+    if matchup_index is not None:
+        return indexed_matchup(game, play, nflId, player_type, matchup_index)
 
     scout_pass_block_play = scout_pass_block[scout_pass_block.game == game][scout_pass_block.play == play]
     
@@ -414,6 +519,43 @@ def matchup_finder(game, play, nflId, player_type, scout_pass_block): # matchup_
         return player_type, '', []
 
 
+def indexed_matchup(game, play, nflId, player_type, matchup_index):
+    '''
+    matchup_finder from the prebuilt matchup index: same answers, without scanning scout_pass_block.
+    
+    Parameters:
+        'game' - Integer - Game number (unique for season)
+        'play' - Integer - Unique for game
+        'nflId' - Integer - The unique id for the primary player being analyzed
+        'player_type' - String - The type of player bring analyzed (pass_rusher or pass_blocker)
+        'matchup_index' - Dictionary - Prebuilt matchups (acquire.build_matchup_index)
+    Returns: 
+        'player_type' - String - The type of player bring analyzed (pass_rusher or pass_blocker)
+        'opponent_type' - String - The type of player opposing the analyzed player
+        'opponent_list' - List of ints - List of nflId ints (players) pass rushing/blocking pass rusher
+    '''
+    # Pass blockers are checked first, as in matchup_finder
+    rushers = matchup_index['blocker_rushers'].get((game, play, nflId))
+    
+    if rushers is not None:
+        if player_type == 'pass_rusher':
+            print('Error: Player types do not match.  Check your the player type you inputted as a parameter')
+            return
+        
+        return player_type, 'pass_rusher', list(rushers)
+    
+    blockers = matchup_index['rusher_blockers'].get((game, play, nflId))
+    
+    if blockers is not None:
+        if player_type == 'pass_blocker':
+            print('Error: Player types do not match.  Check your the player type you inputted as a parameter')
+            return
+        
+        return player_type, 'pass_blocker', list(blockers)
+    
+    return player_type, '', []
+
+
 def merge_frames(df1, df2):
     '''
     Puts together different frames generated from the weekly data.
@@ -486,45 +628,690 @@ def rename_opponents(opponent_frames, opponent_count, opponent_type, count = 0):
 
 
 
+# ====================================================================================================
+# BUILD PLAY STATE (ONE PLAY, EVERY PLAYER)
+# ====================================================================================================
+
+def build_play_state(game, play, week_df, play_windows = None):
+    '''
+    Builds the parts of a play's analysis frames that are the same for every player in it (play frames, ball frames
+    from snap to end of the pass rush, qb hold time and point of scrimmage) once, so each of the play's pass rushers
+    and blockers can then be built from it with play_state_analysis_frames.
+    
+    Parameters:
+        'game' - Integer - Game number (unique for season)
+        'play' - Integer - Unique for game
+        'week_df' - Dataframe - Weekly frame by frame data for each play (or an indexed acquire.TrackingStore)
+        'play_windows' - Dictionary - Snap and end frames of valid plays (acquire.play_window_lookup), optional
+    Returns:
+        'play_state' - Dictionary - Shared play frames (see create_play_state)
+    '''
+    play_frames_df = get_play_frames(game, play, week_df)
+    
+    play_state = create_play_state(play_frames_df, play_windows)
+    
+    return play_state
+
+
+def build_play_player_frames(game, play, week_df, scout_pass_rush, scout_pass_block, v_type = 'PvP', include_blockers = False,
+                             play_windows = None, matchup_index = None):
+    '''
+    Play-centric version of build_play_frames: builds the play once and then the analysis frames of every pass rusher
+    in it (and, optionally, every pass blocker).  Players whose frames cannot be built (e.g. player type conflicts)
+    are left out.
+    
+    Parameters:
+        'game' - Integer - Game number (unique for season)
+        'play' - Integer - Unique for game
+        'week_df' - Dataframe - Weekly frame by frame data for each play (or an indexed acquire.TrackingStore)
+        'scout_pass_rush' - Dataframe - Pass rusher PFF scouting data
+        'scout_pass_block' - Dataframe - Pass blocker PFF scouting data
+        'v_type' - String - The type of analysis to perform, player vs ball or player vs player (and ball.)  Either 'PvB' or 'PvP'.
+        'include_blockers' - Boolean - Also build the frames of the play's pass blockers
+        'play_windows' - Dictionary - Snap and end frames of valid plays (acquire.play_window_lookup), optional
+        'matchup_index' - Dictionary - Prebuilt matchups (acquire.build_matchup_index), optional
+    Returns:
+        'play_player_frames' - Dictionary - (nflId, player_type) to (qb_hold_time, point_of_scrimmage, analysis_frames)
+    '''
+    play_state = build_play_state(game, play, week_df, play_windows)
+    
+    # Players of the play, pass rushers first
+    players = [(nflId, 'pass_rusher') for nflId in scout_pass_rush[(scout_pass_rush.game == game) & (scout_pass_rush.play == play)].nflId]
+    
+    if include_blockers:
+        if matchup_index is not None:
+            players += [(nflId, 'pass_blocker') for nflId, rusher in matchup_index['play_matchups'].get((game, play), [])]
+        else:
+            players += [(nflId, 'pass_blocker') for nflId in scout_pass_block[(scout_pass_block.game == game) & (scout_pass_block.play == play)].nflId]
+    
+    play_player_frames = {}
+    
+    for nflId, player_type in players:
+        try:
+            play_player_frames[(nflId, player_type)] = play_state_analysis_frames(play_state, nflId, scout_pass_block, player_type, v_type,
+                                                                                  matchup_index)
+        except TypeError:
+            print(f'*****Could not build {player_type} frames for game|play|nflId = {game}|{play}|{nflId}')
+    
+    return play_player_frames
+
+
+# ----- Sub Functions --------------------------------------------------------------------------------
+
+def create_play_state(play_frames_df, play_windows = None):
+    '''
+    Creates the shared state of a play from its frames.
+    
+    Parameters:
+        'play_frames_df' - Dataframe - All players (nflId) and the ball (nflId = 0) and their movement data.
+        'play_windows' - Dictionary - Snap and end frames of valid plays (acquire.play_window_lookup), optional
+    Returns:
+        'play_state' - Dictionary - game, play, play_frames_df, qb_hold_time, point_of_scrimmage, play_fb_frames
+                                    and player_frames (cleaned frames of each player, added as they are first used)
+    '''
+    # Get football frames: used for all
+    qb_hold_time, point_of_scrimmage, play_fb_frames = get_play_fb_frames(play_frames_df, play_windows)
+    
+    # Get game and play
+    game = int(play_frames_df.game.unique())
+    play = int(play_frames_df.play.unique())
+    
+    play_state = {'game':game,
+                  'play':play,
+                  'play_frames_df':play_frames_df,
+                  'qb_hold_time':qb_hold_time,
+                  'point_of_scrimmage':point_of_scrimmage,
+                  'play_fb_frames':play_fb_frames,
+                  'player_frames':{}}
+    
+    return play_state
+
+
+def play_state_player_frames(play_state, nflId):
+    '''
+    Gets a player's cleaned frames from the play state, building them the first time they are needed.
+    
+    Parameters:
+        'play_state' - Dictionary - Shared play frames (see create_play_state)
+        'nflId' - Integer - Unique Id of the player
+    Returns:
+        'player_frames_df' - Dataframe - Frames of selected player
+    '''
+    if nflId not in play_state['player_frames']:
+        play_state['player_frames'][nflId] = get_play_player_frames(play_state['play_frames_df'], nflId)
+        
+    return play_state['player_frames'][nflId]
+
+
+def play_state_analysis_frames(play_state, nflId, scout_pass_block, player_type, v_type, matchup_index = None, verbose = True):
+    '''
+    Create the play frames, consisting of the curent and next x and y coordiantes, as well as the acceleration
+    at the time of the frame, for the ball and one player of the play, as well as opponents if PvP is selected.
+    Same as create_play_analysis_frames, but from a play state shared by all the play's players.
+    
+    Parameters:
+        'play_state' - Dictionary - Shared play frames (see create_play_state)
+        'nflId' - Integer - Unique Id of player being analyzed
+        'scout_pass_block' - Dataframe - Pass blocker PFF scouting data
+        'player_type' - String - The type of player bring analyzed (pass_rusher or pass_blocker)
+        'v_type' - String - The type of analysis to perform, player vs ball or player vs player (and ball.)  Either 'PvB' or 'PvP'.
+        'matchup_index' - Dictionary - Prebuilt matchups (acquire.build_matchup_index), optional
+        'verbose' - Boolean - Print when PvP falls back to PvB (long builds turn this off)
+    Returns:
+        'qb_hold_time' - Float - How long the qb holds the ball (in seconds)
+        'point_of_scrimmage' - Tuple of Floats - x and y coordinates of snap
+        'analysis_frames' - Dataframe - Complete focused frames of the play ready for analysis
+    '''
+    # Shared football frames
+    game = play_state['game']
+    play = play_state['play']
+    qb_hold_time = play_state['qb_hold_time']
+    point_of_scrimmage = play_state['point_of_scrimmage']
+    play_fb_frames = play_state['play_fb_frames']
+
+    # Use the matchup function to see what kind of player the NFL ID is, and who they went against in the scouting data
+    # player_type, opponent_type, opponents = matchup_finder(game, play, nflId, player_type)
+    player_type, opponent_type, opponents = matchup_finder(game, play, nflId, player_type, scout_pass_block, matchup_index)
+    
+    # Get the number of opponents (used for labeling)
+    opponent_count = len(opponents)
+    
+    if v_type == 'PvB':
+        # Get player
+        player_frames_df = play_state_player_frames(play_state, nflId)
+        
+        # Rename player analyze to pass_rusher or pass_blocker
+        player_frames_df = rename_player(player_frames_df, player_type)
+        
+        # Create a dataframe which pairs the location and movement with the football and the player frame by frame (0.1 second intervals)
+        pvb_analysis_frames = merge_frames(play_fb_frames, player_frames_df)
+        
+        # Drop first and last frames - while losing a small amount of data improves overall analysis
+        pvb_analysis_frames = pvb_analysis_frames[1:-1]
+        
+        # Reset frames
+        pvb_analysis_frames = pvb_analysis_frames.reset_index(drop = True)
+
+        return qb_hold_time, point_of_scrimmage, pvb_analysis_frames        
+    
+    elif v_type == 'PvP':
+        # Get player
+        player1_frames_df = play_state_player_frames(play_state, nflId)
+        
+        # Rename player analyzed
+        player1_frames_df = rename_player(player1_frames_df, player_type)
+        
+        # Create a dataframe which pairs the location and movement with the football and the player frame by frame (0.1 second intervals)
+        pvp_analysis_frames = merge_frames(play_fb_frames, player1_frames_df)
+    
+        if opponent_count == 1:
+            
+            player = opponents[0]
+        
+            opponent_frames = play_state_player_frames(play_state, player)
+            
+            pvp_analysis_frames = merge_frames(pvp_analysis_frames, opponent_frames)
+            
+            # Rename opponent
+            pvp_analysis_frames = rename_opponents(pvp_analysis_frames, opponent_count, opponent_type)
+    
+        elif opponent_count > 1:
+            
+            # Create a counter for the rename function to keep track of
+            count = 0
+            
+            # Now use this list to add an integer lable to each opponent's columns
+            for player in opponents:
+                # Up the counter for the rename function
+                count += 1
+                opponent_frames = play_state_player_frames(play_state, player)
+                
+                opponent_frames = rename_opponents(opponent_frames, opponent_count, opponent_type, count = count)
+
+                pvp_analysis_frames = merge_frames(pvp_analysis_frames,opponent_frames)     
+        
+        elif verbose:
+            print('Player did not have any opponents listed, cannot do PvP, showing PvB instead')            
+        
+        # Drop first and last frames - while losing a small amount of data improves overall analysis
+        pvp_analysis_frames = pvp_analysis_frames[1:-1] 
+        
+        # Reset frames
+        pvp_analysis_frames = pvp_analysis_frames.reset_index(drop = True)
+        
+        return qb_hold_time, point_of_scrimmage, pvp_analysis_frames
+        
+    else:
+        print('v_type inputs are either:\n-"PvB" to compare pass rusher to ball/QB; or:\n-"PvP" to compare pass rusher to blocker')
+
+
+
+
+# ====================================================================================================
+# BUILD BATCHED WEEK FRAMES
+# ====================================================================================================
+
+def build_week_analysis_frames(week_df, scout_pass_rush, scout_pass_block, v_type = 'PvP', matchup_index = None):
+    '''
+    Batched version of build_play_frames: builds the analysis frames of every pass rusher in the week at once and
+    stacks them entry after entry into one long dataframe, instead of building and merging small dataframes for each
+    player-play.  The ball and pass rusher frames match build_play_frames; pass blockers are only carried as the
+    nflId list pull_metrics reports.  Player-plays that build_play_frames or pass_rusher_force would fail on (no
+    snap or end event, player type conflict, pass rusher missing from every analysis frame) are left out.
+    
+    Parameters:
+        'week_df' - Dataframe - Weekly frame by frame data for each play (or an indexed acquire.TrackingStore)
+        'scout_pass_rush' - Dataframe - Pass rusher PFF scouting data
+        'scout_pass_block' - Dataframe - Pass blocker PFF scouting data
+        'v_type' - String - The type of analysis to perform, player vs ball or player vs player (and ball.)  Either 'PvB' or 'PvP'.
+        'matchup_index' - Dictionary - Prebuilt matchups (acquire.build_matchup_index), built from scout_pass_block if
+                                       not given
+    Returns:
+        'entries' - Dataframe - One row per player-play built, in scouting order: scouting index ('entry'), game,
+                                play, nflId, qb_hold_time, point of scrimmage (scrimmage_x, scrimmage_y), the first
+                                row and number of rows of its frames in analysis_frames (frame_start, frame_count)
+                                and its pass_blockers (list of nflIds, as in pull_metrics)
+        'analysis_frames' - Dataframe - Analysis frames of all entries: frame, ball_x, ball_y, ball_next_x,
+                                        ball_next_y, pass_rusher_x, pass_rusher_y, pass_rusher_next_x,
+                                        pass_rusher_next_y and pass_rusher_a
+    '''
+    if matchup_index is None:
+        matchup_index = acquire.build_matchup_index(scout_pass_block)
+    
+    # Same float64 values play_rows gives for a single play
+    tracking = acquire.restore_precision(week_df[['game', 'play', 'nflId', 'frame', 'x', 'y', 'a', 'event']])
+    
+    # Add in the shifts - shifting the whole week at once only differs from shifting play by play on a play's last
+    # row, which is always the last row of a player (or the ball) and so is dropped below
+    tracking = add_next(tracking)
+    
+    # Point of scrimmage is the ball's first frame
+    scrimmage = tracking[tracking.nflId == 0].drop_duplicates(['game', 'play'])
+    scrimmage = scrimmage[['game', 'play', 'x', 'y']].rename(columns = {'x':'scrimmage_x', 'y':'scrimmage_y'})
+    
+    # Drop the last row of the ball and every player, as get_play_fb_frames and get_play_player_frames do
+    tracking = tracking[tracking.duplicated(['game', 'play', 'nflId'], keep = 'last')]
+    
+    # Snap to end of pass rush window of each play - plays without one are left out
+    windows = acquire.build_play_windows(week_df)
+    windows = windows[windows.valid].drop(columns = ['valid'])
+    windows = windows.merge(scrimmage, on = ['game', 'play'], how = 'inner')
+    
+    # Ball frames inside each play's window, and the analysis frames (window without its first and last frames)
+    window_frames = tracking[tracking.nflId == 0].merge(windows, on = ['game', 'play'], how = 'inner')
+    window_frames = window_frames[(window_frames.frame >= window_frames.snap_frame) &
+                                  (window_frames.frame <= window_frames.end_frame)]
+    window_frames['analysis'] = (window_frames.duplicated(['game', 'play'], keep = 'first') &
+                                 window_frames.duplicated(['game', 'play'], keep = 'last'))
+    window_frames = window_frames.reset_index(drop = True)
+    
+    ball_frames = window_frames[window_frames.analysis].reset_index(drop = True)
+    
+    # Entries are the pass rushers of plays with a window, in scouting order
+    entries = scout_pass_rush[['game', 'play', 'nflId']].rename_axis('entry').reset_index()
+    entries = entries.merge(windows, on = ['game', 'play'], how = 'inner')
+    
+    # Pass rushers also listed as pass blockers in the play are a player type conflict in matchup_finder
+    entries = entries[~pd.MultiIndex.from_frame(entries[['game', 'play', 'nflId']]).isin(matchup_index['blocker_keys'])]
+    
+    # Row numbers (in ball_frames) of each entry's analysis frames
+    frame_rows, frame_count = segment_rows(ball_frames, entries)
+    
+    # Pass rusher frames, looked up by (game, play, nflId, frame) - missing frames are NaN as in merge_frames
+    player_rows = pd.MultiIndex.from_frame(tracking[['game', 'play', 'nflId', 'frame']])
+    
+    rusher_rows = player_rows.get_indexer(pd.MultiIndex.from_arrays([ball_frames.game.to_numpy()[frame_rows],
+                                                                     ball_frames.play.to_numpy()[frame_rows],
+                                                                     np.repeat(entries.nflId.to_numpy(), frame_count),
+                                                                     ball_frames.frame.to_numpy()[frame_rows]]))
+    
+    # Pass rushers missing from all of their analysis frames have no nflId to pull a weight for
+    keep = segment_sums(rusher_rows >= 0, frame_count) > 0
+    
+    keep_rows = np.repeat(keep, frame_count)
+    entries = entries[keep].reset_index(drop = True)
+    frame_rows = frame_rows[keep_rows]
+    rusher_rows = rusher_rows[keep_rows]
+    frame_count = frame_count[keep]
+    
+    entries['frame_start'] = np.cumsum(frame_count) - frame_count
+    entries['frame_count'] = frame_count
+    
+    # Stack the ball and pass rusher frames
+    analysis_frames = ball_frames.iloc[frame_rows][['frame', 'x', 'y', 'next_x', 'next_y']].rename(columns = {'x':'ball_x',
+                                                                                                              'y':'ball_y',
+                                                                                                              'next_x':'ball_next_x',
+                                                                                                              'next_y':'ball_next_y'})
+    analysis_frames = analysis_frames.reset_index(drop = True)
+    
+    found = rusher_rows >= 0
+    
+    for column, values in [('pass_rusher_x', tracking.x),
+                           ('pass_rusher_y', tracking.y),
+                           ('pass_rusher_next_x', tracking.next_x),
+                           ('pass_rusher_next_y', tracking.next_y),
+                           ('pass_rusher_a', tracking.a)]:
+        analysis_frames[column] = np.where(found, values.to_numpy(dtype = float)[rusher_rows], np.nan)
+    
+    # List the pass blockers (PvP only)
+    if v_type == 'PvP':
+        entries['pass_blockers'] = week_pass_blockers(entries, window_frames, player_rows, matchup_index)
+    else:
+        entries['pass_blockers'] = [[] for i in range(len(entries))]
+    
+    entries = entries[['entry', 
+                       'game', 
+                       'play', 
+                       'nflId', 
+                       'qb_hold_time', 
+                       'scrimmage_x', 
+                       'scrimmage_y', 
+                       'frame_start', 
+                       'frame_count', 
+                       'pass_blockers']]
+    
+    return entries, analysis_frames
+
+
+# ----- Sub Functions --------------------------------------------------------------------------------
+
+def segment_rows(frames, entries):
+    '''
+    Finds, for each entry, the rows of its play in frames (rows of a play must be together).
+    
+    Parameters:
+        'frames' - Dataframe - Frames of any number of plays, grouped by play
+        'entries' - Dataframe - Player-plays (game and play)
+    Returns:
+        'rows' - Array of Integers - Row numbers of every entry's frames, entry after entry
+        'counts' - Array of Integers - Number of rows of each entry
+    '''
+    starts, stops = acquire.play_boundaries(frames)
+    
+    play_keys = pd.MultiIndex.from_arrays([frames.game.to_numpy()[starts], frames.play.to_numpy()[starts]])
+    position = play_keys.get_indexer(pd.MultiIndex.from_frame(entries[['game', 'play']]))
+    
+    # Entries whose play has no frames get none
+    counts = np.where(position >= 0, (stops - starts)[position], 0)
+    first_row = np.where(position >= 0, starts[position], 0)
+    
+    offsets = np.cumsum(counts) - counts
+    rows = np.repeat(first_row - offsets, counts) + np.arange(counts.sum())
+    
+    return rows, counts
+
+
+def week_pass_blockers(entries, window_frames, player_rows, matchup_index):
+    '''
+    Lists each entry's pass blockers the way pull_metrics does after merge_frames: the nflId if the blocker is in
+    every window frame, the nflId as a float if missing from some (the merged column becomes float), and NaN if
+    missing from all of the analysis frames.
+    
+    Parameters:
+        'entries' - Dataframe - Player-plays (game, play, nflId)
+        'window_frames' - Dataframe - Ball frames in each play's window, with the 'analysis' frames flagged
+        'player_rows' - MultiIndex - (game, play, nflId, frame) of the tracking rows
+        'matchup_index' - Dictionary - Prebuilt matchups (acquire.build_matchup_index)
+    Returns:
+        'pass_blockers' - List of Lists - Pass blocker nflIds of each entry
+    '''
+    # Blockers of each pass rusher, in scouting order (as matchup_finder lists them), all looked up at once
+    blocker_count, blockers = acquire.matchup_lookup(matchup_index, entries.game, entries.play, entries.nflId, role = 'rusher')
+    
+    # One row per (entry, blocker)
+    pairs = entries[['game', 'play']].iloc[np.repeat(np.arange(len(entries)), blocker_count)]
+    pairs['blocker'] = blockers
+    
+    if len(pairs) == 0:
+        return [[] for i in range(len(entries))]
+    
+    # Look up each pair's blocker in each of its play's window frames
+    rows, counts = segment_rows(window_frames, pairs)
+    
+    found = player_rows.get_indexer(pd.MultiIndex.from_arrays([window_frames.game.to_numpy()[rows],
+                                                               window_frames.play.to_numpy()[rows],
+                                                               np.repeat(pairs.blocker.to_numpy(), counts),
+                                                               window_frames.frame.to_numpy()[rows]])) >= 0
+    
+    in_window = segment_sums(found, counts)
+    in_analysis = segment_sums(found & window_frames.analysis.to_numpy()[rows], counts)
+    
+    pass_blockers = []
+    
+    for blocker, window_count, analysis_count, count in zip(pairs.blocker, in_window, in_analysis, counts):
+        if analysis_count == 0:
+            pass_blockers.append(np.nan)
+        elif window_count == count:
+            pass_blockers.append(blocker)
+        else:
+            pass_blockers.append(float(blocker))
+    
+    # Back into one list per entry
+    pass_blockers = iter(pass_blockers)
+    
+    return [[next(pass_blockers) for i in range(count)] for count in blocker_count]
+
+
+# ----- Support Functions -----------------------------------------------------------------------------
+
+def segment_sums(values, counts, skipna = False):
+    '''
+    Sums consecutive segments of an array, like np.add.reduceat but with empty segments summing to 0 (and booleans
+    counted rather than or-ed).  Segments of the same length are summed as the rows of a 2-d array, which adds their
+    values in the same order a 1-d sum does (and so matches pandas' sum and mean to the bit) - reduceat does not.
+    
+    Parameters:
+        'values' - Array - Values of all segments, segment after segment
+        'counts' - Array of Integers - Length of each segment (sums to the length of values)
+        'skipna' - Boolean - Skip NaNs, like pandas' sum (values are summed as floats)
+    Returns:
+        'sums' - Array - Sum of each segment
+    '''
+    if skipna:
+        values = np.asarray(values, dtype = float)
+        values = np.where(np.isnan(values), 0, values)
+    
+    values = np.asarray(values)
+    counts = np.asarray(counts)
+    
+    if values.dtype == bool:
+        values = values.astype(int)
+    
+    sums = np.zeros(len(counts), dtype = values.dtype)
+    starts = np.cumsum(counts) - counts
+    
+    for length in np.unique(counts[counts > 0]):
+        segments = np.flatnonzero(counts == length)
+        sums[segments] = values[starts[segments, None] + np.arange(length)].sum(axis = 1)
+    
+    return sums
+
+
+
+
+# ====================================================================================================
+# FRAME TENSOR
+# ====================================================================================================
+
+# Features of each entity in a frame tensor, in order (the ball has no acceleration, so its 'a' is NaN)
+TENSOR_FEATURES = ['x', 'y', 'next_x', 'next_y', 'a']
+
+
+def build_frame_tensor(play_state, nflId, scout_pass_block, player_type, v_type, matchup_index = None):
+    '''
+    Fixed-shape alternative to play_state_analysis_frames: the same analysis frames as a (frames x entities x features)
+    array with a mask of which entities are on the field in each frame, filled by array indexing instead of merging
+    and renaming a dataframe per player.  Entity 0 is the ball, entity 1 the analyzed player and the rest are the
+    opponents (PvP only), in matchup_finder order.  frame_tensor_to_frames gives back the wide dataframe.
+    
+    Parameters:
+        'play_state' - Dictionary - Shared play frames (see create_play_state)
+        'nflId' - Integer - Unique Id of player being analyzed
+        'scout_pass_block' - Dataframe - Pass blocker PFF scouting data
+        'player_type' - String - The type of player bring analyzed (pass_rusher or pass_blocker)
+        'v_type' - String - The type of analysis to perform, player vs ball or player vs player (and ball.)  Either 'PvB' or 'PvP'.
+        'matchup_index' - Dictionary - Prebuilt matchups (acquire.build_matchup_index), optional
+    Returns:
+        'frame_tensor' - Dictionary - 'frames' (frame number of each row), 'entities' (nflId of each entity, 0 for
+                                      the ball), 'entity_names' (wide dataframe column prefix of each entity),
+                                      'values' (frames x entities x TENSOR_FEATURES), 'mask' (frames x entities),
+                                      'in_window' (entity is in every frame of the play's window, first and last
+                                      included), 'qb_hold_time' and 'point_of_scrimmage'
+    '''
+    if v_type not in ['PvB', 'PvP']:
+        print('v_type inputs are either:\n-"PvB" to compare pass rusher to ball/QB; or:\n-"PvP" to compare pass rusher to blocker')
+        return
+    
+    # Use the matchup function to see what kind of player the NFL ID is, and who they went against in the scouting data
+    player_type, opponent_type, opponents = matchup_finder(play_state['game'], play_state['play'], nflId, player_type,
+                                                           scout_pass_block, matchup_index)
+    
+    if v_type == 'PvB':
+        opponents = []
+    
+    entities = [0, nflId] + list(opponents)
+    entity_names = ['ball', player_type] + tensor_opponent_names(opponent_type, len(opponents))
+    
+    # Football frames of the window - the first and last are dropped at the end, as in play_state_analysis_frames
+    play_fb_frames = play_state['play_fb_frames']
+    frames = play_fb_frames.index.to_numpy()
+    
+    values = np.full((len(frames), len(entities), len(TENSOR_FEATURES)), np.nan)
+    mask = np.zeros((len(frames), len(entities)), dtype = bool)
+    
+    values[:, 0, :4] = play_fb_frames[['ball_x', 'ball_y', 'ball_next_x', 'ball_next_y']].to_numpy(dtype = float)
+    mask[:, 0] = True
+    
+    # Place each player's rows (all but their last, as in get_play_player_frames) at their frames
+    play_frames_df = play_state['play_frames_df']
+    
+    play_nflIds = play_frames_df.nflId.to_numpy()
+    play_frame_numbers = play_frames_df.frame.to_numpy()
+    play_values = play_frames_df[TENSOR_FEATURES].to_numpy(dtype = float)
+    
+    for entity, player in enumerate(entities[1:], start = 1):
+        rows = np.flatnonzero(play_nflIds == player)[:-1]
+        
+        position = np.searchsorted(frames, play_frame_numbers[rows])
+        found = position < len(frames)
+        found[found] = frames[position[found]] == play_frame_numbers[rows[found]]
+        
+        values[position[found], entity] = play_values[rows[found]]
+        mask[position[found], entity] = True
+    
+    if v_type == 'PvP' and len(opponents) == 0:
+        print('Player did not have any opponents listed, cannot do PvP, showing PvB instead')
+    
+    frame_tensor = {'frames':frames[1:-1],
+                    'entities':entities,
+                    'entity_names':entity_names,
+                    'values':values[1:-1],
+                    'mask':mask[1:-1],
+                    'in_window':mask.all(axis = 0),
+                    'qb_hold_time':play_state['qb_hold_time'],
+                    'point_of_scrimmage':play_state['point_of_scrimmage']}
+    
+    return frame_tensor
+
+
+def frame_tensor_to_frames(frame_tensor):
+    '''
+    Converts a frame tensor to the wide analysis frames play_state_analysis_frames builds (same columns, values and
+    dtypes: a player's nflId column is an integer if they are in every window frame, and a float if not).
+    
+    Parameters:
+        'frame_tensor' - Dictionary - Output of build_frame_tensor or frames_to_frame_tensor
+    Returns:
+        'analysis_frames' - Dataframe - Complete focused frames of the play ready for analysis
+    '''
+    values = frame_tensor['values']
+    mask = frame_tensor['mask']
+    
+    columns = {}
+    
+    for k, column in enumerate(['ball_x', 'ball_y', 'ball_next_x', 'ball_next_y']):
+        columns[column] = values[:, 0, k]
+    
+    for entity, (player, name) in enumerate(zip(frame_tensor['entities'], frame_tensor['entity_names'])):
+        if entity == 0:
+            continue
+        
+        player_column = np.where(mask[:, entity], player, np.nan)
+        columns[name] = player_column.astype(int) if frame_tensor['in_window'][entity] else player_column
+        
+        for k, feature in enumerate(TENSOR_FEATURES):
+            columns[f'{name}_{feature}'] = values[:, entity, k]
+    
+    analysis_frames = pd.DataFrame(columns)
+    
+    return analysis_frames
+
+
+def frames_to_frame_tensor(analysis_frames, qb_hold_time = None, point_of_scrimmage = None, frames = None):
+    '''
+    Converts wide analysis frames (play_state_analysis_frames, before build_metrics) to a frame tensor.
+    
+    Parameters:
+        'analysis_frames' - Dataframe - Complete focused frames of the play ready for analysis
+        'qb_hold_time' - Float - How long the qb holds the ball (in seconds), optional
+        'point_of_scrimmage' - Tuple of Floats - x and y coordinates of snap, optional
+        'frames' - Array of Integers - Frame number of each row (row numbers if not given)
+    Returns:
+        'frame_tensor' - Dictionary - See build_frame_tensor (entities missing from every frame have a NaN nflId)
+    '''
+    # Players are the pass_rusher/pass_blocker columns holding nflIds, in column order
+    entity_names = ['ball'] + [column for column in analysis_frames.columns 
+                               if re.fullmatch(r'(pass_rusher|pass_blocker)(_\d+)?', column)]
+    
+    values = np.full((len(analysis_frames), len(entity_names), len(TENSOR_FEATURES)), np.nan)
+    mask = np.ones((len(analysis_frames), len(entity_names)), dtype = bool)
+    in_window = np.ones(len(entity_names), dtype = bool)
+    entities = [0]
+    
+    values[:, 0, :4] = analysis_frames[['ball_x', 'ball_y', 'ball_next_x', 'ball_next_y']].to_numpy(dtype = float)
+    
+    for entity, name in enumerate(entity_names[1:], start = 1):
+        players = analysis_frames[name].dropna()
+        entities.append(int(players.iloc[0]) if len(players) > 0 else np.nan)
+        
+        values[:, entity] = analysis_frames[[f'{name}_{feature}' for feature in TENSOR_FEATURES]].to_numpy(dtype = float)
+        mask[:, entity] = analysis_frames[name].notna().to_numpy()
+        
+        # A float nflId column means the player was missing from some window frame
+        in_window[entity] = pd.api.types.is_integer_dtype(analysis_frames[name])
+    
+    frame_tensor = {'frames':np.arange(len(analysis_frames)) if frames is None else np.asarray(frames),
+                    'entities':entities,
+                    'entity_names':entity_names,
+                    'values':values,
+                    'mask':mask,
+                    'in_window':in_window,
+                    'qb_hold_time':qb_hold_time,
+                    'point_of_scrimmage':point_of_scrimmage}
+    
+    return frame_tensor
+
+
+# ----- Support Functions -----------------------------------------------------------------------------
+
+def tensor_opponent_names(opponent_type, opponent_count):
+    '''
+    Names opponents the way rename_opponents does: just the opponent type for a single opponent, numbered otherwise.
+    
+    Parameters:
+        'opponent_type' - String - Like player_type, is 'pass_rusher' or 'pass_blocker'
+        'opponent_count' - Integer - How many opponents will be analyzed
+    Returns:
+        'opponent_names' - List of Strings - Column prefix of each opponent
+    '''
+    if opponent_count == 1:
+        return [opponent_type]
+    
+    return [f'{opponent_type}_{count}' for count in range(1, opponent_count + 1)]
+
+
+
+
 # ====================================================================================================
 # TESTING FUNCTIONS
 # ====================================================================================================
 
-def random_play():
+def random_play(session = None):
     '''
     Creates a random play to analyze from the entire 8-week season.
     Play numbers can be assigned in different weeks, so they are not unique, hence the need to specify game.
 
     Parameters:
-        NONE
+        'session' - DataSession - Shared tables, so repeated draws do not rebuild the game-play object
     Returns:
         'game' - Integer - Game number (unique for season)
         'play' - Integer - Unique for game
     '''
-    # Pull in data from acquire function that creates an object full of game-play combinations
-    game_play_players = acquire.all_plays()
+    # Pull in the array-backed game-play index (built once per session)
+    play_index = acquire.get_session(session).play_index
 
     # Randomly choose a game then a play from that game
-    game = np.random.choice(list(game_play_players.keys()))
-    play = np.random.choice(list(game_play_players[game]))
+    game = np.random.choice(play_index['games'])
+    play = np.random.choice(acquire.game_plays_from_index(play_index, game))
 
     return game, play
 
 
 # ----- Support Functions -----------------------------------------------------------------------------
 
-def get_players_in_play(game, play):
+def get_players_in_play(game, play, session = None):
     '''
     Gets all of the NFL player ids along with their role and position for a given play.  
     
     Parameters:
         'game' - Integer - Game number (unique for season)
         'play' - Integer - Unique for game
+        'session' - DataSession - Shared tables to use instead of re-reading the scouting csv
     Returns:
         'play_players' - Dataframe - A dataframe of play players and their roles and positions
     '''
     # Load data
-    scout_players = pd.read_csv('data/pffScoutingData.csv')
+    scout_players = acquire.get_session(session).scouting
 
     # Clean and rename
     play_players = scout_players[['gameId',
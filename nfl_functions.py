@@ -4,6 +4,9 @@ import pandas as pd
 from scipy import spatial
 
 import nfl_acquire_and_prep as acquire
+import nfl_telemetry as telemetry_module
+import nfl_results as results_module
+import nfl_rollups as rollups_module
 
 '''
 The following functions are built to create novel features and metrics for various levels of analysis (play, game, season.
@@ -23,74 +26,138 @@ vs. defensive players of this metric.
 # METRIC ANALYSIS FUNCTIONS
 # -----------------------------------------------------------------------------------------------------------------
 
-def full_analysis(return_pursuit_angle = True):
+def full_analysis(return_pursuit_angle = True, session = None, failures = None, telemetry_log = None, sink = None):
     '''
     Emits a dataframe with each pass rusher's metrics for weeks 1-8, along with the outcome from the scouting report.
+    Takes an optional acquire.DataSession so the scouting data is shared with other builds.  Progress is reported as
+    it goes and each week (and the run) summarized with how many player-plays could not be built, by reason (the
+    records are added to failures if given; summaries are appended to telemetry_log or NFL_TELEMETRY, see
+    nfl_telemetry).  Each week's metrics go to sink as the week finishes (in memory if None, or e.g. an
+    nfl_results.PartitionedResultSink to keep them on disk).
     '''
     # Acquire pass rushers
-    pass_rushers_df = acquire.scout_pass_rush()
+    session = acquire.get_session(session)
+    pass_rushers_df = session.scout_pass_rush
     
-    # Create dataframe to hold results
-    all_game_metrics = pd.DataFrame()
+    # Holds results, a week at a time
+    sink = results_module.get_sink(sink)
+    
+    if failures is None:
+        failures = []
+    
+    telemetry = telemetry_module.BuildTelemetry(log_path = telemetry_log, run_info = {'function':'full_analysis'})
     
     # Iterate through each weekly dataset and run function to acquire that week's metrics
     for i in range(8):
-        week_df = acquire.week(i+1)
+        week_df = session.week(i+1)
         
-        week_metrics = week_analysis(week_df, pass_rushers_df, return_pursuit_angle = return_pursuit_angle)
+        week_failures = []
+        week_metrics = week_analysis(week_df, pass_rushers_df, return_pursuit_angle = return_pursuit_angle, failures = week_failures,
+                                     telemetry = telemetry, week_num = i+1)
+        failures += week_failures
         
-        all_game_metrics = pd.concat([all_game_metrics, week_metrics])
+        sink.extend(week_metrics, partition = i+1)
+        sink.flush()
+    
+    telemetry.finish_run(failures = acquire.failure_table(failures), label = 'Weeks 1-8')
         
-    return all_game_metrics
+    return sink.result()
 
 
-def week_analysis(week_df, pass_rushers_df, return_pursuit_angle = True):
+def week_analysis(week_df, pass_rushers_df, return_pursuit_angle = True, failures = None, telemetry = None, week_num = None):
     '''
     Emits a dataframe with each pass rushers metrics for the week, along with the outcome from the scouting report.
+    Failure records of pass rushers that could not be analyzed are added to failures if given.  Progress and the
+    week's summary go to telemetry (a BuildTelemetry of its own if None).
     '''
+    telemetry = telemetry_module.get_telemetry(telemetry)
+    week_failures = []
+    
     # Get a dict of game:plays for the chosen week
     week_game_plays = plays_by_game(week_df)
     
+    # Snap and end frames of every play in the week, found once (the last ball frame is kept here)
+    play_windows = acquire.play_window_lookup(acquire.build_play_windows(week_df, drop_last_frame = False))
+    
     # Pull games from dict
     games = week_game_plays.keys()
     
-    # Create dataframe to hold results
-    week_metrics = pd.DataFrame()
+    telemetry.start(f'Week {week_num}' if week_num else 'Week', total = int(pass_rushers_df.game.isin(list(games)).sum()), week = week_num)
+    
+    # Holds results, put together once at the end
+    week_metrics = results_module.ResultSink()
     
     # Loop through games and pull metrics
     for game in games:
  
-        game_metrics = pd.DataFrame(game_analysis(pass_rushers_df, week_df, game, return_pursuit_angle = return_pursuit_angle))
+        game_metrics = pd.DataFrame(game_analysis(pass_rushers_df, week_df, game, return_pursuit_angle = return_pursuit_angle, play_windows = play_windows, failures = week_failures, telemetry = telemetry))
 
-        week_metrics = pd.concat([week_metrics, game_metrics])        
+        week_metrics.extend(game_metrics)
+    
+    week_failures = acquire.failure_table(week_failures)
+    if failures is not None:
+        failures.append(week_failures)
+    
+    telemetry.finish(built = len(week_metrics), failures = week_failures)
 
-    return week_metrics 
+    return week_metrics.result()
 
 
-def game_analysis(pass_rushers_df, week_df, game, return_pursuit_angle = True):
+def game_analysis(pass_rushers_df, week_df, game, return_pursuit_angle = True, play_windows = None, failures = None, telemetry = None):
     '''
     Emits a dataframe with each pass rushers metrics for the game, along with the outcome from the scouting report.
+    The game's pass rushers are validated up front (acquire.validate_player_plays) so plays without a snap or end
+    event, or rushers without tracking, are skipped before any frames are built.  Failure records (those and any
+    errors raised building a play) are added to failures if given, and counted in telemetry's progress if given.
     '''
     game_plays = plays_by_game(week_df)
     plays = game_plays[game]
-
-    game_metrics = pd.DataFrame()
+    
+    game_frames = week_df[week_df.game == game]
+    window_table = acquire.build_play_windows(game_frames, drop_last_frame = False)
+    
+    if play_windows is None:
+        play_windows = acquire.play_window_lookup(window_table)
+    
+    # Only pass rushers that can be built go on to the play analysis
+    game_pass_rushers, invalid = acquire.validate_player_plays(pass_rushers_df[pass_rushers_df.game == game],
+                                                               game_frames,
+                                                               play_windows = window_table,
+                                                               drop_last_frame = False)
+    if failures is not None:
+        failures.append(invalid)
+    if telemetry is not None:
+        telemetry.advance(failed = len(invalid))
+
+    game_metrics = results_module.ResultSink()
 
     for play in plays:
+        
+        play_pass_rushers = game_pass_rushers[game_pass_rushers.play == play]
+        
+        # Plays without a pass rusher to analyze (their failures were recorded above)
+        if len(play_pass_rushers) == 0:
+            continue
 
-        # Added a try except since there are errors when the snap events are missing
+        # Errors are recorded for each of the play's pass rushers rather than stopping the game
         try:
-            play_metrics = pd.DataFrame(play_analysis(pass_rushers_df, week_df, game, play, return_graph = False, return_pursuit_angle = return_pursuit_angle))
+            play_metrics = pd.DataFrame(play_analysis(game_pass_rushers, week_df, game, play, return_graph = False, return_pursuit_angle = return_pursuit_angle, play_windows = play_windows))
 
-            game_metrics = pd.concat([game_metrics, play_metrics])
+            game_metrics.extend(play_metrics)
+            
+            if telemetry is not None:
+                telemetry.advance(built = len(play_metrics))
         
-        except:
-            print('Error loading (game, play):',game, play)
+        except Exception as error:
+            if failures is not None:
+                failures.append(acquire.failure_rows(play_pass_rushers, 'build_error', f'{type(error).__name__}: {error}'))
+            if telemetry is not None:
+                telemetry.advance(failed = len(play_pass_rushers))
 
-    return game_metrics
+    return game_metrics.result()
 
 
-def play_analysis(pass_rushers_df, week_df, game, play, return_graph = True, return_pursuit_angle = True):
+def play_analysis(pass_rushers_df, week_df, game, play, return_graph = True, return_pursuit_angle = True, play_windows = None):
     '''
     Emits a dataframe with each pass rushers metric for the play, along with the outcome from the scouting report.
     '''
@@ -106,7 +173,7 @@ def play_analysis(pass_rushers_df, week_df, game, play, return_graph = True, ret
     graph_ids = {}
     
     for pass_rusher in play_pass_rush.nflId:
-        line_of_scrimmage, pass_rusher_analysis_frames, player_metrics = player_play_analysis(pass_rushers_df, week_df, pass_rusher, game, play, return_pursuit_angle = return_pursuit_angle)
+        line_of_scrimmage, pass_rusher_analysis_frames, player_metrics = player_play_analysis(pass_rushers_df, week_df, pass_rusher, game, play, return_pursuit_angle = return_pursuit_angle, play_windows = play_windows)
         
         player_metrics = pd.DataFrame(player_metrics)
         
@@ -125,7 +192,7 @@ def play_analysis(pass_rushers_df, week_df, game, play, return_graph = True, ret
     return play_metrics
 
 
-def player_play_analysis(pass_rushers_df, week_df, pass_rusher, game, play, return_graph = False, return_pursuit_angle = True):
+def player_play_analysis(pass_rushers_df, week_df, pass_rusher, game, play, return_graph = False, return_pursuit_angle = True, play_windows = None):
     '''
     Create a single player analysis
     '''
@@ -135,7 +202,7 @@ def player_play_analysis(pass_rushers_df, week_df, pass_rusher, game, play, retu
 
     play_frames_df = get_play_frames(week_df, game, play)
 
-    line_of_scrimmage, football_frames_df = play_fb_frames(play_frames_df)
+    line_of_scrimmage, football_frames_df = play_fb_frames(play_frames_df, play_windows = play_windows)
 
     pass_rusher_analysis_frames = create_pass_rusher_analysis_frames(football_frames_df, play_frames_df, pass_rusher)
 
@@ -180,15 +247,16 @@ def get_play_frames(week_df, game, play):
     '''
     Takes in the full weekly dataframe and returns selected play from a selected game in 0.1 second frames.
     '''
-    # Extract frames for a given play
-    play_frames_df = week_df[week_df.game == game][week_df.play == play]
+    # Extract frames for a given play (a contiguous slice when week_df is an indexed TrackingStore)
+    play_frames_df = acquire.play_rows(week_df, game, play)
 
     return play_frames_df
 
 
-def play_fb_frames(play_frames_df):
+def play_fb_frames(play_frames_df, play_windows = None):
     '''
     Isolates the football frames (football movement over the course of the play) for a given play.
+    Snap and end frames come from play_windows (acquire.play_window_lookup) when given.
     '''
     # nflId for the football is 0, creates a dataframe of the football over the play
     football_frames_df = play_frames_df[play_frames_df.nflId == 0].set_index('frame',drop = True)
@@ -197,7 +265,10 @@ def play_fb_frames(play_frames_df):
     line_of_scrimmage = football_frames_df.x.iloc[0]
 
     # Remove all frames before snap and after event where ball is no longer being pass rushed
-    snap_frame, end_frame = determine_pertinent_frames(football_frames_df)
+    if play_windows is None:
+        snap_frame, end_frame = determine_pertinent_frames(football_frames_df)
+    else:
+        snap_frame, end_frame = play_windows.get((play_frames_df.game.iloc[0], play_frames_df.play.iloc[0]))
     football_frames_df = football_frames_df[(football_frames_df.index >= snap_frame) & (football_frames_df.index <= end_frame)]
 
     # Clean the frames up
@@ -238,7 +309,7 @@ def determine_pertinent_frames(football_frames):
         
         if trigger == 1:
             # The following events are not end events
-            if event in ['None','autoevent_ballsnap','autoevent_passforward','play_action','first_contact','shift','man_in_motion','line_set']:
+            if event in acquire.NON_END_EVENTS:
                 continue
             # If the trigger is on and the event is an end event, return the index
             else:
@@ -556,12 +627,19 @@ def plays_by_game(week_df):
 
 def group_results(metrics_df):
     '''
-    
+    Averages each player's numeric (and boolean) columns over their plays, with play_count - from the same mergeable
+    aggregates as nfl_rollups, so weeks grouped this way can be combined without grouping their plays again.  Rows
+    without a Player are left out, as groupby leaves them out.
     '''
-    play_count = list(metrics_df.groupby(by = 'Player').Player.count())
+    metrics_df = metrics_df[metrics_df.Player.notna()]
+
+    metric_columns = [column for column in metrics_df.select_dtypes(['number', 'bool']).columns if column != 'Player']
+
+    aggregates = rollups_module.aggregate(metrics_df, ['Player'], metric_columns)
 
-    metrics_df = metrics_df.groupby(by = 'Player').mean()
+    metrics_df = rollups_module.metric_means(aggregates, metric_columns, ['Player']).set_index('Player')
 
-    metrics_df['play_count'] = play_count
+    # play_count after the metrics, as before
+    metrics_df['play_count'] = metrics_df.pop('play_count')
 
     return metrics_df
\ No newline at end of file
@@ -0,0 +1,301 @@
+'''
+Per-stage profiling of the pipeline: cumulative and own wall time and call counts of every stage function of the frame
+builder, the metrics and the aggregation (and of the pandas merges and concats they make), with optional tracemalloc
+allocation counts.
+
+Off by default and free when off - stage functions are only wrapped while profiling is enabled.  Turn it on with
+profile = True in all_week_pass_rush_results (or the NFL_PROFILE environment variable: NFL_PROFILE=1 for times,
+NFL_PROFILE=memory for times and allocations), or around any code with enable() ... report() ... disable().
+'''
+import os
+import time
+import functools
+import importlib
+import tracemalloc
+
+import pandas as pd
+
+# Stage functions of each module, in pipeline order (a dotted name is a method - the builders join with df.merge)
+STAGES = {'nfl_frame_builder':['build_play_frames',
+                               'get_play_frames',
+                               'create_play_analysis_frames',
+                               'build_play_state',
+                               'create_play_state',
+                               'get_play_fb_frames',
+                               'get_play_player_frames',
+                               'clean_fb_frames',
+                               'clean_player_frames',
+                               'determine_pertinent_frames',
+                               'play_state_analysis_frames',
+                               'matchup_finder',
+                               'merge_frames',
+                               'rename_player',
+                               'rename_opponents',
+                               'build_week_analysis_frames',
+                               'build_frame_tensor'],
+          'nfl_build_metrics':['build_metrics',
+                               'recenter_on_snap',
+                               'create_movement_vectors',
+                               'create_rusher_to_ball_vector',
+                               'create_ball_to_rusher_vector',
+                               'create_change_in_distance_measurement',
+                               'create_change_in_distance_ratio',
+                               'player_opponent_distance',
+                               'add_pass_rusher_to_ball_colinearity',
+                               'create_pursuit_factor',
+                               'pass_rusher_to_ball_vectors',
+                               'create_escape_factor',
+                               'ball_to_pass_rusher_vectors',
+                               'pass_rusher_force',
+                               'create_true_pursuit',
+                               'create_pursuit1',
+                               'create_pursuit2',
+                               'create_pursuit3',
+                               'create_pursuit4',
+                               'build_metrics_numpy',
+                               'build_metrics_batch',
+                               'build_metrics_tensor',
+                               'frame_metric_arrays'],
+          'nfl_use_metrics':['week_pass_rush_results',
+                             'play_player_metrics_builder',
+                             'play_player_metrics_batch',
+                             'pull_metrics',
+                             'pull_metrics_batch'],
+          'pandas':['merge',
+                    'DataFrame.merge',
+                    'concat']}
+
+# Environment variable that turns profiling on for all_week_pass_rush_results ('1' or 'memory')
+PROFILE_VARIABLE = 'NFL_PROFILE'
+
+# Cumulative stats of each stage ('module.function'): calls, seconds, own_seconds, and allocated and peak bytes
+stage_stats = {}
+
+# Stage calls in progress, innermost last - each is [child seconds, highest peak seen in its children]
+call_stack = []
+
+# The unwrapped stage functions while profiling is enabled
+originals = {}
+
+trace_memory = False
+
+
+def enable(memory = False):
+    '''
+    Starts profiling: wraps every stage function (see STAGES) so its calls are counted and timed.  Stats keep adding up
+    until reset.
+
+    Parameters:
+        'memory' - Boolean - Also count allocations with tracemalloc (much slower, so times are inflated)
+    '''
+    global trace_memory
+
+    if originals:
+        disable()
+
+    trace_memory = memory
+
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    for module_name, function_names in STAGES.items():
+        module = importlib.import_module(module_name)
+
+        for function_name in function_names:
+            owner, attribute = stage_owner(module, function_name)
+            function = getattr(owner, attribute, None)
+
+            if function is None:
+                continue
+
+            originals[(owner, attribute)] = function
+            setattr(owner, attribute, profiled(f'{module_name}.{function_name}', function))
+
+
+def disable():
+    '''
+    Stops profiling: puts the original stage functions back.  Stats are kept for report.
+    '''
+    global trace_memory
+
+    for (owner, attribute), function in originals.items():
+        setattr(owner, attribute, function)
+
+    originals.clear()
+    call_stack.clear()
+
+    if trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+    trace_memory = False
+
+
+def is_enabled():
+    '''
+    Whether the stage functions are currently wrapped.
+    '''
+    return len(originals) > 0
+
+
+def reset():
+    '''
+    Clears the stats.
+    '''
+    stage_stats.clear()
+
+
+def requested(profile = None):
+    '''
+    Profiling mode asked for by a profile argument, or by NFL_PROFILE when the argument is None.
+
+    Parameters:
+        'profile' - Boolean or String - True (times), 'memory' (times and allocations), False or None
+    Returns:
+        'mode' - String - None, 'time' or 'memory'
+    '''
+    if profile is None:
+        profile = os.environ.get(PROFILE_VARIABLE, '').strip().lower()
+        profile = False if profile in ['', '0', 'false', 'no', 'off'] else profile
+
+    if not profile:
+        return None
+
+    return 'memory' if profile == 'memory' else 'time'
+
+
+def report(sort_by = 'seconds'):
+    '''
+    The stats of every stage called since the last reset.
+
+    Parameters:
+        'sort_by' - String - Column to sort by (largest first)
+    Returns:
+        'stage_report' - Dataframe - Per stage: calls, seconds (including the stages it calls), own_seconds (excluding
+                                     them), ms_per_call and, when allocations were traced, allocated_mb (net, kept
+                                     after the call) and peak_mb (highest above the start of a call)
+    '''
+    columns = ['calls', 'seconds', 'own_seconds', 'ms_per_call', 'allocated_mb', 'peak_mb']
+
+    if len(stage_stats) == 0:
+        return pd.DataFrame(columns = columns).rename_axis('stage')
+
+    stage_report = pd.DataFrame.from_dict(stage_stats, orient = 'index').rename_axis('stage')
+
+    stage_report['ms_per_call'] = stage_report.seconds / stage_report.calls * 1000
+    stage_report['allocated_mb'] = stage_report.pop('allocated_bytes') / 2**20
+    stage_report['peak_mb'] = stage_report.pop('peak_bytes') / 2**20
+
+    if not stage_report.traced.any():
+        stage_report = stage_report.drop(columns = ['allocated_mb', 'peak_mb'])
+
+    stage_report = stage_report.drop(columns = ['traced']).sort_values(sort_by, ascending = False)
+
+    return stage_report.round(4)
+
+
+def snapshot():
+    '''
+    A copy of the raw stats, e.g. to send back from a worker process and merge into the main one.
+    '''
+    return {stage:dict(stats) for stage, stats in stage_stats.items()}
+
+
+def merge(stats):
+    '''
+    Adds stats from snapshot (of another process) to these.
+
+    Parameters:
+        'stats' - Dictionary - Output of snapshot
+    '''
+    for stage, other in stats.items():
+        stage_stat = stage_stats.setdefault(stage, new_stat())
+
+        for key in ['calls', 'seconds', 'own_seconds', 'allocated_bytes']:
+            stage_stat[key] += other[key]
+
+        stage_stat['peak_bytes'] = max(stage_stat['peak_bytes'], other['peak_bytes'])
+        stage_stat['traced'] = stage_stat['traced'] or other['traced']
+
+
+# ----- Sub Functions --------------------------------------------------------------------------------
+
+def profiled(stage, function):
+    '''
+    Wraps a stage function so each call adds to the stage's stats.  Time spent in stages it calls is taken out of its
+    own time, and a stage's peak allocation includes the peaks of the stages it calls.
+
+    Parameters:
+        'stage' - String - Name in the report
+        'function' - Function - Stage function
+    Returns:
+        'wrapper' - Function - Profiled stage function
+    '''
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        traced = trace_memory and tracemalloc.is_tracing()
+
+        if traced:
+            # Peak so far belongs to the calling stage, then measure this call's own peak
+            current, peak = tracemalloc.get_traced_memory()
+            if call_stack:
+                call_stack[-1][1] = max(call_stack[-1][1], peak)
+            tracemalloc.reset_peak()
+
+        call_stack.append([0.0, 0])
+        start = time.perf_counter()
+
+        try:
+            return function(*args, **kwargs)
+
+        finally:
+            seconds = time.perf_counter() - start
+            child_seconds, child_peak = call_stack.pop()
+
+            stage_stat = stage_stats.setdefault(stage, new_stat())
+            stage_stat['calls'] += 1
+            stage_stat['seconds'] += seconds
+            stage_stat['own_seconds'] += seconds - child_seconds
+
+            if call_stack:
+                call_stack[-1][0] += seconds
+
+            if traced:
+                after, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, child_peak)
+
+                stage_stat['allocated_bytes'] += after - current
+                stage_stat['peak_bytes'] = max(stage_stat['peak_bytes'], peak - current)
+                stage_stat['traced'] = True
+
+                if call_stack:
+                    call_stack[-1][1] = max(call_stack[-1][1], peak)
+
+    return wrapper
+
+
+# ----- Support Functions -----------------------------------------------------------------------------
+
+def stage_owner(module, function_name):
+    '''
+    The object a stage function is an attribute of (the module, or a class of it for a dotted name such as
+    'DataFrame.merge'), and the attribute's name.
+    '''
+    *path, attribute = function_name.split('.')
+
+    owner = module
+    for name in path:
+        owner = getattr(owner, name)
+
+    return owner, attribute
+
+
+def new_stat():
+    '''
+    Empty stats of a stage.
+    '''
+    return {'calls':0,
+            'seconds':0.0,
+            'own_seconds':0.0,
+            'allocated_bytes':0,
+            'peak_bytes':0,
+            'traced':False}
@@ -0,0 +1,456 @@
+'''
+Result sinks: where the player-play rows of a build go instead of being grown one pd.concat at a time.
+
+Rows are appended as dictionaries (or whole dataframes) and buffered column by column; every batch_rows rows, and
+whenever the partition (week) changes or flush is called, the buffered columns become one dataframe batch.  A
+ResultSink keeps its batches in memory; a PartitionedResultSink writes each one to a file under a partition
+directory (week=1/part-00000.parquet, ...), so finished weeks are on disk as soon as they are flushed and survive a
+crash later in the run.  Either way the combined result is only put together when result() is called.
+
+Usage:
+    sink = PartitionedResultSink('metric_results_weeks_1_through_8')
+    sink.append({'game':2021090900, 'play':97, 'pursuit_factor':0.41}, partition = 1)
+    sink.extend(week_results, partition = 2)
+    sink.flush()
+    all_results = sink.result()
+'''
+import os
+import glob
+import json
+import shutil
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+# Rows buffered before they are turned into a batch (and written, for a partitioned sink)
+BATCH_ROWS = 5000
+
+# Parquet engines pandas can write with, in order of preference
+PARQUET_ENGINES = ['pyarrow', 'fastparquet']
+
+
+class ResultSink:
+    '''
+    Collects result rows in memory, in columnar batches, and puts them together once when result() is called.
+
+    Parameters:
+        'batch_rows' - Integer - Rows buffered before they become a batch
+        'dtypes' - Dictionary - Column dtypes to give each batch (e.g. scout_pass_rush.dtypes, so rows appended as
+                                dictionaries keep the scouting dtypes)
+    '''
+
+    def __init__(self, batch_rows = BATCH_ROWS, dtypes = None):
+        self.batch_rows = batch_rows
+        self.dtypes = dict(dtypes) if dtypes is not None else {}
+
+        # Buffered rows, column by column, and the partition they belong to
+        self.columns = {}
+        self.buffered = 0
+        self.partition = None
+
+        # Rows appended so far, including buffered ones
+        self.rows = 0
+
+        # Batches kept in memory, by partition
+        self.batches = {}
+        self.combined = None
+
+    def __len__(self):
+        return self.rows
+
+    def append(self, row, partition = None):
+        '''
+        Buffers one row.
+
+        Parameters:
+            'row' - Dictionary - Column name to value (columns missing from a row are left empty)
+            'partition' - Integer - Partition (week) of the row
+        '''
+        if self.buffered and partition != self.partition:
+            self.flush()
+
+        self.partition = partition
+
+        # Columns in the order they first appear
+        for column in row:
+            if column not in self.columns:
+                self.columns[column] = [None] * self.buffered
+
+        for column, values in self.columns.items():
+            values.append(row.get(column))
+
+        self.buffered += 1
+        self.rows += 1
+
+        if self.buffered >= self.batch_rows:
+            self.flush()
+
+    def extend(self, frame, partition = None):
+        '''
+        Adds a dataframe of rows as a batch of its own (after flushing any buffered rows).
+
+        Parameters:
+            'frame' - Dataframe - Rows to add
+            'partition' - Integer - Partition (week) of the rows
+        '''
+        self.flush()
+
+        if frame is None or len(frame) == 0:
+            return
+
+        self.rows += len(frame)
+        self.write(frame, partition)
+
+    def flush(self):
+        '''
+        Turns the buffered rows into a batch (written out, for a partitioned sink).
+        '''
+        if self.buffered == 0:
+            return
+
+        frame = apply_dtypes(pd.DataFrame(self.columns), self.dtypes)
+
+        self.columns = {column:[] for column in self.columns}
+        self.buffered = 0
+
+        self.write(frame, self.partition)
+
+    def write(self, frame, partition):
+        '''
+        Stores a batch.
+        '''
+        self.batches.setdefault(partition, []).append(frame)
+        self.combined = None
+
+    def partitions(self):
+        '''
+        The partitions stored so far (flushed rows only), in the order they were first written.
+        '''
+        return list(self.batches.keys())
+
+    def read(self, partition):
+        '''
+        The rows of one partition.
+
+        Parameters:
+            'partition' - Integer - Partition (week)
+        Returns:
+            'frame' - Dataframe - The partition's rows (empty if there are none)
+        '''
+        self.flush()
+
+        return combine(self.batches.get(partition, []))
+
+    def iter_partitions(self):
+        '''
+        Yields (partition, frame) one partition at a time, so a large result never has to be in memory at once.
+        '''
+        self.flush()
+
+        for partition in self.partitions():
+            yield partition, self.read(partition)
+
+    def result(self):
+        '''
+        Every row, put together (once, and again only after more rows are added).
+
+        Returns:
+            'results' - Dataframe - All rows in the order they were added
+        '''
+        self.flush()
+
+        if self.combined is None:
+            self.combined = combine([self.read(partition) for partition in self.partitions()])
+
+        return self.combined
+
+
+class PartitionedResultSink(ResultSink):
+    '''
+    Writes result batches to files under one directory per partition as they are flushed:
+    <directory>/<partition_name>=<partition>/part-00000.<format>.  A partition's earlier files (e.g. from a previous
+    run) are replaced the first time the sink writes to it, unless they are carried on with keep.  result() reads the
+    files back.
+
+    Parameters:
+        'directory' - String - Where the partitions are written
+        'file_format' - String - 'parquet' or 'csv' (parquet if an engine is installed, otherwise csv, if None)
+        'partition_name' - String - Name of the partition key in the directory names
+        'batch_rows' - Integer - Rows buffered before they are written
+        'dtypes' - Dictionary - Column dtypes to give each batch (and csv files read back)
+    '''
+
+    def __init__(self, directory, file_format = None, partition_name = 'week', batch_rows = BATCH_ROWS, dtypes = None):
+        super().__init__(batch_rows = batch_rows, dtypes = dtypes)
+
+        if file_format is None:
+            file_format = 'parquet' if parquet_engine() else 'csv'
+
+        if file_format == 'parquet' and parquet_engine() is None:
+            print(f'No parquet engine ({" or ".join(PARQUET_ENGINES)}) installed - writing {directory} as csv')
+            file_format = 'csv'
+
+        self.directory = directory
+        self.file_format = file_format
+        self.partition_name = partition_name
+
+        # Files written so far (or kept), by partition, and the number of the next file of each
+        self.files = {}
+        self.next_part = {}
+
+        os.makedirs(directory, exist_ok = True)
+
+    def write(self, frame, partition):
+        '''
+        Writes a batch to the next file of its partition (to a temporary file first, so an interrupted write never
+        leaves a partial file behind).
+        '''
+        partition_dir = self.partition_dir(partition)
+
+        if partition not in self.files:
+            # Replaces what an earlier run left in this partition
+            shutil.rmtree(partition_dir, ignore_errors = True)
+            os.makedirs(partition_dir, exist_ok = True)
+            self.files[partition] = []
+
+        path = os.path.join(partition_dir, f'part-{self.next_part.get(partition, 0):05d}.{self.file_format}')
+        self.next_part[partition] = self.next_part.get(partition, 0) + 1
+
+        if self.file_format == 'parquet':
+            frame.to_parquet(path + '.tmp', index = False)
+        else:
+            encode_lists(frame).to_csv(path + '.tmp', index = False)
+
+        os.replace(path + '.tmp', path)
+
+        self.files[partition].append(path)
+        self.combined = None
+
+    def partitions(self):
+        return list(self.files.keys())
+
+    def read(self, partition):
+        self.flush()
+
+        return read_partition(self.files.get(partition, []), self.dtypes)
+
+    def keep(self, partition, paths):
+        '''
+        Carries on a partition from an earlier run: the given files stay part of it (and of result()) and the sink's
+        files are added after them.  Any other part files in the partition (e.g. from a write that was interrupted)
+        are removed.
+
+        Parameters:
+            'partition' - Integer - Partition (week)
+            'paths' - List of Strings - Files of the partition to keep
+        '''
+        partition_dir = self.partition_dir(partition)
+        os.makedirs(partition_dir, exist_ok = True)
+
+        paths = [os.path.join(partition_dir, os.path.basename(path)) for path in paths]
+
+        for path in part_paths(partition_dir):
+            if path not in paths:
+                os.remove(path)
+
+        self.files[partition] = paths
+        self.next_part[partition] = max([part_number(path) + 1 for path in paths], default = 0)
+        self.combined = None
+
+    def compact(self, partition, frame):
+        '''
+        Rewrites a partition as one file holding frame (e.g. its rows put in order), removing its other files.
+
+        Parameters:
+            'partition' - Integer - Partition (week)
+            'frame' - Dataframe - Every row of the partition
+        Returns:
+            'path' - String - The partition's file (None if frame is empty)
+        '''
+        self.flush()
+
+        old_paths = self.files.get(partition, [])
+        self.files[partition] = []
+
+        if len(frame):
+            self.write(frame, partition)
+
+        for path in old_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+        self.combined = None
+
+        return self.files[partition][-1] if self.files[partition] else None
+
+    def partition_dir(self, partition):
+        '''
+        Directory of a partition's files.
+        '''
+        return os.path.join(self.directory, f'{self.partition_name}={partition}')
+
+
+def open_partitions(directory, partition_name = 'week', partitions = None, dtypes = None):
+    '''
+    Reads a directory written by a PartitionedResultSink (e.g. the finished weeks of a run that stopped part way).
+
+    Parameters:
+        'directory' - String - Directory of the partitions
+        'partition_name' - String - Name of the partition key in the directory names
+        'partitions' - List - Only read these partitions (all if None)
+        'dtypes' - Dictionary - Column dtypes to give csv files read back
+    Returns:
+        'results' - Dataframe - Rows of the partitions, in partition order
+    '''
+    frames = []
+
+    for partition, paths in partition_files(directory, partition_name).items():
+        if partitions is not None and partition not in partitions:
+            continue
+
+        frames.append(read_partition(paths, dtypes))
+
+    return combine(frames)
+
+
+# ----- Support Functions -----------------------------------------------------------------------------
+
+def parquet_engine():
+    '''
+    The first installed parquet engine (see PARQUET_ENGINES), or None.
+    '''
+    for engine in PARQUET_ENGINES:
+        if importlib.util.find_spec(engine) is not None:
+            return engine
+
+    return None
+
+
+def get_sink(sink = None, dtypes = None):
+    '''
+    Returns the given sink, or a new in-memory one, so builders can be called with or without a shared one.
+    '''
+    if sink is None:
+        sink = ResultSink(dtypes = dtypes)
+
+    return sink
+
+
+def partition_files(directory, partition_name = 'week'):
+    '''
+    Files of each partition under a directory, partitions in (numeric where possible) order.
+
+    Returns:
+        'files' - Dictionary - {partition:[paths]}
+    '''
+    files = {}
+
+    for partition_dir in glob.glob(os.path.join(directory, f'{partition_name}=*')):
+        partition = os.path.basename(partition_dir).split('=', 1)[1]
+        partition = int(partition) if partition.lstrip('-').isdigit() else partition
+
+        paths = part_paths(partition_dir)
+
+        if paths:
+            files[partition] = paths
+
+    return dict(sorted(files.items(), key = lambda item: (isinstance(item[0], str), item[0])))
+
+
+def part_paths(partition_dir):
+    '''
+    Part files of a partition directory, in the order they were written.
+    '''
+    paths = glob.glob(os.path.join(partition_dir, 'part-*.parquet')) + glob.glob(os.path.join(partition_dir, 'part-*.csv'))
+
+    return sorted(paths, key = part_number)
+
+
+def part_number(path):
+    '''
+    Number of a part file (part-00012.parquet is 12).
+    '''
+    return int(os.path.basename(path).split('.')[0].split('-')[1])
+
+
+def read_partition(paths, dtypes = None):
+    '''
+    Reads a partition's files (parquet or csv, by extension) into one dataframe.  Lists stored in parquet come back as
+    lists rather than arrays, and lists stored in csv (as JSON text) as lists rather than strings.
+    '''
+    frames = []
+
+    for path in paths:
+        if path.endswith('.parquet'):
+            frames.append(pd.read_parquet(path))
+        else:
+            frames.append(decode_lists(apply_dtypes(pd.read_csv(path), dtypes or {}, numeric_only = True)))
+
+    frame = combine(frames)
+
+    for column in frame.columns[frame.dtypes == object]:
+        if len(frame) and isinstance(frame[column].iloc[0], np.ndarray):
+            frame[column] = [value.tolist() if isinstance(value, np.ndarray) else value for value in frame[column]]
+
+    return frame
+
+
+def encode_lists(frame):
+    '''
+    A copy of a frame with its list-valued columns (e.g. pass_blockers) as JSON text, for csv.
+    '''
+    frame = frame.copy()
+
+    for column in frame.columns[frame.dtypes == object]:
+        if frame[column].map(lambda value: isinstance(value, (list, np.ndarray))).any():
+            frame[column] = [json.dumps(np.asarray(value).tolist()) if isinstance(value, (list, np.ndarray)) else value
+                             for value in frame[column]]
+
+    return frame
+
+
+def decode_lists(frame):
+    '''
+    Turns the JSON text encode_lists wrote back into lists (columns whose every string is a JSON list).
+    '''
+    for column in frame.columns[frame.dtypes == object]:
+        strings = [value for value in frame[column] if isinstance(value, str)]
+
+        if strings and all(value.startswith('[') and value.endswith(']') for value in strings):
+            frame[column] = [json.loads(value) if isinstance(value, str) else value for value in frame[column]]
+
+    return frame
+
+
+def apply_dtypes(frame, dtypes, numeric_only = False):
+    '''
+    Casts the columns of a frame that have a dtype in dtypes (numeric dtypes only if numeric_only).
+    '''
+    for column, dtype in dtypes.items():
+        if column not in frame.columns or frame[column].dtype == dtype:
+            continue
+
+        if numeric_only and not pd.api.types.is_numeric_dtype(dtype):
+            continue
+
+        try:
+            frame[column] = frame[column].astype(dtype)
+        except (TypeError, ValueError):
+            # e.g. missing values in an integer column - left as they are
+            pass
+
+    return frame
+
+
+def combine(frames):
+    '''
+    One concat of a list of batches, numbered 0..n-1 (an empty dataframe if there are none).
+    '''
+    if len(frames) == 0:
+        return pd.DataFrame()
+
+    if len(frames) == 1:
+        return frames[0].reset_index(drop = True)
+
+    return pd.concat(frames, ignore_index = True)
@@ -0,0 +1,314 @@
+'''
+Player-play results in a local SQLite file, indexed for the lookups the notebooks make over and over - a player's
+season averages, a team's pass rushers in a week, the top rushers by a metric - so they come back in milliseconds
+without reading the whole results csv into pandas.
+
+Each result row is stored with the week (from games), the rushing team (the play's defense) and the player's name
+joined in.  Rows are indexed by nflId, game, play, position, week and (team, week).  Weeks can be loaded all at once
+or one at a time as they are built (a week that is loaded again replaces its rows).
+
+Usage:
+    build_results_db(all_results, session, 'metric_results.sqlite')
+
+    with ResultsDB('metric_results.sqlite') as db:
+        db.player_season(nflId = 43335)
+        db.team_week('DAL', 5)
+        db.top('pursuit_factor', n = 10, min_plays = 50)
+'''
+import os
+import json
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import nfl_acquire_and_prep as acquire
+import nfl_results as results_module
+
+DEFAULT_DB = 'metric_results.sqlite'
+
+TABLE = 'results'
+
+# Identify a player-play, and what is joined in to each one
+KEY_COLUMNS = ['game', 'play', 'nflId']
+CONTEXT_COLUMNS = ['week', 'team', 'player', 'position']
+
+# Indexes, by name
+INDEXES = {'results_nflId':['nflId'],
+           'results_game':['game'],
+           'results_play':['game', 'play'],
+           'results_position':['position'],
+           'results_week':['week'],
+           'results_team_week':['team', 'week']}
+
+# Rows inserted per statement batch
+INSERT_CHUNK = 5000
+
+
+def build_results_db(results, session = None, db_path = DEFAULT_DB, replace = True):
+    '''
+    Loads player-play results into the database, joining in week, team and player name, and indexes them.
+
+    Parameters:
+        'results' - Dataframe or String - pass_rush_results, or a results csv or directory of week partitions
+                                          (nfl_results.PartitionedResultSink) to read them from
+        'session' - DataSession - Shared tables for the games, plays and players (a new session if None)
+        'db_path' - String - SQLite file
+        'replace' - Boolean - Start the results table again (otherwise the weeks in results replace those weeks' rows) -
+                              the file and any other tables in it (e.g. nfl_rollups') are kept either way
+    Returns:
+        'db_path' - String - The database file
+    '''
+    session = acquire.get_session(session)
+
+    if isinstance(results, str):
+        results = pd.read_csv(results) if os.path.isfile(results) else results_module.open_partitions(results)
+
+    rows = db_rows(results, session)
+
+    with sqlite3.connect(db_path) as connection:
+        if replace:
+            connection.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+        # Weeks loaded again replace their earlier rows
+        elif table_exists(connection, TABLE):
+            weeks = [int(week) for week in rows.week.dropna().unique()]
+            connection.execute(f'DELETE FROM {TABLE} WHERE week IN ({",".join("?" * len(weeks))})', weeks)
+
+        rows.to_sql(TABLE, connection, if_exists = 'append', index = False, chunksize = INSERT_CHUNK)
+
+        for name, columns in INDEXES.items():
+            connection.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {TABLE} ({", ".join(columns)})')
+
+        # Statistics for the query planner to pick indexes with
+        connection.execute('ANALYZE')
+
+    return db_path
+
+
+def add_week_results(week_results, session = None, db_path = DEFAULT_DB):
+    '''
+    Loads (or reloads) one or more weeks into an existing database, e.g. as each week of a build finishes.
+
+    Parameters:
+        'week_results' - Dataframe - pass_rush_results of the weeks
+        'session' - DataSession - Shared tables for the games, plays and players
+        'db_path' - String - SQLite file
+    Returns:
+        'db_path' - String - The database file
+    '''
+    return build_results_db(week_results, session, db_path, replace = False)
+
+
+class ResultsDB:
+    '''
+    Queries of a results database (see build_results_db).  Each query returns a dataframe.
+
+    Parameters:
+        'db_path' - String - SQLite file
+    '''
+
+    def __init__(self, db_path = DEFAULT_DB):
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f'No results database at {db_path} (build one with build_results_db)')
+
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+
+        # Numeric columns that are not keys - the metrics and the scouting outcomes
+        table_info = self.connection.execute(f'PRAGMA table_info({TABLE})').fetchall()
+        self.metrics = [name for cid, name, column_type, *rest in table_info
+                        if column_type in ['INTEGER', 'REAL'] and name not in KEY_COLUMNS + CONTEXT_COLUMNS]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def query(self, sql, params = ()):
+        '''
+        Runs any SELECT against the results table.
+
+        Parameters:
+            'sql' - String - The query (with ? placeholders)
+            'params' - Tuple - Values of the placeholders
+        Returns:
+            'rows' - Dataframe - What the query returned
+        '''
+        return pd.read_sql_query(sql, self.connection, params = params)
+
+    def player_plays(self, nflId, week = None):
+        '''
+        Every player-play of a player (in one week if given), in game and play order.
+        '''
+        where, params = conditions(nflId = nflId, week = week)
+
+        return self.decode(self.query(f'SELECT * FROM {TABLE} WHERE {where} ORDER BY game, play', params))
+
+    def play(self, game, play):
+        '''
+        The pass rushers of one play.
+        '''
+        where, params = conditions(game = game, play = play)
+
+        return self.decode(self.query(f'SELECT * FROM {TABLE} WHERE {where} ORDER BY nflId', params))
+
+    def team_week(self, team, week):
+        '''
+        A team's pass rushers in a week, player-play by player-play.
+        '''
+        where, params = conditions(team = team, week = week)
+
+        return self.decode(self.query(f'SELECT * FROM {TABLE} WHERE {where} ORDER BY game, play, nflId', params))
+
+    def player_season(self, nflId = None, metrics = None, weeks = None, team = None, position = None, min_plays = 0):
+        '''
+        Season (or some weeks') averages of each player's metrics, with their play counts.
+
+        Parameters:
+            'nflId' - Integer - Only this player (all players if None)
+            'metrics' - List of Strings - Metrics to average (all if None)
+            'weeks' - List of Integers - Only these weeks (all if None)
+            'team' - String - Only this team's rushers
+            'position' - String - Only rushers scouted at this position
+            'min_plays' - Integer - Leave out players with fewer plays
+        Returns:
+            'averages' - Dataframe - One row per player: nflId, player, team (comma separated if more than one),
+                                     play_count and the average of each metric
+        '''
+        metrics = self.metric_list(metrics)
+
+        where, params = conditions(nflId = nflId, week = weeks, team = team, position = position)
+
+        sql = (f'SELECT nflId, MIN(player) AS player, GROUP_CONCAT(DISTINCT team) AS team, COUNT(*) AS play_count, '
+               + ', '.join(f'AVG({metric}) AS {metric}' for metric in metrics)
+               + f' FROM {TABLE} WHERE {where} GROUP BY nflId HAVING COUNT(*) >= ? ORDER BY nflId')
+
+        return self.query(sql, params + [min_plays])
+
+    def top(self, metric = 'pursuit_factor', n = 10, weeks = None, team = None, position = None, min_plays = 1, by_player = True,
+            ascending = False):
+        '''
+        Leaderboard of a metric: the n best players by their average (or the n best single player-plays).
+
+        Parameters:
+            'metric' - String - Metric to rank by
+            'n' - Integer - Rows to return
+            'weeks' - List of Integers - Only these weeks (all if None)
+            'team' - String - Only this team's rushers
+            'position' - String - Only rushers scouted at this position
+            'min_plays' - Integer - Players with fewer plays are left out (by_player only)
+            'by_player' - Boolean - Rank players by their average, or single player-plays by their value
+            'ascending' - Boolean - Lowest first
+        Returns:
+            'leaders' - Dataframe - The top n rows, best first
+        '''
+        self.metric_list([metric])
+
+        where, params = conditions(week = weeks, team = team, position = position)
+        order = 'ASC' if ascending else 'DESC'
+
+        if by_player:
+            sql = (f'SELECT nflId, MIN(player) AS player, GROUP_CONCAT(DISTINCT team) AS team, COUNT(*) AS play_count, AVG({metric}) AS {metric} '
+                   f'FROM {TABLE} WHERE {where} AND {metric} IS NOT NULL GROUP BY nflId HAVING COUNT(*) >= ? '
+                   f'ORDER BY {metric} {order} LIMIT ?')
+            params = params + [min_plays, n]
+        else:
+            sql = (f'SELECT * FROM {TABLE} WHERE {where} AND {metric} IS NOT NULL ORDER BY {metric} {order} LIMIT ?')
+            params = params + [n]
+
+        return self.decode(self.query(sql, params))
+
+    def weeks(self):
+        '''
+        Weeks in the database and how many player-plays each has.
+        '''
+        return self.query(f'SELECT week, COUNT(*) AS player_plays FROM {TABLE} GROUP BY week ORDER BY week')
+
+    def metric_list(self, metrics):
+        '''
+        Checks metric names against the table (they are put into the SQL), all metrics if None - unknown names raise a
+        ValueError.
+        '''
+        if metrics is None:
+            return self.metrics
+
+        unknown = [metric for metric in metrics if metric not in self.metrics]
+
+        if unknown:
+            raise ValueError(f'Unknown metrics {unknown} - metrics are:\n{self.metrics}')
+
+        return list(metrics)
+
+    def decode(self, rows):
+        '''
+        Turns the stored pass_blockers text back into lists.
+        '''
+        if 'pass_blockers' in rows.columns:
+            rows['pass_blockers'] = [json.loads(value) if isinstance(value, str) else value for value in rows.pass_blockers]
+
+        return rows
+
+
+# ----- Support Functions -----------------------------------------------------------------------------
+
+def db_rows(results, session):
+    '''
+    Result rows as they are stored: week, team (the play's defense) and player name joined in, pass_blockers as JSON
+    text.
+    '''
+    rows = results.reset_index(drop = True)
+
+    rows = rows.merge(session.games[['game', 'week']], on = 'game', how = 'left')
+    rows = rows.merge(session.plays[['game', 'play', 'defense']].rename(columns = {'defense':'team'}), on = ['game', 'play'], how = 'left')
+    rows = rows.merge(session.players[['nflId', 'displayName']].drop_duplicates('nflId').rename(columns = {'displayName':'player'}),
+                      on = 'nflId', how = 'left')
+
+    if 'pass_blockers' in rows.columns:
+        rows['pass_blockers'] = [json.dumps(np.asarray(value).tolist()) if isinstance(value, (list, np.ndarray)) else value
+                                 for value in rows.pass_blockers]
+
+    # Keys and what was joined in first, then the result columns
+    first = KEY_COLUMNS + CONTEXT_COLUMNS
+
+    return rows[first + [column for column in rows.columns if column not in first]]
+
+
+def conditions(**filters):
+    '''
+    WHERE clause and parameters for the filters that are given (None filters are left out, lists become IN).
+    '''
+    clauses = []
+    params = []
+
+    for column, value in filters.items():
+        if value is None:
+            continue
+
+        if isinstance(value, (list, tuple, set, range, np.ndarray)):
+            value = list(value)
+            clauses.append(f'{column} IN ({",".join("?" * len(value))})')
+            params += [plain_value(v) for v in value]
+        else:
+            clauses.append(f'{column} = ?')
+            params.append(plain_value(value))
+
+    return (' AND '.join(clauses) or '1 = 1'), params
+
+
+def plain_value(value):
+    '''
+    numpy scalars as Python values, which sqlite3 can bind.
+    '''
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def table_exists(connection, table):
+    '''
+    Whether the database has the table.
+    '''
+    return connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
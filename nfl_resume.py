@@ -0,0 +1,198 @@
+'''
+Resumable builds: a manifest of the player-plays already built into a partitioned results directory (see
+nfl_results.PartitionedResultSink), so a rerun of all_week_pass_rush_results(..., resume = True) only builds what is
+missing.
+
+Each week of the manifest records the (game, play, nflId, v_type) keys that are finished, the part files holding
+them, and the fingerprint they were built under - the week's tracking csv and the shared csvs (size and modification
+time, see acquire.csv_fingerprint), the version of the metric code (a hash of the frame builder, the metric modules
+and pull_metrics) and v_type.  A week whose fingerprint has changed (its csv was fixed, a metric was added, ...) or
+whose files have gone is built again from scratch; other weeks carry on from their finished keys.
+
+Player-plays that could not be built are not finished: their failure records are kept with a week once it is
+complete (and reported again when it is skipped), and in a week that did not complete they are tried again.
+'''
+import os
+import json
+import inspect
+import hashlib
+import importlib
+
+import pandas as pd
+
+import nfl_acquire_and_prep as acquire
+
+# Name of the manifest in the results directory
+MANIFEST_FILE = 'manifest.json'
+
+# Source csvs every week is built from (besides its own weekN.csv)
+SHARED_INPUTS = ['games.csv', 'plays.csv', 'players.csv', 'pffScoutingData.csv']
+
+# Code the metrics are calculated with - whole modules (None) or some of their functions
+METRIC_CODE = {'nfl_frame_builder':None,
+               'nfl_build_metrics':None,
+               'nfl_use_metrics':['pull_metrics', 'pull_metrics_batch', 'segment_means']}
+
+
+class BuildManifest:
+    '''
+    Finished player-plays of a partitioned results directory, by week, saved to <directory>/manifest.json after
+    every change.
+
+    Parameters:
+        'directory' - String - Results directory (the PartitionedResultSink's)
+    '''
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_FILE)
+
+        self.weeks = {}
+
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.weeks = {int(week):entry for week, entry in json.load(f)['weeks'].items()}
+
+    def finished(self, week_num, fingerprint):
+        '''
+        Keys of the week's finished player-plays, if they were built under fingerprint and their files are all there.
+        Otherwise the week is started again (none are finished).
+
+        Parameters:
+            'week_num' - Integer - Week
+            'fingerprint' - Dictionary - Output of week_fingerprint
+        Returns:
+            'finished' - Set of Tuples - (game, play, nflId) of the finished player-plays
+        '''
+        entry = self.weeks.get(week_num)
+
+        if entry is None or entry['fingerprint'] != fingerprint or not all(os.path.exists(os.path.join(self.directory, part))
+                                                                           for part in entry['parts']):
+            self.restart(week_num, fingerprint)
+            return set()
+
+        return {(game, play, nflId) for game, play, nflId, v_type in entry['keys']}
+
+    def restart(self, week_num, fingerprint):
+        '''
+        Forgets what the week holds, to build it again under fingerprint.
+        '''
+        self.weeks[week_num] = {'fingerprint':fingerprint, 'complete':False, 'parts':[], 'keys':[], 'failures':[]}
+        self.save()
+
+    def parts(self, week_num):
+        '''
+        Files (full paths) of the week's finished player-plays.
+        '''
+        entry = self.weeks.get(week_num, {'parts':[]})
+
+        return [os.path.join(self.directory, part) for part in entry['parts']]
+
+    def is_complete(self, week_num):
+        '''
+        Whether every player-play of the week has been tried (complete is set once the week's build finishes).
+        '''
+        return self.weeks.get(week_num, {}).get('complete', False)
+
+    def record(self, week_num, path, results):
+        '''
+        Adds a part file and the keys of the results in it to the week.
+
+        Parameters:
+            'week_num' - Integer - Week
+            'path' - String - Part file the results were written to
+            'results' - Dataframe - The results (game, play and nflId of each row)
+        '''
+        entry = self.weeks[week_num]
+
+        entry['parts'].append(os.path.relpath(path, self.directory))
+        entry['keys'] += result_keys(results, entry['fingerprint']['v_type'])
+
+        self.save()
+
+    def failures(self, week_num):
+        '''
+        Failure records kept with the week when it was completed.
+        '''
+        return pd.DataFrame(self.weeks.get(week_num, {}).get('failures', []), columns = acquire.FAILURE_COLUMNS)
+
+    def complete(self, week_num, path, results, failures = None):
+        '''
+        Marks the week finished, with all of its results now in one part file.
+
+        Parameters:
+            'week_num' - Integer - Week
+            'path' - String - The week's part file (None if nothing was built)
+            'results' - Dataframe - Every result of the week
+            'failures' - Dataframe - Failure records of the week (acquire.failure_table), kept with it
+        '''
+        entry = self.weeks[week_num]
+
+        entry['parts'] = [] if path is None else [os.path.relpath(path, self.directory)]
+        entry['keys'] = result_keys(results, entry['fingerprint']['v_type'])
+        entry['failures'] = [] if failures is None else json.loads(failures.to_json(orient = 'records'))
+        entry['complete'] = True
+
+        self.save()
+
+    def save(self):
+        '''
+        Writes the manifest (to a temporary file first, so an interrupted write keeps the previous one).
+        '''
+        os.makedirs(self.directory, exist_ok = True)
+
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump({'weeks':{str(week):entry for week, entry in sorted(self.weeks.items())}}, f)
+
+        os.replace(self.path + '.tmp', self.path)
+
+
+def week_fingerprint(week_num, v_type):
+    '''
+    What a week's results depend on: its input csvs, the metric code and v_type.
+
+    Parameters:
+        'week_num' - Integer - Week
+        'v_type' - String - The type of analysis, e.g. 'PvP'
+    Returns:
+        'fingerprint' - Dictionary - inputs (acquire.csv_fingerprint of each csv), code_version and v_type
+    '''
+    inputs = [acquire.csv_fingerprint(os.path.join(acquire.DATA_DIR, name)) for name in SHARED_INPUTS + [f'week{week_num}.csv']]
+
+    fingerprint = {'inputs':inputs,
+                   'code_version':code_version(),
+                   'v_type':v_type}
+
+    return fingerprint
+
+
+def code_version():
+    '''
+    Hash of the source of the metric code (see METRIC_CODE) - it changes whenever a metric or the frames it is
+    calculated from change.
+    '''
+    digest = hashlib.sha256()
+
+    for module_name, function_names in METRIC_CODE.items():
+        module = importlib.import_module(module_name)
+
+        if function_names is None:
+            digest.update(inspect.getsource(module).encode())
+            continue
+
+        for function_name in function_names:
+            digest.update(inspect.getsource(getattr(module, function_name)).encode())
+
+    return digest.hexdigest()[:16]
+
+
+# ----- Support Functions -----------------------------------------------------------------------------
+
+def result_keys(results, v_type):
+    '''
+    [game, play, nflId, v_type] of each row of results, as plain values for the manifest.
+    '''
+    if len(results) == 0:
+        return []
+
+    return [[int(game), int(play), int(nflId), v_type] for game, play, nflId in zip(results.game, results.play, results.nflId)]
@@ -0,0 +1,336 @@
+'''
+Rollups: mergeable aggregates of the player-play results - for each metric the count, sum, sum of squares, min and max -
+kept per player, team, position and week in a SQLite table (a file of their own by default - they can also share the
+results database of nfl_results_db, which keeps other tables when it is rebuilt), so season averages and leaderboards
+come from a few rows per player-week rather than a groupby over every player-play.
+
+A new week is folded in on its own (fold_week) - its aggregates replace any it had - and weeks, teams or positions are
+combined by adding counts, sums and sums of squares and taking the min of mins and max of maxes, which gives the same
+means, standard deviations and ranges as grouping the player-plays themselves.
+
+Usage:
+    fold_week(week_results, session, 'metric_rollups.sqlite')
+
+    with Rollups('metric_rollups.sqlite') as rollups:
+        rollups.leaderboard('pursuit_factor', n = 10, min_plays = 50)
+        rollups.season(by = 'team')
+'''
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import nfl_acquire_and_prep as acquire
+import nfl_results_db as results_db_module
+
+DEFAULT_DB = 'metric_rollups.sqlite'
+
+TABLE = 'rollups'
+
+# One rollup row per player, team, position and week (player is the name of nflId)
+GROUP_COLUMNS = ['week', 'nflId', 'player', 'team', 'position']
+
+# Kept for each metric, as <metric>_<aggregate>
+AGGREGATES = ['count', 'sum', 'sumsq', 'min', 'max']
+
+# What rows are combined by for each kind of summary
+LEVELS = {'player':['nflId'],
+          'team':['team'],
+          'position':['position'],
+          'week':['week'],
+          'player_week':['nflId', 'week'],
+          'team_week':['team', 'week']}
+
+# Descriptive columns carried along for each level (more than one value is comma separated)
+LEVEL_ATTRIBUTES = {'player':['player', 'team', 'position'],
+                    'player_week':['player', 'team', 'position']}
+
+# Indexes, by name
+INDEXES = {'rollups_week':['week'],
+           'rollups_nflId':['nflId'],
+           'rollups_team':['team'],
+           'rollups_position':['position']}
+
+
+def build_rollups(results, session = None, db_path = DEFAULT_DB, replace = True):
+    '''
+    Aggregates player-play results by player, team, position and week, and stores the aggregates.
+
+    Parameters:
+        'results' - Dataframe - pass_rush_results (any number of weeks)
+        'session' - DataSession - Shared tables for the games, plays and players (a new session if None)
+        'db_path' - String - SQLite file
+        'replace' - Boolean - Start the rollups again (otherwise the weeks in results replace those weeks' rollups)
+    Returns:
+        'db_path' - String - The database file
+    '''
+    session = acquire.get_session(session)
+
+    # Week, team and player name joined in as for the results database
+    rows = results_db_module.db_rows(results, session)
+
+    metrics = [column for column in rows.select_dtypes('number').columns
+               if column not in results_db_module.KEY_COLUMNS + results_db_module.CONTEXT_COLUMNS]
+
+    week_aggregates = aggregate(rows, GROUP_COLUMNS, metrics)
+
+    with sqlite3.connect(db_path) as connection:
+        if replace:
+            connection.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+        # Weeks folded in again replace their earlier aggregates
+        elif results_db_module.table_exists(connection, TABLE):
+            weeks = [int(week) for week in week_aggregates.week.dropna().unique()]
+            connection.execute(f'DELETE FROM {TABLE} WHERE week IN ({",".join("?" * len(weeks))})', weeks)
+
+        week_aggregates.to_sql(TABLE, connection, if_exists = 'append', index = False, chunksize = results_db_module.INSERT_CHUNK)
+
+        for name, columns in INDEXES.items():
+            connection.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {TABLE} ({", ".join(columns)})')
+
+    return db_path
+
+
+def fold_week(week_results, session = None, db_path = DEFAULT_DB):
+    '''
+    Folds one or more newly built weeks into the rollups (a week folded in again replaces its aggregates).
+
+    Parameters:
+        'week_results' - Dataframe - pass_rush_results of the weeks
+        'session' - DataSession - Shared tables for the games, plays and players
+        'db_path' - String - SQLite file
+    Returns:
+        'db_path' - String - The database file
+    '''
+    return build_rollups(week_results, session, db_path, replace = False)
+
+
+class Rollups:
+    '''
+    Season summaries and leaderboards from the stored rollups (see build_rollups).  Each returns a dataframe.
+
+    Parameters:
+        'db_path' - String - SQLite file
+    '''
+
+    def __init__(self, db_path = DEFAULT_DB):
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f'No rollups at {db_path} (build them with build_rollups)')
+
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+
+        if not results_db_module.table_exists(self.connection, TABLE):
+            raise FileNotFoundError(f'No rollups in {db_path} (build them with build_rollups)')
+
+        columns = [name for cid, name, *rest in self.connection.execute(f'PRAGMA table_info({TABLE})').fetchall()]
+        self.metrics = rollup_metrics(columns)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def aggregates(self, weeks = None, team = None, position = None, nflId = None):
+        '''
+        The stored rollup rows (one per player, team, position and week), filtered.
+
+        Parameters:
+            'weeks' - List of Integers - Only these weeks (all if None)
+            'team' - String - Only this team's rushers
+            'position' - String - Only rushers scouted at this position
+            'nflId' - Integer - Only this player
+        Returns:
+            'aggregates' - Dataframe - The rollup rows
+        '''
+        where, params = results_db_module.conditions(week = weeks, team = team, position = position, nflId = nflId)
+
+        return pd.read_sql_query(f'SELECT * FROM {TABLE} WHERE {where}', self.connection, params = params)
+
+    def season(self, by = 'player', metrics = None, weeks = None, team = None, position = None, min_plays = 0):
+        '''
+        Average of each metric by player, team, position or week (see LEVELS), with play counts.
+
+        Parameters:
+            'by' - String - Level to summarize at (a key of LEVELS)
+            'metrics' - List of Strings - Metrics to average (all if None)
+            'weeks', 'team', 'position' - Filters, as in aggregates
+            'min_plays' - Integer - Leave out rows with fewer plays
+        Returns:
+            'averages' - Dataframe - One row per player (team, ...): its keys and attributes, play_count and the average
+                                     of each metric
+        '''
+        metrics = self.metric_list(metrics)
+        self.level(by)
+
+        combined = merge_aggregates(self.aggregates(weeks, team, position), LEVELS[by], LEVEL_ATTRIBUTES.get(by, []))
+        combined = combined[combined.play_count >= min_plays]
+
+        return metric_means(combined, metrics, LEVELS[by] + LEVEL_ATTRIBUTES.get(by, [])).reset_index(drop = True)
+
+    def leaderboard(self, metric = 'pursuit_factor', by = 'player', n = 10, weeks = None, team = None, position = None, min_plays = 1,
+                    ascending = False):
+        '''
+        Leaderboard of a metric's average, with each entry's percentile among everyone who qualifies.
+
+        Parameters:
+            'metric' - String - Metric to rank by
+            'by' - String - Rank players, teams, positions, ... (a key of LEVELS)
+            'n' - Integer - Rows to return (all if None)
+            'weeks', 'team', 'position' - Filters, as in aggregates
+            'min_plays' - Integer - Leave out entries with fewer plays
+            'ascending' - Boolean - Lowest first
+        Returns:
+            'leaders' - Dataframe - rank, keys and attributes, play_count, the metric's mean, std, min and max, and
+                                    percentile (the share of qualifying entries, in percent, whose mean is at or
+                                    below this one)
+        '''
+        self.metric_list([metric])
+        self.level(by)
+
+        keys = LEVELS[by] + LEVEL_ATTRIBUTES.get(by, [])
+
+        combined = merge_aggregates(self.aggregates(weeks, team, position), LEVELS[by], LEVEL_ATTRIBUTES.get(by, []))
+        combined = combined[(combined.play_count >= min_plays) & (combined[f'{metric}_count'] > 0)]
+
+        leaders = metric_statistics(combined, metric, keys)
+        leaders['percentile'] = (leaders[f'{metric}_mean'].rank(method = 'max', pct = True) * 100).round(1)
+
+        leaders = leaders.sort_values(f'{metric}_mean', ascending = ascending, kind = 'stable').reset_index(drop = True)
+        leaders.insert(0, 'rank', np.arange(1, len(leaders) + 1))
+
+        return leaders if n is None else leaders.head(n)
+
+    def weeks(self):
+        '''
+        Weeks in the rollups and how many player-plays each has.
+        '''
+        return pd.read_sql_query(f'SELECT week, SUM(play_count) AS player_plays FROM {TABLE} GROUP BY week ORDER BY week', self.connection)
+
+    def metric_list(self, metrics):
+        '''
+        Checks metric names against the rollups, all metrics if None - unknown names raise a ValueError.
+        '''
+        if metrics is None:
+            return self.metrics
+
+        unknown = [metric for metric in metrics if metric not in self.metrics]
+
+        if unknown:
+            raise ValueError(f'Unknown metrics {unknown} - metrics are:\n{self.metrics}')
+
+        return list(metrics)
+
+    def level(self, by):
+        '''
+        Checks a summary level - anything not in LEVELS raises a ValueError.
+        '''
+        if by not in LEVELS:
+            raise ValueError(f'by inputs are one of:\n{list(LEVELS)}')
+
+        return LEVELS[by]
+
+
+# ----- Support Functions -----------------------------------------------------------------------------
+
+def aggregate(rows, by, metrics):
+    '''
+    Mergeable aggregates of rows: play_count, and each metric's count (of values that are not missing), sum, sum of
+    squares, min and max.
+
+    Parameters:
+        'rows' - Dataframe - Player-play rows
+        'by' - List of Strings - Columns to group by
+        'metrics' - List of Strings - Numeric columns to aggregate
+    Returns:
+        'aggregates' - Dataframe - One row per group: by, play_count, then <metric>_<aggregate> (see AGGREGATES)
+    '''
+    values = rows[metrics].astype(float)
+    squares = values.pow(2)
+
+    grouped = values.groupby([rows[column] for column in by], sort = True, dropna = False)
+    grouped_squares = squares.groupby([rows[column] for column in by], sort = True, dropna = False)
+
+    parts = {'count':grouped.count(),
+             'sum':grouped.sum(),
+             'sumsq':grouped_squares.sum(),
+             'min':grouped.min(),
+             'max':grouped.max()}
+
+    aggregates = pd.concat([grouped.size().rename('play_count')]
+                           + [parts[name][metric].rename(f'{metric}_{name}') for metric in metrics for name in AGGREGATES],
+                           axis = 1)
+
+    return aggregates.reset_index()
+
+
+def merge_aggregates(aggregates, by, attributes = None):
+    '''
+    Combines aggregate rows (e.g. a player's weeks into a season): counts, sums and sums of squares are added, mins and
+    maxes kept.
+
+    Parameters:
+        'aggregates' - Dataframe - Rows of aggregate (or of the rollups table)
+        'by' - List of Strings - Columns to combine by
+        'attributes' - List of Strings - Columns carried along, their distinct values comma separated
+    Returns:
+        'combined' - Dataframe - One row per group
+    '''
+    metrics = rollup_metrics(aggregates.columns)
+
+    functions = {'play_count':'sum'}
+    for metric in metrics:
+        functions.update({f'{metric}_count':'sum',
+                          f'{metric}_sum':'sum',
+                          f'{metric}_sumsq':'sum',
+                          f'{metric}_min':'min',
+                          f'{metric}_max':'max'})
+
+    for attribute in attributes or []:
+        functions[attribute] = lambda values: ', '.join(sorted(str(value) for value in values.dropna().unique()))
+
+    return aggregates.groupby(by, sort = True, dropna = False).agg(functions).reset_index()
+
+
+def metric_means(aggregates, metrics, keys):
+    '''
+    keys, play_count and the mean of each metric (missing where a metric has no values).
+    '''
+    means = aggregates[keys + ['play_count']].copy()
+
+    for metric in metrics:
+        means[metric] = aggregates[f'{metric}_sum'] / aggregates[f'{metric}_count'].replace(0, np.nan)
+
+    return means
+
+
+def metric_statistics(aggregates, metric, keys):
+    '''
+    keys, play_count and a metric's mean, standard deviation (sample, as pandas std), min and max.
+    '''
+    count = aggregates[f'{metric}_count'].replace(0, np.nan)
+    total = aggregates[f'{metric}_sum']
+
+    statistics = aggregates[keys + ['play_count']].copy()
+    statistics[f'{metric}_mean'] = total / count
+
+    # Sum of squared deviations from the sums, floored at zero against rounding
+    squared_deviations = (aggregates[f'{metric}_sumsq'] - total ** 2 / count).clip(lower = 0)
+    statistics[f'{metric}_std'] = np.sqrt(squared_deviations / (count - 1).replace(0, np.nan))
+
+    statistics[f'{metric}_min'] = aggregates[f'{metric}_min']
+    statistics[f'{metric}_max'] = aggregates[f'{metric}_max']
+
+    return statistics
+
+
+def rollup_metrics(columns):
+    '''
+    Metrics of aggregate columns (those with a <metric>_count column).
+    '''
+    return [column[:-len('_count')] for column in columns if column.endswith('_count') and column != 'play_count']
@@ -0,0 +1,507 @@
+'''
+Synthetic Big Data Bowl 2023 data for scale testing: writes games.csv, plays.csv, players.csv, pffScoutingData.csv and
+week1.csv ... weekN.csv in the Kaggle schema at any scale, so the pipeline can be load-tested past the 8 weeks of real
+data (and without network access).  Point acquire at the output with acquire.DATA_DIR.
+
+Usage:
+    python nfl_synthetic_data.py data_synthetic --weeks 18 --games-per-week 16 --plays-per-game 40
+    python nfl_synthetic_data.py data_synthetic --weeks 2 --rushers-per-play 3 6 --blockers-per-play 5 7
+
+More weeks stand in for more seasons (week numbers simply keep counting).
+'''
+import os
+import sys
+import argparse
+import datetime
+
+import numpy as np
+import pandas as pd
+
+TEAMS = ['ARI', 'ATL', 'BAL', 'BUF', 'CAR', 'CHI', 'CIN', 'CLE', 'DAL', 'DEN', 'DET', 'GB', 'HOU', 'IND', 'JAX', 'KC',
+         'LA', 'LAC', 'LV', 'MIA', 'MIN', 'NE', 'NO', 'NYG', 'NYJ', 'PHI', 'PIT', 'SEA', 'SF', 'TB', 'TEN', 'WAS']
+
+# Line-ups: (officialPosition, pff_positionLinedUp) - the quarterback first
+OFFENSE = [('QB', 'QB'), ('RB', 'HB'), ('T', 'LT'), ('G', 'LG'), ('C', 'C'), ('G', 'RG'), ('T', 'RT'), ('TE', 'TE-L'),
+           ('WR', 'LWR'), ('WR', 'RWR'), ('WR', 'SLWR')]
+DEFENSE = [('DE', 'LEO'), ('DT', 'DLT'), ('DT', 'DRT'), ('DE', 'REO'), ('OLB', 'LOLB'), ('OLB', 'ROLB'), ('ILB', 'MLB'),
+           ('CB', 'LCB'), ('CB', 'RCB'), ('SS', 'SSR'), ('FS', 'FSL')]
+
+# Offensive slots that pass block, in the order they are used (the line, then the back and tight end)
+BLOCKER_SLOTS = [2, 3, 4, 5, 6, 1, 7]
+
+# How plays end (end event, passResult) and how often
+OUTCOMES = [('pass_forward', 'C'), ('pass_forward', 'I'), ('qb_sack', 'S'), ('qb_strip_sack', 'S'), ('run', 'R')]
+OUTCOME_RATES = [0.58, 0.30, 0.06, 0.01, 0.05]
+
+TRACKING_COLUMNS = ['gameId', 'playId', 'nflId', 'frameId', 'time', 'jerseyNumber', 'team', 'playDirection', 'x', 'y',
+                    's', 'a', 'dis', 'o', 'dir', 'event']
+
+SCOUTING_FIELDS = ['pff_hit', 'pff_hurry', 'pff_sack', 'pff_beatenByDefender', 'pff_hitAllowed', 'pff_hurryAllowed',
+                   'pff_sackAllowed', 'pff_nflIdBlockedPlayer', 'pff_blockType', 'pff_backFieldBlock']
+
+# Shortest play that fits the pre-snap events, a pass rush and what follows it
+MIN_FRAMES_PER_PLAY = 40
+
+
+def generate(data_dir, weeks = 1, games_per_week = 2, plays_per_game = 8, frames_per_play = 45, rushers_per_play = 4,
+             blockers_per_play = 5, invalid_play_rate = 0.0, seed = 2023):
+    '''
+    Writes a synthetic season to data_dir.  Plays follow real event sequences (line_set, the odd shift or
+    man_in_motion, ball_snap, sometimes play_action, then pass_forward/autoevent_passforward, qb_sack,
+    qb_strip_sack or run, and what comes after); pass rushers chase the quarterback and every pass blocker blocks one
+    of the play's pass rushers (or no one), with pressures and the blocks that allowed them credited consistently.
+
+    Parameters:
+        'data_dir' - String - Directory to write the csv files to
+        'weeks' - Integer - Number of weeks (a weekN.csv each)
+        'games_per_week' - Integer - Games per week (1-16)
+        'plays_per_game' - Integer - Pass plays per game
+        'frames_per_play' - Integer - Tracking frames per play (0.1 seconds each, at least MIN_FRAMES_PER_PLAY)
+        'rushers_per_play' - Integer or Tuple - Pass rushers per play, or a (fewest, most) range (1-11)
+        'blockers_per_play' - Integer or Tuple - Pass blockers per play, or a (fewest, most) range (1-7)
+        'invalid_play_rate' - Float - Share of plays with only an autoevent_ballsnap (no ball_snap), which the pipeline
+                                      skips as it does real ones
+        'seed' - Integer - Random seed (the same arguments and seed always give the same files)
+    Returns:
+        'summary' - Dictionary - Number of weeks, games, plays and tracking rows written
+    '''
+    if frames_per_play < MIN_FRAMES_PER_PLAY:
+        raise ValueError(f'frames_per_play must be at least {MIN_FRAMES_PER_PLAY}')
+    if not 1 <= games_per_week <= len(TEAMS) // 2:
+        raise ValueError(f'games_per_week must be between 1 and {len(TEAMS) // 2}')
+
+    rng = np.random.default_rng(seed)
+    os.makedirs(data_dir, exist_ok = True)
+
+    rosters, players = make_players(rng)
+    pd.DataFrame(players).to_csv(os.path.join(data_dir, 'players.csv'), index = False)
+
+    game_rows, play_rows, scouting_rows = [], [], []
+    tracking_rows = 0
+
+    for week_num in range(1, weeks + 1):
+        date = datetime.date(2021, 9, 9) + datetime.timedelta(days = 7 * (week_num - 1))
+
+        # A new pairing of teams each week
+        teams = rng.permutation(TEAMS)
+        week_tracking = []
+
+        for g in range(games_per_week):
+            home, away = teams[2 * g], teams[2 * g + 1]
+            game = int(date.strftime('%Y%m%d') + f'{g:02d}')
+
+            game_rows.append({'gameId':game,
+                              'season':date.year if date.month > 2 else date.year - 1,
+                              'week':week_num,
+                              'gameDate':date.strftime('%m/%d/%Y'),
+                              'gameTimeEastern':'13:00:00',
+                              'homeTeamAbbr':home,
+                              'visitorTeamAbbr':away})
+
+            kickoff = datetime.datetime.combine(date, datetime.time(17, 0))
+
+            for p in range(plays_per_game):
+                offense, defense = (home, away) if p % 2 == 0 else (away, home)
+
+                play_info, play_scouting, play_tracking = make_play(rng,
+                                                                    game,
+                                                                    50 + 25 * p,
+                                                                    offense,
+                                                                    defense,
+                                                                    rosters,
+                                                                    kickoff + datetime.timedelta(seconds = 40 * p),
+                                                                    frames_per_play,
+                                                                    count_in(rng, rushers_per_play),
+                                                                    count_in(rng, blockers_per_play),
+                                                                    rng.random() < invalid_play_rate)
+
+                play_rows.append(play_info)
+                scouting_rows += play_scouting
+                week_tracking.append(play_tracking)
+
+        # Written week by week, so memory is bounded to a week of tracking
+        week_tracking = pd.DataFrame({column:np.concatenate([play[column] for play in week_tracking]) for column in TRACKING_COLUMNS})
+        week_tracking.to_csv(os.path.join(data_dir, f'week{week_num}.csv'), index = False)
+        tracking_rows += len(week_tracking)
+
+    pd.DataFrame(game_rows).to_csv(os.path.join(data_dir, 'games.csv'), index = False)
+    pd.DataFrame(play_rows).to_csv(os.path.join(data_dir, 'plays.csv'), index = False)
+    pd.DataFrame(scouting_rows).to_csv(os.path.join(data_dir, 'pffScoutingData.csv'), index = False)
+
+    summary = {'weeks':weeks,
+               'games':len(game_rows),
+               'plays':len(play_rows),
+               'tracking_rows':tracking_rows}
+
+    return summary
+
+
+# ----- Sub Functions --------------------------------------------------------------------------------
+
+def make_players(rng):
+    '''
+    Makes a 22 man roster (11 offense, 11 defense) for every team.
+
+    Parameters:
+        'rng' - Generator - Random numbers
+    Returns:
+        'rosters' - Dictionary - Team to list of nflIds (OFFENSE then DEFENSE order)
+        'players' - List of Dictionaries - players.csv rows
+    '''
+    rosters = {}
+    players = []
+
+    for t, team in enumerate(TEAMS):
+        rosters[team] = []
+
+        for slot, (position, lined_up) in enumerate(OFFENSE + DEFENSE):
+            nflId = 35000 + 100 * t + slot
+            rosters[team].append(nflId)
+
+            lineman = position in ['T', 'G', 'C', 'DE', 'DT']
+
+            players.append({'nflId':nflId,
+                            'height':f'6-{rng.integers(0, 7)}',
+                            'weight':int(rng.integers(290, 340) if lineman else rng.integers(185, 250)),
+                            'birthDate':np.nan,
+                            'collegeName':np.nan,
+                            'officialPosition':position,
+                            'displayName':f'Player {nflId}'})
+
+    return rosters, players
+
+
+def make_play(rng, game, play, offense, defense, rosters, start_time, frames_per_play, rushers, blockers, invalid):
+    '''
+    Makes one pass play: its plays.csv row, its pffScoutingData.csv rows and its tracking frames.
+
+    Parameters:
+        'rng' - Generator - Random numbers
+        'game' - Integer - gameId
+        'play' - Integer - playId
+        'offense', 'defense' - String - Team abbreviations
+        'rosters' - Dictionary - Team to list of nflIds
+        'start_time' - Datetime - Time of the first frame
+        'frames_per_play' - Integer - Tracking frames
+        'rushers', 'blockers' - Integer - Number of pass rushers and pass blockers
+        'invalid' - Boolean - Leave the ball_snap event out
+    Returns:
+        'play_info' - Dictionary - plays.csv row
+        'play_scouting' - List of Dictionaries - pffScoutingData.csv rows
+        'play_tracking' - Dictionary of Arrays - week csv columns
+    '''
+    line_of_scrimmage = float(rng.uniform(20, 100))
+    middle = float(rng.uniform(20, 33))
+
+    # Snap, then the quarterback holds the ball until the end event
+    snap = int(rng.integers(8, 13))
+    end = snap + int(rng.integers(15, min(40, frames_per_play - snap - 12) + 1))
+    end_event, pass_result = OUTCOMES[rng.choice(len(OUTCOMES), p = OUTCOME_RATES)]
+    play_action = rng.random() < 0.2
+
+    offense_ids = rosters[offense][:11]
+    defense_ids = rosters[defense][11:]
+    rusher_ids = defense_ids[:min(max(rushers, 1), 11)]
+    blocker_ids = [offense_ids[slot] for slot in BLOCKER_SLOTS[:min(max(blockers, 1), len(BLOCKER_SLOTS))]]
+
+    events = make_events(rng, frames_per_play, snap, end, end_event, pass_result, play_action, invalid)
+
+    play_info = {'gameId':game, 'playId':play, 'playDescription':'synthetic', 'quarter':1 + (play // 300) % 4,
+                 'down':int(rng.integers(1, 5)), 'yardsToGo':int(rng.integers(1, 11)), 'possessionTeam':offense,
+                 'defensiveTeam':defense, 'yardlineSide':offense, 'yardlineNumber':int(rng.integers(1, 50)),
+                 'gameClock':f'{int(rng.integers(0, 15)):02d}:{int(rng.integers(0, 60)):02d}', 'preSnapHomeScore':0,
+                 'preSnapVisitorScore':0, 'passResult':pass_result, 'penaltyYards':np.nan,
+                 'prePenaltyPlayResult':5, 'playResult':5, 'foulName1':np.nan, 'foulNFLId1':np.nan,
+                 'foulName2':np.nan, 'foulNFLId2':np.nan, 'foulName3':np.nan, 'foulNFLId3':np.nan,
+                 'absoluteYardlineNumber':round(line_of_scrimmage, 0), 'offenseFormation':'SHOTGUN',
+                 'personnelO':'1 RB, 1 TE, 3 WR', 'defendersInBox':6, 'personnelD':'4 DL, 2 LB, 5 DB',
+                 'dropBackType':'TRADITIONAL', 'pff_playAction':int(play_action), 'pff_passCoverage':'Cover-3',
+                 'pff_passCoverageType':'Zone'}
+
+    play_scouting = make_scouting(rng, game, play, offense_ids, defense_ids, rusher_ids, blocker_ids, pass_result)
+
+    play_tracking = make_tracking(rng, game, play, offense, defense, offense_ids, defense_ids, rusher_ids, blocker_ids,
+                                  start_time, events, snap, end, pass_result, line_of_scrimmage, middle)
+
+    return play_info, play_scouting, play_tracking
+
+
+def make_events(rng, frames_per_play, snap, end, end_event, pass_result, play_action, invalid):
+    '''
+    Lays out the events of a play frame by frame ('None' between events).
+
+    Parameters:
+        'rng' - Generator - Random numbers
+        'frames_per_play' - Integer - Tracking frames
+        'snap', 'end' - Integer - Snap frame and end event frame (1-based)
+        'end_event' - String - pass_forward, qb_sack, qb_strip_sack or run
+        'pass_result' - String - C, I, S or R
+        'play_action' - Boolean - Add a play_action after the snap
+        'invalid' - Boolean - Only an autoevent_ballsnap at the snap
+    Returns:
+        'events' - Array of Strings - Event at each frame
+    '''
+    events = np.full(frames_per_play, 'None', dtype = object)
+
+    def place(frame, event):
+        events[frame - 1] = event
+
+    # Pre-snap
+    place(int(rng.integers(1, snap - 4)), 'line_set')
+    if rng.random() < 0.2:
+        place(snap - 3, 'man_in_motion')
+    elif rng.random() < 0.1:
+        place(snap - 2, 'shift')
+
+    place(snap, 'autoevent_ballsnap' if invalid else 'ball_snap')
+
+    if play_action:
+        place(snap + 3, 'play_action')
+
+    place(end, end_event)
+
+    # What follows the end event
+    if end_event == 'pass_forward':
+        place(end + 1, 'autoevent_passforward')
+        place(end + 6, 'pass_arrived')
+        place(end + 7, 'pass_outcome_caught' if pass_result == 'C' else 'pass_outcome_incomplete')
+        if pass_result == 'C':
+            place(end + 10, 'first_contact')
+            place(end + 11, 'tackle')
+    elif end_event == 'qb_strip_sack':
+        place(end + 1, 'fumble')
+        place(end + 3, 'fumble_defense_recovered')
+    elif end_event == 'run':
+        place(end + 8, 'out_of_bounds')
+
+    return events
+
+
+def make_scouting(rng, game, play, offense_ids, defense_ids, rusher_ids, blocker_ids, pass_result):
+    '''
+    Makes the scouting rows of a play.  Each pass blocker blocks a pass rusher in turn (with the odd one blocking
+    no one); a pressure by a pass rusher (hit, hurry or sack) is allowed by - and beats - the blockers blocking him.
+
+    Parameters:
+        'rng' - Generator - Random numbers
+        'game', 'play' - Integer - gameId and playId
+        'offense_ids', 'defense_ids' - List of Integers - Players on the field
+        'rusher_ids', 'blocker_ids' - List of Integers - Pass rushers and pass blockers
+        'pass_result' - String - C, I, S or R (a sack needs a sacker)
+    Returns:
+        'play_scouting' - List of Dictionaries - pffScoutingData.csv rows
+    '''
+    sacker = rusher_ids[int(rng.integers(0, len(rusher_ids)))] if pass_result == 'S' else None
+
+    pressure = {}
+    for rusher in rusher_ids:
+        pressure[rusher] = {'pff_hit':int(rng.random() < 0.08),
+                            'pff_hurry':int(rng.random() < 0.15),
+                            'pff_sack':int(rusher == sacker)}
+
+    blocked = {blocker:(rusher_ids[i % len(rusher_ids)] if rng.random() > 0.1 else None) for i, blocker in enumerate(blocker_ids)}
+
+    play_scouting = []
+
+    for slot, nflId in enumerate(offense_ids):
+        row = scouting_row(game, play, nflId, OFFENSE[slot][1], 'Pass' if slot == 0 else 'Pass Route')
+
+        if nflId in blocked:
+            rusher = blocked[nflId]
+            allowed = pressure.get(rusher, {'pff_hit':0, 'pff_hurry':0, 'pff_sack':0})
+
+            row.update({'pff_role':'Pass Block',
+                        'pff_beatenByDefender':int(any(allowed.values())),
+                        'pff_hitAllowed':allowed['pff_hit'],
+                        'pff_hurryAllowed':allowed['pff_hurry'],
+                        'pff_sackAllowed':allowed['pff_sack'],
+                        'pff_nflIdBlockedPlayer':rusher if rusher is not None else np.nan,
+                        'pff_blockType':'PP' if rusher is not None else 'NB',
+                        'pff_backFieldBlock':int(OFFENSE[slot][0] == 'RB')})
+
+        play_scouting.append(row)
+
+    for slot, nflId in enumerate(defense_ids):
+        row = scouting_row(game, play, nflId, DEFENSE[slot][1], 'Coverage')
+
+        if nflId in pressure:
+            row.update({'pff_role':'Pass Rush', **pressure[nflId]})
+
+        play_scouting.append(row)
+
+    return play_scouting
+
+
+def make_tracking(rng, game, play, offense, defense, offense_ids, defense_ids, rusher_ids, blocker_ids, start_time,
+                  events, snap, end, pass_result, line_of_scrimmage, middle):
+    '''
+    Makes the tracking frames of a play: players hold still until the snap, then the quarterback drops back, pass
+    rushers chase him, pass blockers set up behind the line and everyone else runs downfield.  The ball is at the line
+    until the snap and with the quarterback until the end event; a pass then flies downfield and a scramble runs.
+
+    Parameters:
+        See make_play
+        'events' - Array of Strings - Event at each frame
+        'snap', 'end' - Integer - Snap frame and end event frame
+        'pass_result' - String - C, I, S or R
+        'line_of_scrimmage', 'middle' - Float - Where the ball is snapped
+    Returns:
+        'play_tracking' - Dictionary of Arrays - week csv columns (players first, the football last)
+    '''
+    frames_per_play = len(events)
+    frames = np.arange(1, frames_per_play + 1)
+    player_ids = np.array(offense_ids + defense_ids)
+    on_offense = np.arange(22) < 11
+    slot = np.arange(22) % 11
+
+    # Quarterback drops back until the end event (a scrambling one then runs upfield)
+    qb_x = line_of_scrimmage - 1 - np.minimum(np.clip(frames - snap, 0, None), min(end - snap, 20)) * 0.35
+    if pass_result == 'R':
+        qb_x = qb_x + np.clip(frames - end, 0, None) * 0.6
+    qb_y = middle + np.cumsum(np.where(frames > snap, rng.normal(0, 0.05, frames_per_play), 0))
+
+    # Starting spots and where each player heads after the snap
+    start_x = np.where(on_offense, line_of_scrimmage - 1.2, line_of_scrimmage + 1.2)
+    start_y = middle + (slot - 5) * 1.8
+
+    is_rusher = np.isin(player_ids, rusher_ids)
+    is_blocker = np.isin(player_ids, blocker_ids)
+
+    target_x = np.where(is_blocker, line_of_scrimmage - 3.0, line_of_scrimmage + np.where(on_offense, 15, 8))
+    target_y = np.where(is_blocker, start_y, start_y + rng.normal(0, 4, 22))
+    speed = np.where(is_rusher, rng.uniform(0.25, 0.45, 22), np.where(is_blocker, 0.15, rng.uniform(0.3, 0.8, 22)))
+
+    x = np.empty((frames_per_play, 22))
+    y = np.empty((frames_per_play, 22))
+    x[0], y[0] = start_x, start_y
+
+    for k in range(1, frames_per_play):
+        if frames[k] <= snap:
+            x[k], y[k] = x[k - 1], y[k - 1]
+            continue
+
+        # Pass rushers chase the quarterback where he is now
+        dx = np.where(is_rusher, qb_x[k], target_x) - x[k - 1]
+        dy = np.where(is_rusher, qb_y[k], target_y) - y[k - 1]
+        distance = np.maximum(np.hypot(dx, dy), 1e-9)
+        step = np.minimum(speed, distance)
+
+        x[k] = x[k - 1] + dx / distance * step + rng.normal(0, 0.03, 22)
+        y[k] = y[k - 1] + dy / distance * step + rng.normal(0, 0.03, 22)
+
+    x[:, 0], y[:, 0] = qb_x, qb_y
+
+    # The ball
+    ball_x = np.where(frames <= snap, line_of_scrimmage, qb_x)
+    ball_y = np.where(frames <= snap, middle, qb_y)
+
+    if pass_result in ['C', 'I']:
+        ball_x = np.where(frames > end, qb_x[end - 1] + (frames - end) * 1.6, ball_x)
+
+    x = np.column_stack([x, ball_x])
+    y = np.column_stack([y, ball_y])
+
+    # Speed, acceleration and distance from the movement (frames are 0.1 seconds)
+    dis = np.vstack([np.zeros((1, 23)), np.hypot(np.diff(x, axis = 0), np.diff(y, axis = 0))])
+    s = dis * 10
+    a = np.minimum(np.abs(np.vstack([np.zeros((1, 23)), np.diff(s, axis = 0)])) * 10, 9.9)
+
+    times = [(start_time + datetime.timedelta(milliseconds = 100 * k)).isoformat(timespec = 'milliseconds') for k in range(frames_per_play)]
+
+    # One row per entity per frame, entity after entity
+    rows = 23 * frames_per_play
+
+    play_tracking = {'gameId':np.full(rows, game),
+                     'playId':np.full(rows, play),
+                     'nflId':np.repeat(np.append(player_ids, np.nan), frames_per_play),
+                     'frameId':np.tile(frames, 23),
+                     'time':np.tile(np.array(times, dtype = object), 23),
+                     'jerseyNumber':np.repeat(np.append(np.arange(1, 23), np.nan), frames_per_play),
+                     'team':np.repeat(np.array([offense] * 11 + [defense] * 11 + ['football'], dtype = object), frames_per_play),
+                     'playDirection':np.full(rows, 'right', dtype = object),
+                     'x':x.T.ravel().round(2),
+                     'y':y.T.ravel().round(2),
+                     's':s.T.ravel().round(2),
+                     'a':a.T.ravel().round(2),
+                     'dis':dis.T.ravel().round(2),
+                     'o':rng.uniform(0, 360, rows).round(2),
+                     'dir':rng.uniform(0, 360, rows).round(2),
+                     'event':np.tile(events, 23)}
+
+    return play_tracking
+
+
+# ----- Support Functions -----------------------------------------------------------------------------
+
+def scouting_row(game, play, nflId, lined_up, role):
+    '''
+    A pffScoutingData.csv row with all pressure and blocking fields empty.
+
+    Parameters:
+        'game' - Integer - gameId
+        'play' - Integer - playId
+        'nflId' - Integer - Player
+        'lined_up' - String - pff_positionLinedUp
+        'role' - String - pff_role
+    Returns:
+        'row' - Dictionary - pffScoutingData.csv row
+    '''
+    row = {'gameId':game,
+           'playId':play,
+           'nflId':nflId,
+           'pff_role':role,
+           'pff_positionLinedUp':lined_up}
+
+    for column in SCOUTING_FIELDS:
+        row[column] = np.nan
+
+    return row
+
+
+def count_in(rng, count):
+    '''
+    A per-play count: the count itself, or a random count in a (fewest, most) range.
+
+    Parameters:
+        'rng' - Generator - Random numbers
+        'count' - Integer or Tuple - Count or (fewest, most)
+    Returns:
+        'count' - Integer
+    '''
+    if isinstance(count, (tuple, list)):
+        return int(rng.integers(count[0], count[-1] + 1))
+
+    return int(count)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Write synthetic Big Data Bowl 2023 csv files for scale testing.')
+    parser.add_argument('data_dir', help = 'directory to write the csv files to')
+    parser.add_argument('--weeks', type = int, default = 1)
+    parser.add_argument('--games-per-week', type = int, default = 2)
+    parser.add_argument('--plays-per-game', type = int, default = 8)
+    parser.add_argument('--frames-per-play', type = int, default = 45)
+    parser.add_argument('--rushers-per-play', type = int, nargs = '+', default = [4], help = 'a count, or fewest and most')
+    parser.add_argument('--blockers-per-play', type = int, nargs = '+', default = [5], help = 'a count, or fewest and most')
+    parser.add_argument('--invalid-play-rate', type = float, default = 0.0)
+    parser.add_argument('--seed', type = int, default = 2023)
+    args = parser.parse_args(argv)
+
+    summary = generate(args.data_dir,
+                       weeks = args.weeks,
+                       games_per_week = args.games_per_week,
+                       plays_per_game = args.plays_per_game,
+                       frames_per_play = args.frames_per_play,
+                       rushers_per_play = tuple(args.rushers_per_play),
+                       blockers_per_play = tuple(args.blockers_per_play),
+                       invalid_play_rate = args.invalid_play_rate,
+                       seed = args.seed)
+
+    print(f"Wrote {summary['weeks']} weeks, {summary['games']} games, {summary['plays']} plays and "
+          f"{summary['tracking_rows']:,} tracking rows to {args.data_dir}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,278 @@
+'''
+Progress and throughput telemetry for long builds (all_week_pass_rush_results, nfl_functions.full_analysis).
+
+Builders report each player-play built or failed with advance(); a progress line (player-plays per second, percent
+done, ETA and failures so far) is printed at most every `interval` seconds rather than a line per player-play.  When a
+week (or a run) finishes, a summary is printed and, if a log path is given, written as one JSON line to it - records
+have an 'event' of 'week' or 'run' and share the run's 'run_id', so a scheduler can tail or scrape the file.
+
+Usage:
+    telemetry = BuildTelemetry(log_path = 'metric_telemetry.jsonl')
+    telemetry.start('Week 1', total = 5000, week = 1)
+    telemetry.advance(built = 1)
+    telemetry.finish(failures = failure_table)
+    telemetry.finish_run()
+'''
+import os
+import sys
+import json
+import time
+import datetime
+
+# Environment variable with the JSON-lines log path (overrides the one a build is given)
+TELEMETRY_VARIABLE = 'NFL_TELEMETRY'
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 5.0
+
+
+class BuildTelemetry:
+    '''
+    Tracks one build run: a task (usually a week) at a time, with a summary of each task and of the run.
+
+    Parameters:
+        'log_path' - String - JSON-lines file to append summaries to (NFL_TELEMETRY takes precedence, no file if
+                              neither)
+        'interval' - Float - Seconds between progress lines (0 for every update, None for none)
+        'out' - File - Where progress and summaries are printed (sys.stdout by default)
+        'run_info' - Dictionary - Extra fields for the run summary (e.g. the build settings)
+    '''
+
+    def __init__(self, log_path = None, interval = PROGRESS_INTERVAL, out = None, run_info = None):
+        self.log_path = os.environ.get(TELEMETRY_VARIABLE) or log_path
+        self.interval = interval
+        self.out = out
+        self.run_info = run_info or {}
+
+        self.run_id = f"{datetime.datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.run_start = time.perf_counter()
+        self.summaries = []
+
+        self.label = None
+        self.task = None
+
+    def start(self, label, total = None, week = None):
+        '''
+        Starts a task - a week, a batch of games or the whole run.
+
+        Parameters:
+            'label' - String - Name in progress lines (e.g. 'Week 3')
+            'total' - Integer - Player-plays expected, for percent done and ETA (unknown if None)
+            'week' - Integer - Week number for the summary
+        '''
+        now = time.perf_counter()
+
+        self.label = label
+        self.task = {'week':week,
+                     'total':total,
+                     'built':0,
+                     'failed':0,
+                     'start':now,
+                     'last_report':now}
+
+        self.emit(f'{label}: started' + (f' ({total:,} player-plays)' if total else ''))
+
+    def advance(self, built = 0, failed = 0):
+        '''
+        Counts player-plays built or failed, printing a progress line if the interval has passed.
+
+        Parameters:
+            'built' - Integer - Player-plays built since the last call
+            'failed' - Integer - Player-plays that failed since the last call
+        '''
+        if self.task is None:
+            return
+
+        self.task['built'] += built
+        self.task['failed'] += failed
+
+        if self.interval is None:
+            return
+
+        now = time.perf_counter()
+
+        if now - self.task['last_report'] >= self.interval:
+            self.task['last_report'] = now
+            self.emit(self.progress_line(now))
+
+    def finish(self, built = None, failures = None, **fields):
+        '''
+        Ends the current task: prints and logs its summary.
+
+        Parameters:
+            'built' - Integer - Player-plays built (the advanced count if None)
+            'failures' - Dataframe - Failure records of the task (acquire.failure_table) for counts by reason
+            'fields' - Extra fields for the summary
+        Returns:
+            'summary' - Dictionary - The task's summary
+        '''
+        if self.task is None:
+            return None
+
+        task = self.task
+        self.task = None
+
+        summary = self.record('week',
+                              label = self.label,
+                              week = task['week'],
+                              built = task['built'] if built is None else built,
+                              failures = failures,
+                              failed = task['failed'],
+                              seconds = time.perf_counter() - task['start'],
+                              **fields)
+
+        return summary
+
+    def record(self, event, label, week = None, built = 0, failures = None, failed = 0, seconds = 0.0, **fields):
+        '''
+        Prints and logs a summary without a task - e.g. a week built by worker processes.
+
+        Parameters:
+            'event' - String - 'week' or 'run'
+            'label' - String - Name in the printed summary
+            'week' - Integer - Week number
+            'built' - Integer - Player-plays built
+            'failures' - Dataframe - Failure records, for counts by reason (failed is used if None)
+            'failed' - Integer - Player-plays that failed
+            'seconds' - Float - How long it took
+            'fields' - Extra fields for the summary
+        Returns:
+            'summary' - Dictionary - run_id, event, label, week, player_plays, failed, failure_reasons, seconds,
+                                     player_plays_per_second, finished (time) and the extra fields
+        '''
+        if failures is not None:
+            failed = len(failures)
+            failure_reasons = {reason:int(count) for reason, count in failures.reason.value_counts().items()}
+        else:
+            failure_reasons = {}
+
+        summary = {'run_id':self.run_id,
+                   'event':event,
+                   'label':label,
+                   'week':week,
+                   'player_plays':int(built),
+                   'failed':int(failed),
+                   'failure_reasons':failure_reasons,
+                   'seconds':round(seconds, 3),
+                   'player_plays_per_second':round(built / seconds, 3) if seconds > 0 else None,
+                   'finished':datetime.datetime.now().isoformat(timespec = 'seconds'),
+                   **fields}
+
+        if event == 'week':
+            self.summaries.append(summary)
+
+        self.emit(f"{label}: {summary['player_plays']:,} player-plays built, {summary['failed']:,} failed in "
+                  f"{format_seconds(seconds)} ({summary['player_plays_per_second'] or 0:.1f}/s)"
+                  + (' - ' + ', '.join(f'{reason} {count}' for reason, count in failure_reasons.items()) if failure_reasons else ''))
+
+        self.log(summary)
+
+        return summary
+
+    def finish_run(self, failures = None, label = 'Run'):
+        '''
+        Prints and logs the summary of the whole run (every task since the telemetry was made).
+
+        Parameters:
+            'failures' - Dataframe - Failure records of the run, for counts by reason (summed from the tasks if None)
+            'label' - String - Name in the printed summary
+        Returns:
+            'summary' - Dictionary - As for a task, plus weeks and the run_info fields
+        '''
+        built = sum(summary['player_plays'] for summary in self.summaries)
+        failed = sum(summary['failed'] for summary in self.summaries)
+
+        summary = self.record('run',
+                              label = label,
+                              built = built,
+                              failures = failures,
+                              failed = failed,
+                              seconds = time.perf_counter() - self.run_start,
+                              weeks = [summary['week'] for summary in self.summaries],
+                              **self.run_info)
+
+        return summary
+
+    def stop(self):
+        '''
+        Ends the current task without a summary (e.g. when its weeks are summarized with record instead).
+        '''
+        self.task = None
+
+    def progress_line(self, now):
+        '''
+        Progress of the current task: done (of total), percent, rate, ETA and failures.
+        '''
+        task = self.task
+        done = task['built'] + task['failed']
+        seconds = now - task['start']
+        rate = done / seconds if seconds > 0 else 0
+
+        line = f'{self.label}: {done:,}'
+
+        if task['total']:
+            line += f"/{task['total']:,} player-plays ({100 * done / task['total']:.1f}%)"
+        else:
+            line += ' player-plays'
+
+        line += f' | {rate:.1f}/s'
+
+        if task['total'] and rate > 0:
+            line += f" | ETA {format_seconds(max(task['total'] - done, 0) / rate)}"
+
+        line += f" | {task['failed']:,} failed"
+
+        return line
+
+    def emit(self, line):
+        '''
+        Prints a progress or summary line (flushed, so it shows up in logs straight away).
+        '''
+        if self.interval is None:
+            return
+
+        print(line, file = self.out or sys.stdout, flush = True)
+
+    def log(self, summary):
+        '''
+        Appends a summary to the JSON-lines log, if there is one.
+        '''
+        if self.log_path is None:
+            return
+
+        with open(self.log_path, 'a') as f:
+            f.write(json.dumps(summary, default = str) + '\n')
+
+
+def get_telemetry(telemetry = None, interval = PROGRESS_INTERVAL):
+    '''
+    Returns the given telemetry, or a new one (printing progress, without a log unless NFL_TELEMETRY is set) so
+    builders can be called with or without a shared one.
+
+    Parameters:
+        'telemetry' - BuildTelemetry or None
+        'interval' - Float - Progress interval of a new telemetry
+    Returns:
+        'telemetry' - BuildTelemetry
+    '''
+    if telemetry is None:
+        telemetry = BuildTelemetry(interval = interval)
+
+    return telemetry
+
+
+# ----- Support Functions -----------------------------------------------------------------------------
+
+def format_seconds(seconds):
+    '''
+    Seconds as e.g. '42s', '3m 05s' or '1h 02m'.
+    '''
+    seconds = int(round(seconds))
+
+    if seconds < 60:
+        return f'{seconds}s'
+
+    if seconds < 3600:
+        return f'{seconds // 60}m {seconds % 60:02d}s'
+
+    return f'{seconds // 3600}h {seconds % 3600 // 60:02d}m'
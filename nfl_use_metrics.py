@@ -7,10 +7,21 @@
 import nfl_frame_builder as nfl
 import nfl_acquire_and_prep as acquire
 import nfl_build_metrics as metrics
+import nfl_profiling as profiling
+import nfl_telemetry as telemetry_module
+import nfl_results as results_module
+import nfl_resume as resume_module
+import nfl_results_db as results_db_module
+import nfl_frame_archive as frame_archive_module
+import nfl_rollups as rollups_module
 
 import pandas as pd
 import numpy as np
 
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 pd.set_option('display.max_columns', None)
 import warnings
 warnings.filterwarnings('ignore')
@@ -20,7 +31,9 @@ warnings.filterwarnings('ignore')
 # BUILD PLAYER AND PLAY METRICS DATAFRAME, BY WEEK
 # ====================================================================================================
 
-def all_week_pass_rush_results(start_week = 1, end_week = 8):
+def all_week_pass_rush_results(start_week = 1, end_week = 8, session = None, stream = False, engine = 'loop', batch = False,
+                               workers = 1, parallel_by = 'week', profile = None, failures = None, telemetry_log = None,
+                               sink = None, resume = False, results_db = None, frame_archive = None, rollups = None):
     '''
     Self-contained function that pulls in all the metrics for desired weeks and outputs pass_rush_results.
     
@@ -29,39 +42,273 @@ def all_week_pass_rush_results(start_week = 1, end_week = 8):
     Parameters:
         'start_week' - Integer - Week to start building from (inclusive)
         'end_week' - Integer - Week to build to (inclusive)
+        'session' - DataSession - Shared tables (a new session is used if not given)
+        'stream' - Boolean - Read each week's tracking csv play by play (acquire.iter_week_plays) instead of loading
+                             the whole week, keeping memory bounded to a few plays
+        'engine' - String - Metric engine passed to build_metrics ('loop', 'numpy' or 'numba')
+        'batch' - Boolean - Build each week's metrics in one batched pass (play_player_metrics_batch) instead of
+                            player-play by player-play (the batched pass is always whole-array, with the numba kernel
+                            if engine is 'numba')
+        'workers' - Integer - Number of processes to build with (1 builds in this process)
+        'parallel_by' - String - With more than one worker, hand out work by 'week' or by 'game' (stream is only
+                                 used by week) - anything else raises a ValueError before any work is done
+        'profile' - Boolean or String - Time every stage (True) and count allocations too ('memory'), printing a per
+                                        stage report at the end (see nfl_profiling); NFL_PROFILE decides if None
+        'failures' - List - Failure records of the player-plays that could not be built are added to it, optional
+        'telemetry_log' - String - JSON-lines file a summary of each week and of the run is appended to (see
+                                   nfl_telemetry - NFL_TELEMETRY overrides it), optional - no file if neither is set
+        'sink' - ResultSink - Where each week's results go as soon as the week is built (see nfl_results); by default
+                              a PartitionedResultSink writing metric_results_weeks_X_through_Y/week=N/ parquet (csv if
+                              no parquet engine is installed) files, so finished weeks are kept if the run stops
+        'resume' - Boolean - Only build the player-plays that are not already in the sink's directory from an earlier
+                             run with the same input files and metric code (see nfl_resume); a partitioned sink
+                             records what it holds either way, a game at a time, so any build can be resumed later
+                             (resume with any other sink raises a ValueError)
+        'results_db' - String - SQLite file to load each week's results into for indexed player/team/week queries
+                                (see nfl_results_db), optional - weeks already in it from other runs are kept
+        'frame_archive' - String - Directory to archive every built player-play's per-frame metrics in, to summarize
+                                   them again later without rebuilding (see nfl_frame_archive), optional; a week that
+                                   was only partly built is built again in full when resuming, so its archive is whole
+        'rollups' - String - SQLite file each week's per player, team, position and week aggregates are folded into,
+                             for season summaries and leaderboards (see nfl_rollups), optional
     Returns:
         'all_results' - Dataframe - Metrics for each player-play for given weeks
-        ***.csv of results saved to folder***
+        ***.csv of results (and of the player-plays that could not be built, with why) saved to folder***
     '''
-    # Load the data used within the sub-functions
-    players_df = acquire.players()
-    scout_pass_rush = acquire.scout_pass_rush()
-    scout_pass_block = acquire.scout_pass_block()
+    # Bad options are raised before anything is written (or recorded as built)
+    if workers > 1:
+        check_parallel_by(parallel_by)
+    
+    if resume and sink is not None and not isinstance(sink, results_module.PartitionedResultSink):
+        raise ValueError('resume needs a PartitionedResultSink - the finished player-plays are read back from its files')
+    
+    # Load the data used within the sub-functions - each source file is only read once per session
+    session = acquire.get_session(session)
     # Default to 'PvP'
     v_type = 'PvP'
     
-    # Create empty dataframe to hold results
-    all_results = pd.DataFrame()
+    # Player-plays that could not be built, with why
+    if failures is None:
+        failures = []
     
-    # Run through weeks to build for    
-    for i in range(start_week, end_week + 1):
-        print('2021 NFL Week:',i)
-        # Acquire that week's frame data
-        week_df = acquire.week(i)
+    # Each week is written out as it finishes rather than held until the end of the run
+    if sink is None:
+        sink = results_module.PartitionedResultSink(f'metric_results_weeks_{start_week}_through_{end_week}',
+                                                    dtypes = session.scout_pass_rush.dtypes)
     
-        pass_rush_results = play_player_metrics_builder(scout_pass_rush, scout_pass_block, v_type, players_df, week_df)
-        
-        all_results = pd.concat([all_results, pass_rush_results])
+    # Player-plays written to disk are recorded, with what they were built from, so a build can pick up where it stopped
+    if isinstance(sink, results_module.PartitionedResultSink):
+        manifest = resume_module.BuildManifest(sink.directory)
+    else:
+        manifest = None
+    
+    # Per-frame metrics are only archived when pyarrow is there to write them
+    if frame_archive is not None and frame_archive_module.pa is None:
+        print('pyarrow is not installed - frames are not archived')
+        frame_archive = None
+    
+    # Rate-limited progress instead of a line per player-play, and a summary of each week and of the run
+    telemetry = telemetry_module.BuildTelemetry(log_path = telemetry_log,
+                                                run_info = {'function':'all_week_pass_rush_results',
+                                                            'start_week':start_week,
+                                                            'end_week':end_week,
+                                                            'engine':engine,
+                                                            'batch':batch,
+                                                            'stream':stream,
+                                                            'workers':workers})
+    
+    # Profile every stage only when asked to - otherwise nothing is wrapped
+    profile = profiling.requested(profile)
+    if profile:
+        profiling.reset()
+        profiling.enable(memory = profile == 'memory')
+    
+    try:
+        if workers > 1:
+            # Weeks already built are skipped, and only the missing player-plays of the others are handed out
+            finished = {}
+            for i in range(start_week, end_week + 1):
+                finished[i] = start_manifest_week(i, v_type, sink, manifest, resume, telemetry, failures) if manifest is not None else set()
+                
+                if frame_archive is not None and finished[i] is not None:
+                    finished[i] = start_archive_week(i, v_type, sink, manifest, frame_archive, finished[i], telemetry, failures)
+            
+            weeks = [i for i in finished if finished[i] is not None]
+            
+            # Weeks whose tasks all ran and returned - only these are marked complete
+            built_weeks = []
+            
+            if weeks:
+                parallel_pass_rush_results(start_week, end_week, session, v_type, stream, engine, batch, workers, parallel_by,
+                                           failures = failures,
+                                           telemetry = telemetry,
+                                           sink = sink,
+                                           weeks = weeks,
+                                           skip = finished,
+                                           frame_archive = frame_archive,
+                                           built_weeks = built_weeks)
+            
+            if manifest is not None:
+                failure_table = acquire.failure_table(failures)
+                
+                for i in built_weeks:
+                    week_games = session.games.game[session.games.week == i]
+                    finish_manifest_week(i, session, sink, manifest, failure_table[failure_table.game.isin(week_games)])
+
+        else:
+            # Run through weeks to build for    
+            for i in range(start_week, end_week + 1):
+                finished = set()
+                
+                if manifest is not None:
+                    finished = start_manifest_week(i, v_type, sink, manifest, resume, telemetry, failures)
+                    
+                    if finished is None:
+                        continue
+                
+                if frame_archive is not None:
+                    finished = start_archive_week(i, v_type, sink, manifest, frame_archive, finished, telemetry, failures)
+                
+                telemetry.start(f'2021 NFL Week {i}', total = week_entry_count(session, [i]) - len(finished), week = i)
+                
+                week_failures = []
+                built = 0
+                
+                # A game at a time when each game's results are recorded as soon as they are built
+                for games in week_game_chunks(i, session, finished, by_game = manifest is not None and not stream):
+                    pass_rush_results = week_pass_rush_results(i, session, v_type, stream, engine, batch,
+                                                               games = games,
+                                                               skip = finished,
+                                                               failures = week_failures,
+                                                               telemetry = telemetry,
+                                                               frame_archive = frame_archive)
+                    built += len(pass_rush_results)
+                    
+                    sink.extend(pass_rush_results, partition = i)
+                    sink.flush()
+                    
+                    if manifest is not None and len(pass_rush_results) > 0:
+                        manifest.record(i, sink.files[i][-1], pass_rush_results)
+                
+                failures += week_failures
+                
+                if manifest is not None:
+                    finish_manifest_week(i, session, sink, manifest, acquire.failure_table(week_failures))
+                
+                telemetry.finish(built = built, failures = acquire.failure_table(week_failures), resumed = len(finished))
+    
+    finally:
+        if profile:
+            profiling.disable()
+    
+    if profile:
+        print('Stage profile (seconds include the stages called, own_seconds do not):')
+        print(profiling.report().to_string())
         
+    # Every week's results, put together once
+    all_results = sink.result()
+    
     # Save to a csv for easier later use
     filename = f'metric_results_weeks_{start_week}_through_{end_week}.csv'
     all_results.to_csv(filename, index = False)
+    
+    # Each week is loaded (and folded) in on its own, replacing only that week's rows - weeks outside this run are kept
+    for week_num, week_results in sink.iter_partitions():
+        if len(week_results) == 0:
+            continue
+        
+        if results_db is not None:
+            results_db_module.add_week_results(week_results, session, results_db)
+        
+        if rollups is not None:
+            rollups_module.fold_week(week_results, session, rollups)
+    
+    failure_table = acquire.failure_table(failures)
+    failure_table.to_csv(f'metric_failures_weeks_{start_week}_through_{end_week}.csv', index = False)
+    
+    telemetry.finish_run(failures = failure_table, label = f'2021 NFL Weeks {start_week}-{end_week}')
         
     return all_results
 
 
 # ----- Sub Functions -----------------------------------------------------------------------------
 
+def week_pass_rush_results(week_num, session, v_type, stream, engine, batch, games = None, skip = None, failures = None, telemetry = None,
+                           frame_archive = None):
+    '''
+    Builds pass_rush_results for one week (or some of its games).
+    
+    Parameters:
+        'week_num' - Integer - Week to build
+        'session' - DataSession - Shared tables
+        'v_type' - String - The type of analysis to perform, defaulting to 'PvP'
+        'stream' - Boolean - Read the week's tracking csv play by play instead of loading the whole week
+        'engine' - String - Metric engine passed to build_metrics ('loop', 'numpy' or 'numba')
+        'batch' - Boolean - Build with play_player_metrics_batch instead of play_player_metrics_builder
+        'games' - List of Integers - Only build these games (all of the week's games if None)
+        'skip' - Set of Tuples - (game, play, nflId) of player-plays not to build (e.g. already finished), optional
+        'failures' - List - Failure records of the player-plays that could not be built are added to it, optional
+        'telemetry' - BuildTelemetry - Progress of a longer build to report to (the builder reports its own if None)
+        'frame_archive' - String - Directory to archive the per-frame metrics in (one file for the week or for these
+                                   games), optional
+    Returns:
+        'pass_rush_results' - Dataframe - Metrics for each player in each play, with pressure statistics from PFF scouting
+    '''
+    players_df = session.players
+    scout_pass_rush = session.scout_pass_rush
+    scout_pass_block = session.scout_pass_block
+    matchup_index = session.matchup_index
+    
+    # Acquire that week's frame data, indexed by (game, play) so each play is a slice rather than a scan
+    if stream:
+        week_df = acquire.iter_week_plays(week_num)
+        play_windows = None
+    else:
+        week_df = session.week(week_num)
+        
+        # Windowed once per week, however many of its games are built at a time
+        play_windows = session.play_windows(week_num)
+    
+    if games is not None:
+        scout_pass_rush = scout_pass_rush[scout_pass_rush.game.isin(games)]
+        
+        # The batched build works through every play it is given, so only give it these games
+        if batch and not stream:
+            week_df = week_df[week_df.game.isin(games)]
+    
+    if skip:
+        keys = pd.MultiIndex.from_frame(scout_pass_rush[['game', 'play', 'nflId']])
+        scout_pass_rush = scout_pass_rush[~keys.isin(list(skip))]
+
+    archive = frame_archive_module.open_writer(frame_archive, week_num, games) if frame_archive is not None else None
+    
+    try:
+        if batch:
+            pass_rush_results = play_player_metrics_batch(scout_pass_rush, scout_pass_block, v_type, players_df, week_df,
+                                                          matchup_index = matchup_index,
+                                                          backend = 'numba' if engine == 'numba' else 'numpy',
+                                                          failures = failures,
+                                                          telemetry = telemetry,
+                                                          archive = archive)
+        else:
+            pass_rush_results = play_player_metrics_builder(scout_pass_rush, scout_pass_block, v_type, players_df, week_df, engine = engine,
+                                                            matchup_index = matchup_index,
+                                                            failures = failures,
+                                                            telemetry = telemetry,
+                                                            archive = archive,
+                                                            play_windows = play_windows)
+    except BaseException:
+        # An archive file is only put in place once its build has finished
+        if archive is not None:
+            archive.discard()
+        raise
+    
+    if archive is not None:
+        archive.close()
+    
+    return pass_rush_results
+
+
 def pull_metrics(analysis_frames, qb_hold_time):
     '''
     Consolidates metrics for a given play.
@@ -113,7 +360,8 @@ def pull_metrics(analysis_frames, qb_hold_time):
     return play_metrics
 
 
-def play_player_metrics_builder(scout_pass_rush, scout_pass_block, v_type, players_df, week_df):
+def play_player_metrics_builder(scout_pass_rush, scout_pass_block, v_type, players_df, week_df, engine = 'loop', matchup_index = None,
+                                failures = None, telemetry = None, archive = None, play_windows = None):
     '''
     Given a specific week and its associated dataframe, create the metrics for each player in each play and then merge
     with player-play results from PFF's scouting reports.
@@ -126,50 +374,794 @@ def play_player_metrics_builder(scout_pass_rush, scout_pass_block, v_type, playe
         'scout_pass_block' - Dataframe - Pass blocker PFF scouting data
         'v_type' - String - The type of analysis to perform, defaulting to 'PvP'
         'players_df' - Dataframe - Contains player information, including weight
-        'week_df' - Dataframe - Weekly frame by frame data for each play 
+        'week_df' - Dataframe - Weekly frame by frame data for each play, or an iterator of (game, play, play_frames_df)
+                                such as acquire.iter_week_plays
+        'engine' - String - Metric engine passed to build_metrics ('loop', 'numpy' or 'numba')
+        'matchup_index' - Dictionary - Prebuilt matchups (acquire.build_matchup_index), built from scout_pass_block if
+                                       not given
+        'failures' - List - Failure records (acquire.validate_player_plays) of the player-plays that could not be built
+                            are added to it, optional
+        'telemetry' - BuildTelemetry - Progress of a longer build to report to; if None the build reports its own
+                                       progress and summary
+        'archive' - FrameArchiveWriter - The per-frame metrics of each player-play built are added to it, optional
+        'play_windows' - Dataframe - acquire.build_play_windows of week_df (e.g. DataSession.play_windows), found here
+                                     if not given
     Returns:
         'pass_rush_results' - Dataframe - Metrics for each player in each play, with pressure statistics from PFF scouting
     '''
-    results = pd.DataFrame()
+    # Rows are buffered column by column and put together once at the end, keeping the scouting dtypes
+    results = results_module.ResultSink(dtypes = scout_pass_rush.dtypes)
+    
+    # Failures of this build, counted at the end
+    build_failures = []
     
-    week_game_list = week_df.game.unique()
+    # Progress is reported to the longer build this is part of, or on its own
+    own_telemetry = telemetry is None
+    telemetry = telemetry_module.get_telemetry(telemetry)
     
-    scout_pass_rush = scout_pass_rush[scout_pass_rush.game.isin(week_game_list)]
+    # Who blocked whom, indexed once rather than scanned for every player-play
+    if matchup_index is None:
+        matchup_index = acquire.build_matchup_index(scout_pass_block)
     
-    for entry in scout_pass_rush.index:
+    if isinstance(week_df, pd.DataFrame):
+        week_game_list = week_df.game.unique()
+        
+        scout_pass_rush = scout_pass_rush[scout_pass_rush.game.isin(week_game_list)]
+        
+        if own_telemetry:
+            telemetry.start('Player-plays', total = len(scout_pass_rush))
+        
+        # Snap and end frames of every play, found once for the whole week (or given, when the week is built a game
+        # at a time)
+        window_table = play_windows if play_windows is not None else acquire.build_play_windows(week_df)
+        play_windows = acquire.play_window_lookup(window_table)
+        
+        # Player-plays that cannot be built are recorded before any frames are built (only the rows of their players
+        # are checked, so building some of the week's games costs no more than their share)
+        scout_pass_rush, invalid = acquire.validate_player_plays(scout_pass_rush, week_df, players_df, matchup_index, window_table)
+        build_failures.append(invalid)
+        telemetry.advance(failed = len(invalid))
+        
+        # Every player-play is built from the full week's frames
+        entries = ((entry, week_df) for entry in scout_pass_rush.index)
+        
+    else:
+        # Streamed plays - each play's rushers are validated and built from that play's frames as soon as the play has
+        # been read
+        play_windows = {}
+        
+        if own_telemetry:
+            telemetry.start('Player-plays')
+        
+        entries = stream_play_entries(week_df, scout_pass_rush, play_windows, players_df, matchup_index, build_failures, telemetry)
+    
+    # A play's pass rushers are next to each other in the scouting data, so each play is built once and shared by
+    # all of its pass rushers
+    play_state = None
+    
+    for entry, frames_df in entries:
         # Added a try except since there are errors when the snap events are missing
         try:
             game = scout_pass_rush.game.loc[entry]
             play = scout_pass_rush.play.loc[entry]
             nflId = scout_pass_rush.nflId.loc[entry]
+            
+            if play_state is None or (play_state['game'], play_state['play']) != (game, play):
+                # Cleared first so a play that cannot be built is never mistaken for the previous one
+                play_state = None
+                play_state = nfl.build_play_state(game, play, frames_df, play_windows)
 
-            qb_hold_time, point_of_scrimmage, analysis_frames = nfl.build_play_frames(game,
-                                                                                      play,
-                                                                                      week_df,
-                                                                                      nflId,
-                                                                                      scout_pass_block,
-                                                                                      player_type = 'pass_rusher',
-                                                                                      v_type = v_type)
+            qb_hold_time, point_of_scrimmage, analysis_frames = nfl.play_state_analysis_frames(play_state,
+                                                                                               nflId,
+                                                                                               scout_pass_block,
+                                                                                               player_type = 'pass_rusher',
+                                                                                               v_type = v_type,
+                                                                                               matchup_index = matchup_index,
+                                                                                               verbose = False)
 
             analysis_frames = metrics.build_metrics(analysis_frames,
                                                     point_of_scrimmage,
-                                                    players_df)
+                                                    players_df,
+                                                    engine = engine)
 
-            play_metrics = pd.DataFrame([pull_metrics(analysis_frames, qb_hold_time)])
+            play_metrics = pull_metrics(analysis_frames, qb_hold_time)
+            
+            # Scouting columns of the player-play, then its metrics (pass_rusher is the player's nflId)
+            play_metrics.pop('pass_rusher')
+            results.append({**scout_pass_rush.loc[entry].to_dict(), **play_metrics})
             
-            play_metrics = pd.merge(scout_pass_rush[scout_pass_rush.index == entry],
-                                    play_metrics,
-                                    how = 'inner',
-                                    left_on = 'nflId',
-                                    right_on = 'pass_rusher')
+            if archive is not None:
+                archive.add(game, play, nflId, analysis_frames)
+
+            telemetry.advance(built = 1)
+            
+        except Exception as error:
+            # Recorded rather than raised, so one bad player-play does not stop the week
+            build_failures.append(acquire.failure_rows(scout_pass_rush.loc[[entry]], 'build_error', f'{type(error).__name__}: {error}'))
+            telemetry.advance(failed = 1)
+    
+    pass_rush_results = results.result()
+    
+    # Streamed plays arrive in tracking file order - put them back in scouting order, as for a full week
+    if not isinstance(week_df, pd.DataFrame):
+        pass_rush_results = restore_scouting_order(pass_rush_results, scout_pass_rush)
+    
+    build_failures = collect_failures(build_failures, failures)
+    
+    if own_telemetry:
+        telemetry.finish(built = len(pass_rush_results), failures = build_failures)
+    
+    return pass_rush_results
+
+
+def stream_play_entries(plays, scout_pass_rush, play_windows, players_df, matchup_index, failures, telemetry):
+    '''
+    Pairs each streamed play's valid scouting entries with the play's frames, adding the play's window to
+    play_windows as the play is read.  Entries are validated play by play (acquire.validate_player_plays); entries
+    of plays missing from the stream (in games that were streamed) are recorded once the stream ends.
+    
+    Parameters:
+        'plays' - Iterator - (game, play, play_frames_df) tuples, such as acquire.iter_week_plays
+        'scout_pass_rush' - Dataframe - Pass rusher PFF scouting data
+        'play_windows' - Dictionary - Snap and end frames of valid plays, filled in as plays are read
+        'players_df' - Dataframe - Contains player information, including weight
+        'matchup_index' - Dictionary - Prebuilt matchups (acquire.build_matchup_index)
+        'failures' - List - Failure records are added to it
+        'telemetry' - BuildTelemetry - Failures are counted in its progress
+    Yields:
+        'entry' - Integer - Scouting index of a pass rusher
+        'play_frames_df' - Dataframe - Frames of the pass rusher's play
+    '''
+    play_entries = scout_pass_rush.groupby(['game', 'play'], sort = False).groups
+    streamed = set()
+    
+    for game, play, play_frames_df in plays:
+        streamed.add((game, play))
+        
+        if (game, play) not in play_entries:
+            continue
+        
+        window_table = acquire.build_play_windows(play_frames_df)
+        play_windows.update(acquire.play_window_lookup(window_table))
+        
+        valid, invalid = acquire.validate_player_plays(scout_pass_rush.loc[play_entries[(game, play)]],
+                                                       play_frames_df,
+                                                       players_df,
+                                                       matchup_index,
+                                                       window_table)
+        failures.append(invalid)
+        telemetry.advance(failed = len(invalid))
+        
+        for entry in valid.index:
+            yield entry, play_frames_df
+    
+    # Plays of the streamed games that never showed up
+    untracked = untracked_entries(scout_pass_rush, streamed)
+    failures.append(untracked)
+    telemetry.advance(failed = len(untracked))
+
+
+def restore_scouting_order(results, scout_pass_rush):
+    '''
+    Sorts player-play results into the order their entries appear in the pass rush scouting data, which is the
+    order a single full-week build produces.
+    
+    Parameters:
+        'results' - Dataframe - Player-play results (must have game, play and nflId)
+        'scout_pass_rush' - Dataframe - Pass rusher PFF scouting data
+    Returns:
+        'results' - Dataframe - The same results, reordered
+    '''
+    keys = ['game', 'play', 'nflId']
+    
+    # Position of each result's player-play within the scouting data
+    position = pd.MultiIndex.from_frame(scout_pass_rush[keys]).get_indexer(pd.MultiIndex.from_frame(results[keys]))
+    
+    results = results.iloc[np.argsort(position, kind = 'stable')]
+    
+    return results
+
+
+def untracked_entries(scout_pass_rush, streamed):
+    '''
+    Failure records of the pass rushers of plays missing from the tracking data, in games that are in it (other
+    games belong to other weeks).
+    
+    Parameters:
+        'scout_pass_rush' - Dataframe - Pass rusher PFF scouting data
+        'streamed' - Set - (game, play) of every play in the tracking data
+    Returns:
+        'failures' - Dataframe - Failure records with reason 'play_not_tracked'
+    '''
+    streamed_games = {game for game, play in streamed}
+    
+    in_games = scout_pass_rush.game.isin(streamed_games).to_numpy()
+    was_streamed = pd.MultiIndex.from_frame(scout_pass_rush[['game', 'play']]).isin(list(streamed))
+    
+    return acquire.failure_rows(scout_pass_rush[in_games & ~was_streamed], 'play_not_tracked')
+
+
+def collect_failures(build_failures, failures = None):
+    '''
+    Puts a build's failure records together and adds them to failures.
+    
+    Parameters:
+        'build_failures' - List of Dataframes - Failure records of the build
+        'failures' - List - Where to add them, optional
+    Returns:
+        'build_failures' - Dataframe - The build's failure table
+    '''
+    build_failures = acquire.failure_table(build_failures)
+    
+    if failures is not None:
+        failures.append(build_failures)
+    
+    return build_failures
+
+
+def week_entry_count(session, weeks):
+    '''
+    Number of pass rusher player-plays in the games of some weeks, for progress.
+    
+    Parameters:
+        'session' - DataSession - Shared tables
+        'weeks' - List of Integers - Weeks
+    Returns:
+        'count' - Integer
+    '''
+    week_games = session.games[session.games.week.isin(weeks)].game
+    
+    return int(session.scout_pass_rush.game.isin(week_games).sum())
+
+
+
+def start_manifest_week(week_num, v_type, sink, manifest, resume, telemetry, failures):
+    '''
+    Gets a week of a partitioned sink ready to build: the files of its finished player-plays are kept when resuming
+    (and they were built from the same inputs and metric code), otherwise the week starts again.
+    
+    Parameters:
+        'week_num' - Integer - Week
+        'v_type' - String - The type of analysis
+        'sink' - PartitionedResultSink - Where the week's results go
+        'manifest' - BuildManifest - What the sink's directory holds
+        'resume' - Boolean - Carry on from the week's finished player-plays
+        'telemetry' - BuildTelemetry - A week that is already built is reported to it
+        'failures' - List - Failure records kept with a week that is already built are added to it
+    Returns:
+        'finished' - Set of Tuples - (game, play, nflId) of the finished player-plays, or None if the whole week is
+                                     already built
+    '''
+    fingerprint = resume_module.week_fingerprint(week_num, v_type)
+    
+    if not resume:
+        manifest.restart(week_num, fingerprint)
+    
+    finished = manifest.finished(week_num, fingerprint)
+    sink.keep(week_num, manifest.parts(week_num))
+    
+    if manifest.is_complete(week_num):
+        telemetry.emit(f'2021 NFL Week {week_num}: already built ({len(finished):,} player-plays)')
+        failures.append(manifest.failures(week_num))
+        return None
+    
+    return finished
+
+
+def finish_manifest_week(week_num, session, sink, manifest, failures):
+    '''
+    Rewrites a week of a partitioned sink as one file in scouting order (its results may have been built a game at a
+    time, over more than one run) and marks it complete in the manifest.
+    
+    Parameters:
+        'week_num' - Integer - Week
+        'session' - DataSession - Shared tables
+        'sink' - PartitionedResultSink - Where the week's results are
+        'manifest' - BuildManifest - What the sink's directory holds
+        'failures' - Dataframe - Failure records of the week, kept with it
+    '''
+    week_results = sink.read(week_num)
+    
+    if len(week_results) > 0:
+        week_results = restore_scouting_order(week_results, session.scout_pass_rush)
+    
+    # A week written in one go is already one file in order
+    if len(sink.files[week_num]) == 1 and week_results.index.is_monotonic_increasing:
+        path = sink.files[week_num][0]
+    else:
+        path = sink.compact(week_num, week_results)
+    
+    manifest.complete(week_num, path, week_results, failures)
+
+
+def start_archive_week(week_num, v_type, sink, manifest, frame_archive, finished, telemetry, failures):
+    '''
+    Clears a week's frame archive before it is built.  The frames of player-plays finished in an earlier run were not
+    necessarily archived, so a week that was only partly built starts again.
+    
+    Parameters:
+        'week_num' - Integer - Week
+        'v_type' - String - The type of analysis
+        'sink' - PartitionedResultSink - Where the week's results go (None if there is no manifest)
+        'manifest' - BuildManifest - What the sink's directory holds, optional
+        'frame_archive' - String - Archive directory
+        'finished' - Set of Tuples - (game, play, nflId) of the week's finished player-plays
+        'telemetry', 'failures' - As in start_manifest_week
+    Returns:
+        'finished' - Set of Tuples - The week's finished player-plays (none once it starts again)
+    '''
+    if finished and manifest is not None:
+        finished = start_manifest_week(week_num, v_type, sink, manifest, False, telemetry, failures)
+    
+    frame_archive_module.clear_week(frame_archive, week_num)
+    
+    return finished
+
+
+def week_game_chunks(week_num, session, finished, by_game):
+    '''
+    How a week is handed to week_pass_rush_results: a game at a time (only the games with player-plays left to build)
+    or all at once.
+    
+    Parameters:
+        'week_num' - Integer - Week
+        'session' - DataSession - Shared tables
+        'finished' - Set of Tuples - (game, play, nflId) of player-plays already built
+        'by_game' - Boolean - A game at a time
+    Returns:
+        'chunks' - List - Lists of games, or [None] for the whole week
+    '''
+    if not by_game:
+        return [None]
+    
+    scout_pass_rush = session.scout_pass_rush
+    week_entries = scout_pass_rush[scout_pass_rush.game.isin(session.games.game[session.games.week == week_num])]
+    
+    if finished:
+        keys = pd.MultiIndex.from_frame(week_entries[['game', 'play', 'nflId']])
+        week_entries = week_entries[~keys.isin(list(finished))]
+    
+    return [[game] for game in week_entries.game.unique()]
+
+
+# ====================================================================================================
+# PARALLEL BUILD
+# ====================================================================================================
+
+# Tables of the worker process (set by start_worker)
+worker_session = None
+
+# Ways work can be handed out to the workers
+PARALLEL_BY = ['week', 'game']
 
-            results = pd.concat([results, play_metrics])
 
-            print(f'Added game|play|nflId = {game}|{play}|{nflId}')
+def parallel_pass_rush_results(start_week, end_week, session, v_type, stream, engine, batch, workers, parallel_by = 'week',
+                               failures = None, telemetry = None, sink = None, weeks = None, skip = None, frame_archive = None,
+                               built_weeks = None):
+    '''
+    Builds pass_rush_results across a pool of processes, handing out a week or a game at a time.  Results are
+    gathered in the order the work was handed out and each week put in scouting order, so the rows come out in the
+    same order as a single process build.  Prints each worker's throughput at the end.
+    
+    Parameters:
+        'start_week' - Integer - Week to start building from (inclusive)
+        'end_week' - Integer - Week to build to (inclusive)
+        'session' - DataSession - Shared tables (workers open their own session with the same settings)
+        'v_type' - String - The type of analysis to perform, defaulting to 'PvP'
+        'stream' - Boolean - Read each week's tracking csv play by play (by week only)
+        'engine' - String - Metric engine passed to build_metrics ('loop', 'numpy' or 'numba')
+        'batch' - Boolean - Build with play_player_metrics_batch instead of play_player_metrics_builder
+        'workers' - Integer - Number of processes
+        'parallel_by' - String - 'week' or 'game'
+        'failures' - List - Failure records of the workers are added to it, optional
+        'telemetry' - BuildTelemetry - Progress is advanced as each task finishes and each week summarized at the end,
+                                       optional
+        'sink' - ResultSink - Each week's results are added to it, in week order (an in-memory one if None)
+        'weeks' - List of Integers - Only build these weeks (every week from start_week to end_week if None)
+        'skip' - Dictionary - Week to the (game, play, nflId) of player-plays not to build, optional
+        'frame_archive' - String - Directory the workers archive per-frame metrics in (a file per task), optional
+        'built_weeks' - List - Weeks whose tasks all ran and returned are added to it, optional
+    Returns:
+        'all_results' - Dataframe - Metrics for each player-play for given weeks
+    '''
+    check_parallel_by(parallel_by)
+    
+    if weeks is None:
+        weeks = range(start_week, end_week + 1)
+    
+    skip = skip or {}
+    telemetry = telemetry_module.get_telemetry(telemetry)
+    sink = results_module.get_sink(sink)
+    
+    if parallel_by == 'week':
+        tasks = [(week_num, None) for week_num in weeks]
+        
+    else:
+        # Games in week order, so each worker tends to reuse the week it has loaded
+        games = session.games[session.games.week.isin(weeks)].sort_values('week', kind = 'stable')
+        tasks = [(week_num, [game]) for week_num, game in zip(games.week, games.game)]
+        stream = False
+    
+    with ProcessPoolExecutor(max_workers = workers,
+                             initializer = start_worker,
+                             initargs = (acquire.DATA_DIR, acquire.CACHE_DIR, session.use_cache, session.indexed, session.compact,
+                                         profiling.trace_memory if profiling.is_enabled() else None)) as executor:
+        
+        futures = [executor.submit(pass_rush_results_task, week_num, games, v_type, stream, engine, batch, skip.get(week_num), frame_archive)
+                   for week_num, games in tasks]
+        
+        telemetry.start(f'2021 NFL Weeks {start_week}-{end_week}',
+                        total = week_entry_count(session, list(weeks)) - sum(len(skip.get(week_num) or []) for week_num in weeks))
+        
+        # Progress as tasks finish, in whatever order
+        for future in as_completed(futures):
+            results, stats = future.result()
+            telemetry.advance(built = len(results), failed = len(stats['failures']))
+        
+        telemetry.stop()
+        
+        # Collect in submission order, whichever worker finished first
+        outputs = [future.result() for future in futures]
+    
+    # Stage profiles and failures of the workers add to this process's
+    for results, stats in outputs:
+        profiling.merge(stats.pop('profile', {}))
+        
+        if failures is not None:
+            failures.append(stats['failures'])
+    
+    # Put each week's games back together, in scouting order
+    for week_num in weeks:
+        week_outputs = [output for (task_week, games), output in zip(tasks, outputs) if task_week == week_num]
+        
+        if len(week_outputs) == 0:
+            continue
+        
+        week_results = restore_scouting_order(pd.concat([results for results, stats in week_outputs]), session.scout_pass_rush)
+        
+        # Seconds are worker busy time, summed over the week's tasks
+        telemetry.record('week',
+                         label = f'2021 NFL Week {week_num}',
+                         week = week_num,
+                         built = len(week_results),
+                         failures = acquire.failure_table([stats['failures'] for results, stats in week_outputs]),
+                         seconds = sum(stats['seconds'] for results, stats in week_outputs))
+        
+        sink.extend(week_results, partition = week_num)
+        sink.flush()
+        
+        if built_weeks is not None:
+            built_weeks.append(week_num)
+    
+    print(worker_throughput([{key:value for key, value in stats.items() if key != 'failures'} for results, stats in outputs]))
+    
+    return sink.result()
+
+
+# ----- Sub Functions -----------------------------------------------------------------------------
+
+def check_parallel_by(parallel_by):
+    '''
+    Raises a ValueError for a parallel_by that is not one of PARALLEL_BY.
+    '''
+    if parallel_by not in PARALLEL_BY:
+        raise ValueError('parallel_by inputs are either:\n-"week" to give each worker a week at a time; or:\n-"game" to give each worker '
+                         f'a game at a time (not {parallel_by!r})')
+
+
+def start_worker(data_dir, cache_dir, use_cache, indexed, compact, profile_memory = None):
+    '''
+    Sets up a worker process: points it at the same data folders and opens the session its tasks share.
+    
+    Parameters:
+        'data_dir' - String - acquire.DATA_DIR of the main process
+        'cache_dir' - String - acquire.CACHE_DIR of the main process (None for the cache folder in data_dir)
+        'use_cache', 'indexed', 'compact' - Booleans - DataSession settings of the main process
+        'profile_memory' - Boolean - Profile the worker's stages (tracing allocations if True), None to not profile
+    '''
+    global worker_session
+    
+    acquire.DATA_DIR = data_dir
+    acquire.CACHE_DIR = cache_dir
+    
+    worker_session = acquire.DataSession(use_cache = use_cache, indexed = indexed, compact = compact)
+    
+    if profile_memory is not None:
+        profiling.reset()
+        profiling.enable(memory = profile_memory)
+
+
+def pass_rush_results_task(week_num, games, v_type, stream, engine, batch, skip = None, frame_archive = None):
+    '''
+    Builds one week (or game) in a worker process.
+    
+    Parameters:
+        'week_num' - Integer - Week to build
+        'games' - List of Integers - Games to build (all of the week's games if None)
+        'v_type', 'stream', 'engine', 'batch', 'skip', 'frame_archive' - As in week_pass_rush_results
+    Returns:
+        'pass_rush_results' - Dataframe - Metrics for each player in each play
+        'stats' - Dictionary - Worker process id, what was built, how many player-plays, how long it took, the
+                               player-plays that could not be built (and the stage profile of the task when profiling)
+    '''
+    start = time.perf_counter()
+    
+    failures = []
+    pass_rush_results = week_pass_rush_results(week_num, worker_session, v_type, stream, engine, batch, games = games, skip = skip,
+                                               failures = failures, frame_archive = frame_archive)
+    
+    stats = {'worker':os.getpid(),
+             'week':week_num,
+             'games':'all' if games is None else games,
+             'player_plays':len(pass_rush_results),
+             'seconds':time.perf_counter() - start,
+             'failures':acquire.failure_table(failures)}
+    
+    # Each task sends back the stage profile of its own work
+    if profiling.is_enabled():
+        stats['profile'] = profiling.snapshot()
+        profiling.reset()
+    
+    return pass_rush_results, stats
+
+
+def worker_throughput(task_stats):
+    '''
+    Totals the task stats of each worker process.
+    
+    Parameters:
+        'task_stats' - List of Dictionaries - Stats returned by pass_rush_results_task
+    Returns:
+        'throughput' - Dataframe - Tasks, player-plays, busy seconds and player-plays per second of each worker
+    '''
+    task_stats = pd.DataFrame(task_stats)
+    
+    throughput = task_stats.groupby('worker').agg(tasks = ('week', 'size'),
+                                                  player_plays = ('player_plays', 'sum'),
+                                                  seconds = ('seconds', 'sum'))
+    
+    throughput['player_plays_per_second'] = round(throughput.player_plays / throughput.seconds, 2)
+    throughput['seconds'] = round(throughput.seconds, 2)
+    
+    return throughput
+
+
+
+
+# ====================================================================================================
+# BATCHED PLAYER AND PLAY METRICS
+# ====================================================================================================
+
+def play_player_metrics_batch(scout_pass_rush, scout_pass_block, v_type, players_df, week_df, batch_plays = 500,
+                              matchup_index = None, backend = 'numpy', failures = None, telemetry = None, archive = None):
+    '''
+    Batched version of play_player_metrics_builder giving the same pass_rush_results: all of a week's pass rusher
+    frames are stacked into one long frame (nfl_frame_builder.build_week_analysis_frames), their metrics computed in
+    one pass (build_metrics_batch) and averaged player-play by player-play with segmented sums (pull_metrics_batch).
+    
+    Parameters:
+        'scout_pass_rush' - Dataframe - Pass rusher PFF scouting data
+        'scout_pass_block' - Dataframe - Pass blocker PFF scouting data
+        'v_type' - String - The type of analysis to perform, defaulting to 'PvP'
+        'players_df' - Dataframe - Contains player information, including weight
+        'week_df' - Dataframe - Weekly frame by frame data for each play, or an iterator of (game, play, play_frames_df)
+                                such as acquire.iter_week_plays
+        'batch_plays' - Integer - Number of streamed plays to stack per batch (only used for an iterator week_df)
+        'matchup_index' - Dictionary - Prebuilt matchups (acquire.build_matchup_index), built from scout_pass_block if
+                                       not given
+        'backend' - String - Per-frame calculations with 'numpy' or 'numba' (see nfl_build_metrics.frame_metric_arrays)
+        'failures' - List - Failure records (acquire.validate_player_plays) of the player-plays that could not be built
+                            are added to it, optional
+        'telemetry' - BuildTelemetry - Progress of a longer build to report to, a batch at a time; if None the build
+                                       reports its own progress and summary
+        'archive' - FrameArchiveWriter - The per-frame metrics of each player-play built are added to it, optional
+    Returns:
+        'pass_rush_results' - Dataframe - Metrics for each player in each play, with pressure statistics from PFF scouting
+    '''
+    # Progress is reported to the longer build this is part of, or on its own
+    own_telemetry = telemetry is None
+    telemetry = telemetry_module.get_telemetry(telemetry)
+    
+    if own_telemetry:
+        telemetry.start('Player-plays')
+    
+    # Indexed once and shared by every batch
+    if matchup_index is None:
+        matchup_index = acquire.build_matchup_index(scout_pass_block)
+    
+    if isinstance(week_df, pd.DataFrame):
+        frame_batches = [week_df]
+    else:
+        # Streamed plays are stacked a batch at a time, so memory stays bounded to batch_plays plays
+        frame_batches = stack_plays(week_df, batch_plays)
+    
+    results = []
+    build_failures = []
+    streamed = set()
+    
+    for frames_df in frame_batches:
+        # Player-plays of the plays in these frames
+        frame_plays = frames_df[['game', 'play']].drop_duplicates()
+        streamed.update(zip(frame_plays.game, frame_plays.play))
+        
+        batch_pass_rush = scout_pass_rush[pd.MultiIndex.from_frame(scout_pass_rush[['game', 'play']]).isin(pd.MultiIndex.from_frame(frame_plays))]
+        
+        # Player-plays that cannot be built are recorded before the batch is built
+        batch_pass_rush, invalid = acquire.validate_player_plays(batch_pass_rush, frames_df, players_df, matchup_index)
+        build_failures.append(invalid)
+        
+        entries, analysis_frames = nfl.build_week_analysis_frames(frames_df, batch_pass_rush, scout_pass_block, v_type, matchup_index)
+        
+        # Anything validation let through but the batched build still left out
+        left_out = batch_pass_rush[~batch_pass_rush.index.isin(entries.entry)]
+        build_failures.append(acquire.failure_rows(left_out, 'build_error', 'Left out by build_week_analysis_frames'))
+        
+        analysis_frames = metrics.build_metrics_batch(analysis_frames, entries, players_df, backend = backend)
+        
+        play_metrics = pull_metrics_batch(analysis_frames, entries)
+        
+        if archive is not None:
+            archive.add_batch(entries, analysis_frames)
+        
+        play_metrics = pd.concat([scout_pass_rush.loc[entries.entry].reset_index(drop = True),
+                                  play_metrics.reset_index(drop = True)],
+                                 axis = 1)
+        
+        results.append(play_metrics)
+        
+        telemetry.advance(built = len(play_metrics), failed = len(invalid) + len(left_out))
+    
+    pass_rush_results = pd.concat(results, ignore_index = True)
+    
+    # Player-plays in scouting order, as a single full-week build gives them
+    if not isinstance(week_df, pd.DataFrame):
+        pass_rush_results = restore_scouting_order(pass_rush_results, scout_pass_rush).reset_index(drop = True)
+    
+    # Plays of these games missing from the tracking data
+    untracked = untracked_entries(scout_pass_rush, streamed)
+    build_failures.append(untracked)
+    telemetry.advance(failed = len(untracked))
+    
+    build_failures = collect_failures(build_failures, failures)
+    
+    if own_telemetry:
+        telemetry.finish(built = len(pass_rush_results), failures = build_failures)
+    
+    return pass_rush_results
+
+
+# ----- Sub Functions -----------------------------------------------------------------------------
+
+def pull_metrics_batch(analysis_frames, entries):
+    '''
+    Batched version of pull_metrics: consolidates the metrics of each player-play in stacked analysis frames.
+    
+    Parameters:
+        'analysis_frames' - Dataframe - Stacked frames of all entries, with metrics
+        'entries' - Dataframe - One row per player-play, with qb_hold_time, frame_count and pass_blockers
+    Returns:
+        'play_metrics' - Dataframe - Aggregated play metrics (averages over frames), one row per entry
+    '''
+    frame_count = entries.frame_count.to_numpy()
+    
+    play_metrics = {'pass_rusher_average_a':segment_means(analysis_frames.pass_rusher_a, frame_count),
+                    'colinearity':segment_means(analysis_frames.colinearity, frame_count),
+                    'pursuit_factor':segment_means(analysis_frames.pursuit_factor, frame_count),
+                    'force_to_ball':segment_means(analysis_frames.pass_rusher_force_to_ball, frame_count),
+                    #! -- Add any additional frame by frame metrics --
+                    'pursuit_vs_escape':segment_means(analysis_frames.pursuit_vs_escape, frame_count),
+                    'pursuit1':segment_means(analysis_frames.pursuit1, frame_count),
+                    'pursuit2':segment_means(analysis_frames.pursuit2, frame_count),
+                    'pursuit3_mean':segment_means(analysis_frames.pursuit3, frame_count),
+                    # Same as pull_metrics, which sums pursuit2 for pursuit3_sum
+                    'pursuit3_sum':nfl.segment_sums(analysis_frames.pursuit2, frame_count, skipna = True),
+                    'pursuit4':segment_means(analysis_frames.pursuit4, frame_count),
+                    'qb_hold_time':entries.qb_hold_time.to_numpy(),
+                    'blocker_count':entries.pass_blockers.map(len).to_numpy(dtype = int), 
+                    'pass_blockers':entries.pass_blockers.to_numpy()}
+    
+    # Round as pull_metrics does
+    for column in play_metrics:
+        if column not in ['qb_hold_time', 'blocker_count', 'pass_blockers']:
+            play_metrics[column] = np.round(play_metrics[column], 4)
+    
+    play_metrics = pd.DataFrame(play_metrics)
+    
+    return play_metrics
+
+
+def stack_plays(plays, batch_plays):
+    '''
+    Concatenates streamed plays into batches of frames.
+    
+    Parameters:
+        'plays' - Iterator - (game, play, play_frames_df) tuples, such as acquire.iter_week_plays
+        'batch_plays' - Integer - Number of plays per batch
+    Yields:
+        'frames_df' - Dataframe - Frames of up to batch_plays plays
+    '''
+    batch = []
+    
+    for game, play, play_frames_df in plays:
+        batch.append(play_frames_df)
+        
+        if len(batch) == batch_plays:
+            yield pd.concat(batch, ignore_index = True)
+            batch = []
             
-        except:
-            print(f'*****Frame event error for game|play|nflId = {game}|{play}|{nflId}')
+    if batch:
+        yield pd.concat(batch, ignore_index = True)
+
+
+# ----- Support Functions -----------------------------------------------------------------------------
+
+def segment_means(values, frame_count):
+    '''
+    Averages a frame by frame column for each player-play, skipping NaNs like pandas' mean (NaN when all are null).
+    
+    Parameters:
+        'values' - Series or Array - Frame values of all player-plays, player-play after player-play
+        'frame_count' - Array of Integers - Number of frames of each player-play
+    Returns:
+        'means' - Array of Floats - Mean for each player-play
+    '''
+    values = np.asarray(values, dtype = float)
+    
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        means = nfl.segment_sums(values, frame_count, skipna = True) / nfl.segment_sums(~np.isnan(values), frame_count)
     
-    pass_rush_results = results.drop(columns = ['pass_rusher'])
+    return means
+
+
+
+
+# ====================================================================================================
+# COMPARE RESULTS
+# ====================================================================================================
+
+def compare_results(results, reference, tolerance = acquire.COMPACT_METRIC_TOLERANCE):
+    '''
+    Compares two pass_rush_results tables (e.g. a compact build against a float64 build) player-play by player-play
+    and metric by metric.
+    
+    Parameters:
+        'results' - Dataframe - pass_rush_results to check
+        'reference' - Dataframe - pass_rush_results to check against
+        'tolerance' - Float - Largest absolute difference allowed for any metric
+    Returns:
+        'comparison' - Dataframe - Max absolute difference per numeric column and whether it is within tolerance
+    '''
+    keys = ['game', 'play', 'nflId']
+    
+    # Line the two tables up by player-play
+    merged = pd.merge(results, reference, on = keys, how = 'outer', suffixes = ('', '_reference'), indicator = True)
+    
+    unmatched = (merged._merge != 'both').sum()
+    if unmatched > 0:
+        print(f'{unmatched} player-plays are only in one of the two results')
+    
+    merged = merged[merged._merge == 'both']
+    
+    comparison = []
+    
+    for column in reference.columns:
+        if column in keys or not pd.api.types.is_numeric_dtype(reference[column]):
+            continue
+        
+        value = merged[column].astype(float)
+        reference_value = merged[f'{column}_reference'].astype(float)
+        
+        # Matching nulls are equal, a null on only one side is not
+        both_null = value.isnull() & reference_value.isnull()
+        one_null = value.isnull() ^ reference_value.isnull()
+        
+        difference = (value - reference_value).abs()[~both_null & ~one_null]
+        max_difference = np.inf if one_null.any() else (difference.max() if len(difference) else 0.0)
+        
+        comparison.append({'column':column,
+                           'max_abs_difference':max_difference,
+                           'within_tolerance':max_difference <= tolerance})
+        
+    comparison = pd.DataFrame(comparison)
     
-    return pass_rush_results
\ No newline at end of file
+    return comparison
@@ -0,0 +1,79 @@
+'''
+Shared fixtures: a small synthetic season (nfl_synthetic_data) that acquire is pointed at, with each test run in its
+own working directory - builds write their csvs, result directories and databases to the working directory.
+'''
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nfl_acquire_and_prep as acquire
+import nfl_synthetic_data as synthetic
+import nfl_use_metrics as use_metrics
+import nfl_results as results_module
+
+# Two weeks of two games, with some plays missing their ball_snap so every build has failures to record
+SEASON = {'weeks':2,
+          'games_per_week':2,
+          'plays_per_game':3,
+          'frames_per_play':40,
+          'rushers_per_play':4,
+          'blockers_per_play':5,
+          'invalid_play_rate':0.2,
+          'seed':7}
+
+
+@pytest.fixture(scope = 'session')
+def season_dir(tmp_path_factory):
+    '''
+    Directory of the synthetic season's csvs (written once per test run).
+    '''
+    data_dir = str(tmp_path_factory.mktemp('season'))
+    synthetic.generate(data_dir, **SEASON)
+
+    return data_dir
+
+
+@pytest.fixture
+def session(season_dir, tmp_path, monkeypatch):
+    '''
+    A DataSession of the synthetic season, with acquire pointed at it and the test run in tmp_path.
+    '''
+    monkeypatch.setattr(acquire, 'DATA_DIR', season_dir)
+    monkeypatch.chdir(tmp_path)
+
+    return acquire.DataSession()
+
+
+@pytest.fixture
+def reference_results(session):
+    '''
+    Weeks 1-2 built in memory, player-play by player-play - what every other way of building should give.
+    '''
+    return build(session, sink = results_module.ResultSink(dtypes = session.scout_pass_rush.dtypes))
+
+
+def build(session, start_week = 1, end_week = 2, **kwargs):
+    '''
+    all_week_pass_rush_results of the synthetic season, without a telemetry log.
+    '''
+    return use_metrics.all_week_pass_rush_results(start_week, end_week, session = session, telemetry_log = None, **kwargs)
+
+
+def assert_same_results(results, reference, **tolerances):
+    '''
+    Results match row for row (pass_blockers compared as numbers - parquet may store the ids as floats); tolerances
+    (rtol, atol) are passed to assert_frame_equal.
+    '''
+    results = results.reset_index(drop = True)
+    reference = reference.reset_index(drop = True)
+
+    pd.testing.assert_frame_equal(results.drop(columns = 'pass_blockers'), reference.drop(columns = 'pass_blockers'),
+                                  check_dtype = False, **tolerances)
+
+    for blockers, reference_blockers in zip(results.pass_blockers, reference.pass_blockers):
+        np.testing.assert_array_equal(np.asarray(blockers, dtype = float), np.asarray(reference_blockers, dtype = float))
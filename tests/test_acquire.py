@@ -0,0 +1,51 @@
+'''
+Acquire (nfl_acquire_and_prep): any week with a weekN.csv loads, so seasons longer than the Kaggle 8 weeks build,
+and the week cache is kept with the data it came from.
+'''
+import os
+
+import pytest
+
+import nfl_acquire_and_prep as acquire
+import nfl_synthetic_data as synthetic
+
+from conftest import build
+
+
+@pytest.fixture
+def long_session(tmp_path, monkeypatch):
+    '''
+    A DataSession of a 9 week synthetic season.
+    '''
+    data_dir = str(tmp_path / 'long_season')
+    synthetic.generate(data_dir, weeks = 9, games_per_week = 1, plays_per_game = 2, frames_per_play = 40, seed = 11)
+
+    monkeypatch.setattr(acquire, 'DATA_DIR', data_dir)
+    monkeypatch.chdir(tmp_path)
+
+    return acquire.DataSession()
+
+
+def test_builds_past_week_8(long_session):
+    results = build(long_session, start_week = 8, end_week = 9)
+
+    weeks = long_session.games.set_index('game').week
+
+    assert sorted(weeks[results.game].unique()) == [8, 9]
+    assert len(list(acquire.iter_week_plays(9))) == 2
+
+
+def test_missing_week_raises(long_session):
+    with pytest.raises(FileNotFoundError):
+        acquire.week(10)
+
+    with pytest.raises(FileNotFoundError):
+        next(acquire.iter_week_plays(10))
+
+
+def test_week_cache_follows_data_dir(long_session):
+    pytest.importorskip('pyarrow')
+
+    acquire.week(9)
+
+    assert os.path.exists(os.path.join(acquire.DATA_DIR, 'cache', 'week9.parquet'))
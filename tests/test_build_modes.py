@@ -0,0 +1,33 @@
+'''
+Build modes: every way of building the metrics gives the same player-play results as the loop engine, player-play by
+player-play.
+'''
+import pytest
+
+import nfl_results as results_module
+
+from conftest import build, assert_same_results
+
+# Unrounded averages (pursuit3, pursuit4) can differ from the loop engine in the last bit (see build_metrics_numpy)
+LAST_BIT = {'rtol':0, 'atol':1e-9}
+
+
+def in_memory_build(session, **mode):
+    return build(session, sink = results_module.ResultSink(dtypes = session.scout_pass_rush.dtypes), **mode)
+
+
+@pytest.mark.parametrize('engine', ['numpy', 'numba'])
+def test_engine_matches_loop(session, reference_results, engine):
+    # 'numba' falls back to the numpy engine when numba is not installed
+    assert_same_results(in_memory_build(session, engine = engine), reference_results, **LAST_BIT)
+
+
+@pytest.mark.parametrize('mode', [{'batch':True},
+                                  {'stream':True},
+                                  {'batch':True, 'stream':True},
+                                  {'workers':2, 'parallel_by':'week'},
+                                  {'workers':2, 'parallel_by':'game'}],
+                         ids = ['batch', 'stream', 'batch_stream', 'workers_by_week', 'workers_by_game'])
+def test_mode_matches_loop(session, reference_results, mode):
+    # The batched pass is whole-array, so it has the numpy engine's last-bit differences
+    assert_same_results(in_memory_build(session, **mode), reference_results, **LAST_BIT)
@@ -0,0 +1,80 @@
+'''
+Frame archive (nfl_frame_archive): summaries of the archived frames give back what pull_metrics gave.
+'''
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import nfl_frame_archive as frame_archive_module
+import nfl_results as results_module
+
+from conftest import build
+
+# Result column of pull_metrics and the archived frame column it averages
+AVERAGES = {'pass_rusher_average_a':'pass_rusher_a',
+            'colinearity':'colinearity',
+            'pursuit_factor':'pursuit_factor',
+            'force_to_ball':'pass_rusher_force_to_ball',
+            'pursuit_vs_escape':'pursuit_vs_escape',
+            'pursuit4':'pursuit4'}
+
+
+def archived_build(session, archive_dir, **kwargs):
+    sink = results_module.ResultSink(dtypes = session.scout_pass_rush.dtypes)
+
+    return build(session, sink = sink, frame_archive = archive_dir, **kwargs)
+
+
+def test_summarize_matches_pull_metrics(session):
+    results = archived_build(session, 'frames')
+    archive = frame_archive_module.FrameArchive('frames')
+
+    assert len(archive.keys()) == len(results)
+
+    summaries = archive.summarize({column:'mean' for column in AVERAGES.values()})
+    merged = results.merge(summaries, on = ['game', 'play', 'nflId'], validate = 'one_to_one')
+
+    assert len(merged) == len(results)
+
+    # pull_metrics rounds to 4 decimals
+    for result_column, frame_column in AVERAGES.items():
+        np.testing.assert_allclose(merged[result_column], merged[f'{frame_column}_mean'], atol = 1e-4 + 1e-9)
+
+
+def test_frames_and_first_seconds(session):
+    archived_build(session, 'frames')
+    archive = frame_archive_module.FrameArchive('frames')
+
+    key = archive.keys().iloc[0]
+    frames = archive.frames(key.game, key.play, key.nflId)
+
+    assert len(frames) == key.frame_count
+    assert frames.frame_number.tolist() == list(range(key.frame_count))
+    assert archive.frames(0, 0, 0) is None
+
+    # The first second is the first 10 frames
+    first = archive.summarize({'pursuit_factor':['max', 'size']}, first_seconds = 1)
+    first = first.set_index(['game', 'play', 'nflId']).loc[(key.game, key.play, key.nflId)]
+
+    assert first.pursuit_factor_size == min(10, key.frame_count)
+    assert first.pursuit_factor_max == frames.pursuit_factor.head(10).max()
+
+
+def test_batch_archive_matches_loop_archive(session):
+    archived_build(session, 'loop_frames')
+    archived_build(session, 'batch_frames', batch = True)
+
+    def all_frames(directory):
+        frames = pd.concat(frame_archive_module.FrameArchive(directory).iter_batches())
+        return frames.sort_values(['game', 'play', 'nflId', 'frame_number']).reset_index(drop = True)
+
+    pd.testing.assert_frame_equal(all_frames('loop_frames'), all_frames('batch_frames'), atol = 1e-12)
+
+
+def test_unarchived_column_raises(session):
+    archived_build(session, 'frames', start_week = 1, end_week = 1)
+
+    with pytest.raises(ValueError):
+        frame_archive_module.FrameArchive('frames').summarize({'not_a_column':'mean'})
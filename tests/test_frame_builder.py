@@ -0,0 +1,29 @@
+'''
+Frame builder (nfl_frame_builder): play windows looked up instead of found from each play's events.
+'''
+import pytest
+
+import nfl_acquire_and_prep as acquire
+import nfl_frame_builder as nfl
+
+
+def test_play_without_a_window_raises(session):
+    week_df = session.week(1)
+    windows = session.play_windows(1)
+
+    # A play with no ball_snap (the synthetic season has some) is left out of the lookup
+    invalid = windows[~windows.valid].iloc[0]
+    play_frames_df = nfl.get_play_frames(invalid.game, invalid.play, week_df)
+
+    with pytest.raises(ValueError, match = f'game {invalid.game}, play {invalid.play}'):
+        nfl.get_play_fb_frames(play_frames_df, acquire.play_window_lookup(windows))
+
+    # A valid play gets the same frames either way
+    valid = windows[windows.valid].iloc[0]
+    play_frames_df = nfl.get_play_frames(valid.game, valid.play, week_df)
+
+    looked_up = nfl.get_play_fb_frames(play_frames_df.copy(), acquire.play_window_lookup(windows))
+    found = nfl.get_play_fb_frames(play_frames_df.copy())
+
+    assert looked_up[0] == found[0]
+    assert looked_up[2].equals(found[2])
@@ -0,0 +1,87 @@
+'''
+Frame cache (nfl_frame_builder.FrameCache): hits, misses, least recently used eviction and invalidation.
+'''
+import inspect
+
+import pandas as pd
+
+import nfl_frame_builder as nfl
+import nfl_build_metrics as build_metrics
+
+
+def frames(rows = 10):
+    return pd.DataFrame({'frame':range(rows), 'x':[0.5] * rows})
+
+
+def key(game, play = 1, nflId = 100):
+    return (game, play, nflId, 'pass_rusher', 'PvP')
+
+
+def test_hit_and_miss_return_copies():
+    cache = nfl.FrameCache()
+
+    assert cache.get(key(1), 'frames') is None
+
+    cache.put(key(1), 'frames', (2.5, (30.0, 20.0), frames()))
+    qb_hold_time, point_of_scrimmage, cached = cache.get(key(1), 'frames')
+
+    assert qb_hold_time == 2.5 and point_of_scrimmage == (30.0, 20.0)
+    pd.testing.assert_frame_equal(cached, frames())
+
+    # Changing what came out does not change what is cached
+    cached['x'] = 9.0
+    assert (cache.get(key(1), 'frames')[2].x == 0.5).all()
+
+    # Stages are cached separately
+    assert cache.get(key(1), 'metrics') is None
+
+    assert cache.stats() == {'hits':2, 'misses':2, 'evictions':0, 'entries':1, 'bytes':cache.bytes}
+
+
+def test_least_recently_used_are_evicted():
+    cache = nfl.FrameCache(max_entries = 2)
+
+    cache.put(key(1), 'frames', frames())
+    cache.put(key(2), 'frames', frames())
+
+    # Using game 1 leaves game 2 the least recently used
+    cache.get(key(1), 'frames')
+    cache.put(key(3), 'frames', frames())
+
+    assert list(cache.entries) == [key(1), key(3)]
+    assert cache.stats()['evictions'] == 1
+
+    # Past max_bytes, down to what fits
+    size = cache.entry_bytes[key(1)]
+    cache = nfl.FrameCache(max_bytes = 2 * size)
+
+    for game in range(1, 4):
+        cache.put(key(game), 'frames', frames())
+
+    assert list(cache.entries) == [key(2), key(3)]
+    assert cache.bytes == 2 * size
+
+    # A player-play bigger than max_bytes is not kept
+    cache.put(key(4), 'frames', frames(1000))
+    assert key(4) not in cache.entries
+
+
+def test_invalidate():
+    cache = nfl.FrameCache()
+
+    for game, play, nflId in [(1, 1, 100), (1, 2, 100), (1, 2, 200), (2, 1, 100)]:
+        cache.put(key(game, play, nflId), 'frames', frames())
+
+    assert cache.invalidate(game = 1, play = 2) == 2
+    assert cache.invalidate(nflId = 100) == 2
+    assert cache.stats()['entries'] == 0 and cache.bytes == 0
+
+    cache.put(key(1), 'frames', frames())
+    assert cache.invalidate() == 1
+
+
+def test_frames_and_metrics_share_the_default_cache():
+    frames_default = inspect.signature(nfl.build_play_frames).parameters['cache'].default
+    metrics_default = inspect.signature(build_metrics.build_play_metrics).parameters['cache'].default
+
+    assert frames_default is metrics_default is nfl.FRAME_CACHE
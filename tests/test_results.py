@@ -0,0 +1,55 @@
+'''
+Result sinks (nfl_results): partitioned files read back as the same results as an in-memory build.
+'''
+import os
+
+import pandas as pd
+
+import nfl_results as results_module
+
+from conftest import build, assert_same_results
+
+
+def test_partitioned_sink_round_trip(session, reference_results):
+    results = build(session)
+
+    assert len(results) > 0
+    assert_same_results(results, reference_results)
+
+    # The week partitions on disk, and the combined csv, hold the same rows
+    directory = 'metric_results_weeks_1_through_2'
+    assert sorted(os.listdir(directory)) == ['manifest.json', 'week=1', 'week=2']
+
+    assert_same_results(results_module.open_partitions(directory), reference_results)
+    assert len(pd.read_csv('metric_results_weeks_1_through_2.csv')) == len(reference_results)
+
+
+def test_csv_partitions_keep_dtypes(session, reference_results):
+    sink = results_module.PartitionedResultSink('csv_results', file_format = 'csv', dtypes = session.scout_pass_rush.dtypes)
+
+    results = build(session, sink = sink)
+
+    assert results_module.part_paths('csv_results/week=1')[0].endswith('.csv')
+    assert (results.dtypes == reference_results.dtypes).all()
+
+    # pass_blockers come back as lists, as from the in-memory sink
+    assert all(isinstance(blockers, list) for blockers in results.pass_blockers)
+    assert_same_results(results, reference_results)
+
+
+def test_sink_buffers_rows_in_column_order():
+    sink = results_module.ResultSink(batch_rows = 2)
+
+    sink.append({'game':1, 'play':2, 'value':0.5}, partition = 1)
+    sink.append({'game':1, 'play':3}, partition = 1)
+    sink.append({'game':2, 'play':1, 'value':1.5, 'extra':'x'}, partition = 2)
+
+    assert len(sink) == 3
+
+    results = sink.result()
+
+    assert sink.partitions() == [1, 2]
+
+    assert list(results.columns) == ['game', 'play', 'value', 'extra']
+    assert results.value.isna().tolist() == [False, True, False]
+    assert results.game.tolist() == [1, 1, 2]
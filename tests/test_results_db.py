@@ -0,0 +1,65 @@
+'''
+Results database (nfl_results_db): queries give what a pandas groupby of the results gives, and weeks loaded again
+only replace their own rows.
+'''
+import numpy as np
+import pandas as pd
+import pytest
+
+import nfl_results_db as results_db_module
+
+from conftest import build
+
+METRICS = ['pursuit_factor', 'colinearity', 'pressure']
+
+
+@pytest.fixture
+def results_rows(session, reference_results):
+    '''
+    The reference results with week, team and player name joined in, as stored.
+    '''
+    results_db_module.build_results_db(reference_results, session, 'results.sqlite')
+
+    return results_db_module.db_rows(reference_results, session)
+
+
+def test_player_season_matches_groupby(results_rows):
+    expected = results_rows.groupby('nflId').agg(play_count = ('game', 'size'), **{metric:(metric, 'mean') for metric in METRICS})
+
+    with results_db_module.ResultsDB('results.sqlite') as db:
+        season = db.player_season(metrics = METRICS).set_index('nflId')
+
+    pd.testing.assert_frame_equal(season[['play_count'] + METRICS], expected, check_dtype = False)
+
+
+def test_top_and_team_week_match_pandas(results_rows):
+    averages = results_rows.groupby('nflId').pursuit_factor.mean().sort_values(ascending = False, kind = 'stable')
+
+    with results_db_module.ResultsDB('results.sqlite') as db:
+        top = db.top('pursuit_factor', n = 5)
+
+        team, week = results_rows.team.iloc[0], results_rows.week.iloc[0]
+        team_week = db.team_week(team, week)
+
+    np.testing.assert_allclose(top.pursuit_factor.to_numpy(), averages.head(5).to_numpy())
+
+    expected = results_rows[(results_rows.team == team) & (results_rows.week == week)]
+    assert len(team_week) == len(expected)
+    assert set(zip(team_week.game, team_week.play, team_week.nflId)) == set(zip(expected.game, expected.play, expected.nflId))
+
+
+def test_unknown_metric_raises(results_rows):
+    with results_db_module.ResultsDB('results.sqlite') as db:
+        with pytest.raises(ValueError):
+            db.top('not_a_metric')
+
+
+def test_rebuilding_a_week_keeps_the_others(session):
+    build(session, results_db = 'metric_results.sqlite')
+    build(session, start_week = 2, end_week = 2, results_db = 'metric_results.sqlite')
+
+    with results_db_module.ResultsDB('metric_results.sqlite') as db:
+        weeks = db.weeks()
+
+    assert weeks.week.tolist() == [1, 2]
+    assert (weeks.player_plays > 0).all()
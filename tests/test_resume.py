@@ -0,0 +1,84 @@
+'''
+Resumable builds (nfl_resume): a build stopped part way through a week carries on from its finished player-plays.
+'''
+import os
+import json
+
+import pytest
+
+import nfl_use_metrics as use_metrics
+import nfl_results as results_module
+
+from conftest import build, assert_same_results
+
+RESULTS_DIR = 'metric_results_weeks_1_through_2'
+
+
+def manifest_weeks():
+    with open(os.path.join(RESULTS_DIR, 'manifest.json')) as f:
+        return json.load(f)['weeks']
+
+
+def test_resume_after_a_partial_week(session, reference_results, monkeypatch):
+    original = use_metrics.week_pass_rush_results
+    calls = []
+
+    def stops_in_week_2(week_num, *args, **kwargs):
+        calls.append((week_num, kwargs.get('games')))
+
+        # The first game of week 2 is built, then the run stops
+        if len(calls) == 4:
+            raise KeyboardInterrupt('stopped')
+
+        return original(week_num, *args, **kwargs)
+
+    monkeypatch.setattr(use_metrics, 'week_pass_rush_results', stops_in_week_2)
+
+    with pytest.raises(KeyboardInterrupt):
+        build(session)
+
+    weeks = manifest_weeks()
+    assert weeks['1']['complete']
+    assert not weeks['2']['complete'] and len(weeks['2']['keys']) > 0
+
+    # Only the game that was not finished is built again
+    def counted(week_num, *args, **kwargs):
+        calls.append(kwargs.get('games'))
+
+        return original(week_num, *args, **kwargs)
+
+    calls.clear()
+    monkeypatch.setattr(use_metrics, 'week_pass_rush_results', counted)
+
+    results = build(session, resume = True)
+
+    assert calls == [[session.games.game[session.games.week == 2].iloc[1]]]
+    assert_same_results(results, reference_results)
+    assert manifest_weeks()['2']['complete']
+
+    # Nothing is left to build
+    calls.clear()
+    assert_same_results(build(session, resume = True), reference_results)
+    assert calls == []
+
+
+def test_resume_keeps_failures_of_skipped_weeks(session, reference_results):
+    failures = []
+    build(session, failures = failures)
+
+    resumed_failures = []
+    build(session, resume = True, failures = resumed_failures)
+
+    assert sum(len(failure) for failure in resumed_failures) == sum(len(failure) for failure in failures) > 0
+
+
+def test_bad_parallel_by_leaves_no_manifest(session):
+    with pytest.raises(ValueError):
+        build(session, workers = 2, parallel_by = 'bogus')
+
+    assert not os.path.exists(RESULTS_DIR)
+
+
+def test_resume_needs_a_partitioned_sink(session):
+    with pytest.raises(ValueError):
+        build(session, resume = True, sink = results_module.ResultSink())
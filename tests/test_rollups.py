@@ -0,0 +1,99 @@
+'''
+Rollups (nfl_rollups): weeks folded in by separate runs combine to what a pandas groupby of all their player-plays
+gives, and group_results gives what it gave before it used the rollup aggregates.
+'''
+import numpy as np
+import pandas as pd
+import pytest
+
+import nfl_functions as nfl
+import nfl_results_db as results_db_module
+import nfl_rollups as rollups_module
+
+from conftest import build
+
+METRICS = ['pursuit_factor', 'colinearity', 'pressure']
+
+
+@pytest.fixture
+def folded_runs(session):
+    '''
+    Week 1 and week 2 folded into the same rollups by two separate runs, with the player-play rows of both.
+    '''
+    week_1 = build(session, start_week = 1, end_week = 1, rollups = 'metric_rollups.sqlite')
+
+    with rollups_module.Rollups('metric_rollups.sqlite') as rollups:
+        week_1_season = rollups.season(metrics = METRICS).set_index('nflId')
+
+    week_2 = build(session, start_week = 2, end_week = 2, rollups = 'metric_rollups.sqlite')
+
+    rows = results_db_module.db_rows(pd.concat([week_1, week_2], ignore_index = True), session)
+
+    return week_1_season, rows
+
+
+def test_week_totals_survive_the_next_run(folded_runs):
+    week_1_season, rows = folded_runs
+
+    with rollups_module.Rollups('metric_rollups.sqlite') as rollups:
+        weeks = rollups.weeks()
+        week_1 = rollups.season(metrics = METRICS, weeks = [1]).set_index('nflId')
+
+    assert weeks.week.tolist() == [1, 2]
+    assert weeks.player_plays.tolist() == rows.groupby('week').size().tolist()
+
+    pd.testing.assert_frame_equal(week_1, week_1_season)
+
+
+def test_season_and_leaderboard_match_groupby(folded_runs):
+    week_1_season, rows = folded_runs
+
+    expected = rows.groupby('nflId').agg(play_count = ('game', 'size'), **{metric:(metric, 'mean') for metric in METRICS})
+
+    with rollups_module.Rollups('metric_rollups.sqlite') as rollups:
+        season = rollups.season(metrics = METRICS).set_index('nflId')
+        leaders = rollups.leaderboard('pursuit_factor', n = None)
+
+    pd.testing.assert_frame_equal(season[['play_count'] + METRICS], expected, check_dtype = False)
+
+    statistics = rows.groupby('nflId').pursuit_factor.agg(['mean', 'std', 'min', 'max']).loc[leaders.nflId]
+    np.testing.assert_allclose(leaders.pursuit_factor_mean, statistics['mean'])
+    np.testing.assert_allclose(leaders.pursuit_factor_std, statistics['std'])
+    np.testing.assert_allclose(leaders.pursuit_factor_min, statistics['min'])
+    np.testing.assert_allclose(leaders.pursuit_factor_max, statistics['max'])
+
+
+def test_folding_a_week_again_replaces_it(folded_runs, session):
+    with rollups_module.Rollups('metric_rollups.sqlite') as rollups:
+        before = rollups.aggregates().sort_values(rollups_module.GROUP_COLUMNS).reset_index(drop = True)
+
+    build(session, start_week = 2, end_week = 2, rollups = 'metric_rollups.sqlite')
+
+    with rollups_module.Rollups('metric_rollups.sqlite') as rollups:
+        after = rollups.aggregates().sort_values(rollups_module.GROUP_COLUMNS).reset_index(drop = True)
+
+    pd.testing.assert_frame_equal(after, before)
+
+
+def test_bad_level_or_metric_raises(folded_runs):
+    with rollups_module.Rollups('metric_rollups.sqlite') as rollups:
+        with pytest.raises(ValueError):
+            rollups.season(by = 'not_a_level')
+
+        with pytest.raises(ValueError):
+            rollups.leaderboard('not_a_metric')
+
+
+def test_group_results_matches_groupby_mean():
+    metrics_df = pd.DataFrame({'Player':['a', 'a', 'b', None, 'b', 'c'],
+                               'team':['X', 'X', 'Y', 'Y', 'Y', 'Z'],
+                               'x':[1.0, 2.0, np.nan, 7.0, 4.0, 5.0],
+                               'flag':[True, False, True, True, True, False],
+                               'n':[1, 2, 3, 4, 5, 6]})
+
+    # What group_results gave before it used the rollup aggregates
+    play_count = list(metrics_df.groupby(by = 'Player').Player.count())
+    expected = metrics_df.groupby(by = 'Player').mean(numeric_only = True)
+    expected['play_count'] = play_count
+
+    pd.testing.assert_frame_equal(nfl.group_results(metrics_df), expected, check_dtype = False)